@@ -1,32 +1,83 @@
-from judini import CodeGPTPlus
 import sys
-import os
+import asyncio
 from dotenv import load_dotenv
+from modules import llm_cache, replay
+from modules.replay import replayable
+from modules.codegpt_client import get_manager
+from modules.json_stream import JSONExtractor, until_complete
 load_dotenv()
 
-def chat_with_codegpt(user_message, agent_id=None):
-    # Load API credentials from environment variables
-    api_key = os.environ.get("CODEGPT_API_KEY")
-    org_id = os.environ.get("CODEGPT_ORG_ID")
-    default_agent_id = os.environ.get("CODEGPT_AGENT_ID")
+def _cache_agent(agent_id):
+    # Calls without an agent go to the default one, so they share its entries
+    return agent_id or get_manager().credentials()[2]
 
-    # Use provided agent_id or fall back to default from environment
-    agent_id = agent_id or default_agent_id
+def _fixture_parts(*args, **kwargs):
+    # Caching options don't change the reply, so they stay out of fixture keys
+    return [args[:3], {k: v for k, v in kwargs.items() if k not in ('call_type', 'use_cache')}]
 
-    if not all([api_key, org_id, agent_id]):
-        raise ValueError("Missing required environment variables for CodeGPT API")
+@replayable("codegpt", key=_fixture_parts)
+def chat_with_codegpt(user_message, agent_id=None, timeout=None, call_type=None, use_cache=True):
+    # The shared client manager reads credentials once, reuses connections,
+    # caps calls in flight and retries transient failures. Identical prompts
+    # to the same agent are answered from the LLM cache for call_type's TTL.
+    chat = llm_cache.cached_call(
+        "codegpt", _cache_agent(agent_id), None, user_message,
+        lambda: get_manager().chat(user_message, agent_id=agent_id, timeout=timeout),
+        call_type=call_type, use_cache=use_cache
+    )
 
-    # Initialize CodeGPTPlus
-    codegpt = CodeGPTPlus(api_key=api_key, org_id=org_id)
+    # Return the AI response
+    return chat if chat else "Failed to generate a response. Please try again."
 
-    # Prepare the message
-    messages = [{"role": "user", "content": user_message}]
+def stream_with_codegpt(user_message, agent_id=None, timeout=None, call_type=None, use_cache=True):
+    # Yields the reply in pieces as they arrive. Recorded fixtures hold whole
+    # replies, so in record/replay mode the full reply is yielded at once.
+    if replay.enabled():
+        yield chat_with_codegpt(user_message, agent_id, timeout)
+        return
+    if not llm_cache.active(use_cache, call_type):
+        yield from get_manager().stream(user_message, agent_id=agent_id, timeout=timeout)
+        return
 
-    # Call the CodeGPTPlus API for a chat completion
-    chat = codegpt.chat_completion(agent_id=agent_id, messages=messages)
+    # A cached reply is yielded whole; a fresh one is stored once it completes,
+    # or, for JSON call types, once the consumer stops at the end of the JSON
+    key = llm_cache.make_key("codegpt", _cache_agent(agent_id), None, user_message)
+    cached = llm_cache.lookup(key, "codegpt")
+    if cached is not None:
+        yield cached
+        return
+    pieces = []
+    complete = False
+    source = get_manager().stream(user_message, agent_id=agent_id, timeout=timeout)
+    try:
+        for piece in source:
+            pieces.append(piece)
+            yield piece
+        complete = True
+    except GeneratorExit:
+        complete = call_type in llm_cache.JSON_CALL_TYPES
+        raise
+    finally:
+        source.close()
+        reply = "".join(pieces)
+        if complete and llm_cache.cacheable_reply(reply, call_type):
+            llm_cache.store(key, reply, llm_cache.get_ttl(call_type), "codegpt", call_type)
 
-    # Return the AI response
-    return chat if chat else "Failed to generate a response. Please try again."
+def chat_json_with_codegpt(user_message, schema=None, agent_id=None, timeout=None, call_type=None, use_cache=True):
+    # Streams the reply and stops it as soon as a JSON value matching schema
+    # has closed. Returns the parsed value, or None if the reply had none.
+    extractor = JSONExtractor(schema)
+    for _ in until_complete(stream_with_codegpt(user_message, agent_id, timeout, call_type, use_cache), extractor):
+        pass
+    value = extractor.finish()
+    if value is None:
+        print(f"Warning: Could not extract valid JSON from response: {extractor.text[:500]}")
+    return value
+
+async def achat_with_codegpt(user_message, agent_id=None, timeout=None, call_type=None, use_cache=True):
+    # The CodeGPT SDK is synchronous, so the call runs on a worker thread with
+    # the same retries, in-flight cap, caching and replay handling
+    return await asyncio.to_thread(chat_with_codegpt, user_message, agent_id, timeout, call_type, use_cache)
 
 if __name__ == "__main__":
     if len(sys.argv) > 1:
@@ -1,30 +1,28 @@
 import os
 import base64
 import ftplib
-import http.client
 import json
-import requests
+from modules import http_client
+from modules.replay import replayable
 from io import BytesIO
 from urllib.parse import urlparse
 from dotenv import load_dotenv
 
 def get_article_data(article_id, api_key):
     """Fetch article data from the API"""
-    conn = http.client.HTTPSConnection("fetch.ainewsbrew.com")
     headers = {
         'Content-Type': 'application/json',
         'X-API-KEY': api_key
     }
     
     print(f"\nFetching article {article_id} from API...")
-    conn.request("GET", f"/api/index_v5.php?mode=byIndex&index={article_id}", headers=headers)
-    res = conn.getresponse()
-    data = res.read()
+    res = http_client.get(f"https://fetch.ainewsbrew.com/api/index_v5.php?mode=byIndex&index={article_id}", headers=headers)
+    data = res.content
     
-    print(f"API Response Status: {res.status}")
+    print(f"API Response Status: {res.status_code}")
     decoded_data = data.decode('utf-8')
     
-    if res.status == 200:
+    if res.status_code == 200:
         try:
             json_data = json.loads(decoded_data)
             if json_data:
@@ -58,6 +56,7 @@ def base64_to_image(base64_string):
         print(f"Error decoding base64: {str(e)}")
         return None
 
+@replayable("ftp", key=lambda hostname, username, password, port, remote_dir, article_id, *args: [article_id])
 def upload_to_ftp(hostname, username, password, port, remote_dir, article_id, image_data, image_haiku):
     """Upload images to FTP server"""
     try:
@@ -116,8 +115,8 @@ def check_image_exists(article_id):
     haiku_url = f"https://fetch.ainewsbrew.com/images/{article_id}_haiku.jpg"
     
     try:
-        bg_response = requests.head(bg_url)
-        haiku_response = requests.head(haiku_url)
+        bg_response = http_client.head(bg_url)
+        haiku_response = http_client.head(haiku_url)
         
         bg_exists = bg_response.status_code == 200
         haiku_exists = haiku_response.status_code == 200
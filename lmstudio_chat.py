@@ -1,7 +1,15 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from lmstudio_config import LMSTUDIO_CONFIG, CHAT_PROFILES
-import json
-import re
+import asyncio
+from modules import http_client, llm_cache, replay
+from modules.json_stream import JSONExtractor, until_complete
+from modules.replay import replayable
+
+# Replies that report a failure rather than come from the model; never cached
+FAILURE_REPLIES = (
+    "Failed to generate a response. Please try again.",
+    "An error occurred while communicating with the AI."
+)
 
 class LMStudioChat:
     def __init__(self, profile="default"):
@@ -17,36 +25,19 @@ class LMStudioChat:
         if self.profile_config["output_format"] != "json":
             return response
 
-        # Try to find JSON in the response
-        try:
-            # First try to parse the entire response as JSON
-            json.loads(response)  # Validate JSON
+        # The first JSON value that has the profile's json_structure, wherever
+        # it sits in the reply (bare, in a code block or after chatter)
+        extractor = self.json_extractor()
+        extractor.feed(response)
+        if extractor.finish() is None:
+            print("Warning: Could not extract valid JSON from response")
             return response
-        except json.JSONDecodeError:
-            # If that fails, try to extract JSON from the response
-            try:
-                # Look for JSON between curly braces
-                json_match = re.search(r'\{[^{]*\}', response)
-                if json_match:
-                    json_str = json_match.group(0)
-                    json.loads(json_str)  # Validate JSON
-                    return json_str
-                
-                # Look for JSON in code blocks
-                code_block_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response, re.DOTALL)
-                if code_block_match:
-                    json_str = code_block_match.group(1)
-                    json.loads(json_str)  # Validate JSON
-                    return json_str
-                
-                # If no JSON found, return original response
-                print("Warning: Could not extract valid JSON from response")
-                return response
-            except json.JSONDecodeError:
-                print("Warning: Found JSON-like content but failed to parse it")
-                return response
-
-    def chat(self, user_message):
+        return extractor.raw
+
+    def json_extractor(self):
+        return JSONExtractor(self.profile_config.get("json_structure"))
+
+    def build_messages(self, user_message):
         messages = []
         
         # Add system prompt if it exists
@@ -61,33 +52,138 @@ class LMStudioChat:
             "role": "user",
             "content": user_message
         })
+        return messages
+
+    def _deltas(self, messages):
+        completion = self.client.chat.completions.create(
+            model=LMSTUDIO_CONFIG["default_model"],
+            messages=messages,
+            max_tokens=LMSTUDIO_CONFIG["max_tokens"],
+            stream=True
+        )
+        try:
+            for chunk in completion:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Closing early drops the connection so the model stops generating
+            completion.close()
+
+    def _cache_key(self, user_message):
+        return llm_cache.make_key("lmstudio", self.profile, LMSTUDIO_CONFIG["default_model"], user_message)
+
+    @replayable("lmstudio", key=lambda self, user_message, use_cache=True: [self.profile, user_message])
+    def chat(self, user_message, use_cache=True):
+        # Identical prompts to the same profile and model are answered from
+        # the LLM cache for as long as the profile's TTL allows
+        return llm_cache.cached_call(
+            "lmstudio", self.profile, LMSTUDIO_CONFIG["default_model"], user_message,
+            lambda: self._complete(user_message),
+            call_type=self.profile, use_cache=use_cache,
+            cacheable=self._cacheable
+        )
+
+    def _cacheable(self, reply):
+        if not reply or reply in FAILURE_REPLIES:
+            return False
+        return self.profile_config["output_format"] != "json" or llm_cache.is_json(reply)
+
+    def _complete(self, user_message):
+        messages = self.build_messages(user_message)
 
         try:
-            completion = self.client.chat.completions.create(
+            # Collect the AI response, stopping as soon as a JSON reply is complete
+            deltas = self._deltas(messages)
+            if self.profile_config["output_format"] == "json":
+                deltas = until_complete(deltas, self.json_extractor())
+            response = "".join(deltas)
+
+            # Clean up the response if needed
+            cleaned_response = self.sanitize_response(response)
+            return cleaned_response if cleaned_response else FAILURE_REPLIES[0]
+            
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return FAILURE_REPLIES[1]
+
+    def stream(self, user_message):
+        """
+        Yield the raw reply in pieces as the model produces them.
+
+        No JSON cleanup is applied. On a connection error the stream just
+        ends. In record/replay mode the whole (cleaned) reply is yielded once.
+        """
+        if replay.enabled():
+            yield self.chat(user_message)
+            return
+        try:
+            yield from self._deltas(self.build_messages(user_message))
+        except Exception as e:
+            print(f"An error occurred: {e}")
+
+    async def achat(self, user_message, use_cache=True):
+        """Async counterpart of chat() with the same cleanup, caching and error handling"""
+        if replay.enabled():
+            # Fixtures are recorded and served by the synchronous path
+            return await asyncio.to_thread(self.chat, user_message)
+
+        caching = llm_cache.active(use_cache, self.profile)
+        if caching:
+            cached = llm_cache.lookup(self._cache_key(user_message), "lmstudio")
+            if cached is not None:
+                return cached
+
+        # The pooled async HTTP client is shared per event loop
+        client = AsyncOpenAI(
+            base_url=LMSTUDIO_CONFIG["base_url"],
+            api_key=LMSTUDIO_CONFIG["api_key"],
+            http_client=http_client.get_async_client()
+        )
+        try:
+            completion = await client.chat.completions.create(
                 model=LMSTUDIO_CONFIG["default_model"],
-                messages=messages,
+                messages=self.build_messages(user_message),
                 max_tokens=LMSTUDIO_CONFIG["max_tokens"],
                 stream=True
             )
 
-            # Collect the AI response
+            # Collect the AI response, stopping as soon as a JSON reply is complete
+            extractor = self.json_extractor() if self.profile_config["output_format"] == "json" else None
             response = ""
-            for chunk in completion:
-                if chunk.choices[0].delta.content:
-                    response += chunk.choices[0].delta.content
+            try:
+                async for chunk in completion:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        response += chunk.choices[0].delta.content
+                        if extractor is not None and extractor.feed(chunk.choices[0].delta.content):
+                            break
+            finally:
+                await completion.close()
 
             # Clean up the response if needed
             cleaned_response = self.sanitize_response(response)
-            return cleaned_response if cleaned_response else "Failed to generate a response. Please try again."
-            
+            if not cleaned_response:
+                return FAILURE_REPLIES[0]
+            if caching and self._cacheable(cleaned_response):
+                llm_cache.store(self._cache_key(user_message), cleaned_response,
+                                llm_cache.get_ttl(self.profile), "lmstudio", self.profile)
+            return cleaned_response
+
         except Exception as e:
             print(f"An error occurred: {e}")
-            return "An error occurred while communicating with the AI."
+            return FAILURE_REPLIES[1]
 
 def chat_with_profile(profile, user_message):
     chat = LMStudioChat(profile)
     return chat.chat(user_message)
 
+def stream_with_profile(profile, user_message):
+    chat = LMStudioChat(profile)
+    yield from chat.stream(user_message)
+
+async def achat_with_profile(profile, user_message):
+    chat = LMStudioChat(profile)
+    return await chat.achat(user_message)
+
 if __name__ == "__main__":
     import sys
     
@@ -64,15 +64,28 @@ Do not:
 - Categorize the topic into an appropriate news category
 - Identify the main subject or focus of the headlines
 - ONLY RETURN JSON OUTPUT
-- Consider the sources and assess numerical bias (-1 (far left) to 1 (far right))
-+ - Return bias as a single numerical value between -1 and 1
-+ - Format must be exactly: {"category": "string", "subject": "string", "bias": number}
-+ - Example: {"category": "Technology", "subject": "AI Development", "bias": 0.2}""",
+- Format must be exactly: {"category": "string", "subject": "string"}
+- Example: {"category": "Technology", "subject": "AI Development"}""",
         "output_format": "json",
         "json_structure": {
             "category": "Category name",
-            "subject": "Main subject or focus",
-            "bias": 0.0
+            "subject": "Main subject or focus"
         }
+    },
+
+    "headline_batch_reviewer": {
+        "system_prompt": """Analyze several numbered clusters of headlines and, for each cluster, determine:
+- The common topic or theme
+- Categorize the topic into an appropriate news category
+- Identify the main subject or focus of the headlines
+- ONLY RETURN JSON OUTPUT
+- Format must be exactly one array entry per cluster, in order: [{"cluster": 1, "category": "string", "subject": "string"}]
+- Example: [{"cluster": 1, "category": "Technology", "subject": "AI Development"}]""",
+        "output_format": "json",
+        "json_structure": [{
+            "cluster": 1,
+            "category": "Category name",
+            "subject": "Main subject or focus"
+        }]
     }
 } 
\ No newline at end of file
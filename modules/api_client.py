@@ -1,16 +1,23 @@
 """API interaction functions"""
 import os
-import requests
 import json
-import urllib3
 from dotenv import load_dotenv
 import time
+from concurrent.futures import ThreadPoolExecutor
+from . import news_cache
+from . import news_stream
+from . import http_client
+from . import article_store
 
 load_dotenv()
 API_KEY = os.environ.get("NEWSCATCHER_API_KEY")
 
-def get_news_data(search_type, query="", when="24h"):
-    """Fetch news data from NewsCatcher API"""
+# 4 concurrent pages of 200 cover the same 800 articles as one page_size=800 call.
+# NewsCatcher clusters each page on its own; recluster joins the split stories.
+HEADLINE_PAGING = {"page_size": 200, "max_pages": 4}
+
+def build_news_request(search_type, query="", when="24h"):
+    """Return the (url, params) pair for a NewsCatcher search"""
     time_mapping = {
         "1h": "1h", "3h": "3h", "4h": "4h", "6h": "6h", "12h": "12h",
         "24h": "1d", "2d": "2d", "3d": "3d", "5d": "5d", "7d": "7d"
@@ -40,23 +47,159 @@ def get_news_data(search_type, query="", when="24h"):
             "clustering_enabled": "true",
             "page_size": "100"
         }
+    return url, params
 
+def _news_fetcher(search_type, query="", when="24h"):
+    """Return the (cache_key, fetch) pair for a NewsCatcher search"""
+    url, params = build_news_request(search_type, query, when)
     headers = {"x-api-token": API_KEY}
-    
-    try:
-        response = requests.get(url, params=params, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        print(f"Error fetching news: {str(e)}")  # Log the error
+
+    def fetch():
+        try:
+            if search_type == "Headlines":
+                # The 800-article headline window is fetched as concurrent pages
+                data = news_stream.collect_news_clusters(url, params, headers, **HEADLINE_PAGING)
+            else:
+                response = http_client.get(url, params=params, headers=headers)
+                response.raise_for_status()
+                data = response.json()
+        except Exception as e:
+            print(f"Error fetching news: {str(e)}")  # Log the error
+            return None
+        article_store.ingest_news_data(data, search_type, query, when)
+        return data
+
+    return news_cache.make_cache_key(search_type, query, when, params), fetch
+
+def get_news_data(search_type, query="", when="24h", use_cache=True):
+    """Fetch news data from NewsCatcher API, served from the on-disk cache when fresh"""
+    key, fetch = _news_fetcher(search_type, query, when)
+    if not use_cache:
+        return fetch()
+    return news_cache.cached_fetch(key, news_cache.get_ttl(when), fetch)
+
+def refresh_news_data(search_type, query="", when="24h", ttl=None, prepare=None):
+    """
+    Fetch a search now and publish it to the shared cache entry get_news_data reads.
+
+    prepare, if given, post-processes the response before it is stored. ttl
+    overrides the window's default freshness for the stored entry. Returns
+    the stored data, or None if the fetch failed (the old entry is kept).
+    """
+    key, fetch = _news_fetcher(search_type, query, when)
+    data = fetch()
+    if data is None:
         return None
+    if prepare:
+        data = prepare(data)
+    news_cache.save_cached_response(key, data, ttl=ttl)
+    return data
+
+def merge_news_results(results, overlap_threshold=0.5):
+    """
+    Merge several API responses into one deduplicated cluster set.
+
+    results is a list of ((query, when), news_data) pairs. Clusters whose article
+    links overlap by at least overlap_threshold of the smaller cluster are folded
+    together; articles are deduplicated by link. Every merged cluster carries a
+    `provenance` list of the queries and windows it was found by.
+    """
+    merged = []
+    link_owner = {}
+    total_hits = 0
+
+    for (query, when), news_data in results:
+        if not news_data:
+            continue
+        total_hits += int(news_data.get('total_hits') or 0)
+        for cluster in news_data.get('clusters', []):
+            articles = cluster.get('articles', [])
+            links = {a.get('link') for a in articles if a.get('link')}
+            source = {"query": query, "when": when, "cluster_id": cluster.get('cluster_id')}
+
+            # Count shared links per existing merged cluster
+            overlaps = {}
+            for link in links:
+                owner = link_owner.get(link)
+                if owner is not None:
+                    overlaps[owner] = overlaps.get(owner, 0) + 1
+
+            index = None
+            if overlaps:
+                best, shared = max(overlaps.items(), key=lambda item: item[1])
+                smaller = min(len(links), len(merged[best]['_links'])) or 1
+                if shared / smaller >= overlap_threshold:
+                    index = best
+
+            if index is None:
+                merged.append(dict(cluster, articles=[], provenance=[], _links=set()))
+                # Precomputed stats no longer hold once other queries fold in
+                merged[-1].pop('summary', None)
+                index = len(merged) - 1
+            target = merged[index]
+            target['provenance'].append(source)
+
+            for article in articles:
+                link = article.get('link')
+                if link and link in target['_links']:
+                    continue
+                target['articles'].append(article)
+                if link:
+                    target['_links'].add(link)
+                    link_owner.setdefault(link, index)
+
+    for cluster in merged:
+        del cluster['_links']
+        cluster['cluster_size'] = len(cluster['articles'])
+
+    return {
+        "status": "ok",
+        "total_hits": total_hits,
+        "clusters_count": len(merged),
+        "clusters": merged
+    }
 
-def fetch_latest_headlines():
-    """Fetch all headlines from the API"""
+def get_news_data_multi(queries, windows=("24h",), max_workers=4, use_cache=True):
+    """
+    Run several topic searches concurrently and merge them with provenance.
+
+    Every (query, window) pair is fetched through get_news_data, so cached
+    pairs return instantly and only the misses hit the API. Total wall time is
+    roughly one round trip instead of one per query.
+    """
+    seen = set()
+    jobs = []
+    for query in queries:
+        query = (query or "").strip()
+        if not query:
+            continue
+        for when in windows:
+            key = (news_cache.normalize_query(query), when)
+            if key not in seen:
+                seen.add(key)
+                jobs.append((query, when))
+
+    if not jobs:
+        return None
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as executor:
+        responses = list(executor.map(
+            lambda job: get_news_data("Topic", query=job[0], when=job[1], use_cache=use_cache),
+            jobs
+        ))
+
+    if not any(responses):
+        return None
+    return merge_news_results(list(zip(jobs, responses)))
+
+def fetch_latest_headlines(since_id=None):
+    """
+    Fetch published headlines from the API, optionally only those newer than since_id.
+
+    Returns None if the request failed, so callers can tell it from an empty result.
+    """
     try:
         api_key = os.environ.get("PUBLISH_API_KEY")
-        http = urllib3.PoolManager()
-        
         headers = {
             "X-API-KEY": api_key,
             "Accept": "application/json",
@@ -68,15 +211,33 @@ def fetch_latest_headlines():
         
         timestamp = int(time.time() * 1000)
         url = f"https://fetch.ainewsbrew.com/api/index_v5.php?mode=latest&timestamp={timestamp}"
+        if since_id:
+            url += f"&since_id={int(since_id)}"
         
-        response = http.request(
-            'GET',
-            url,
-            headers=headers
-        )
+        response = http_client.get(url, headers=headers)
         
-        return json.loads(response.data.decode('utf-8')) if response.status == 200 else []
+        if response.status_code != 200:
+            print(f"Error fetching headlines: HTTP {response.status_code}")
+            return None
+        return json.loads(response.content.decode('utf-8'))
         
     except Exception as e:
         print(f"Error fetching headlines: {str(e)}")
-        return []
\ No newline at end of file
+        return None
+
+def fetch_cited_bias():
+    """Fetch the bias score and cited source links of every published article"""
+    try:
+        headers = {
+            "X-API-KEY": os.environ.get("PUBLISH_API_KEY"),
+            "Accept": "application/json",
+            "Cache-Control": "no-cache, no-store, must-revalidate"
+        }
+        url = "https://fetch.ainewsbrew.com/api/index_v5.php?mode=citedBias"
+        response = http_client.get(url, headers=headers)
+        
+        return json.loads(response.content.decode('utf-8')) if response.status_code == 200 else []
+        
+    except Exception as e:
+        print(f"Error fetching cited bias: {str(e)}")
+        return []
@@ -0,0 +1,366 @@
+"""Local SQLite/FTS5 warehouse of every NewsCatcher article we ingest"""
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+DB_PATH = os.environ.get(
+    "ARTICLE_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "articles.db")
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    link TEXT NOT NULL UNIQUE,
+    title TEXT,
+    content TEXT,
+    name_source TEXT,
+    published_date TEXT,
+    cluster_key TEXT,
+    first_seen REAL,
+    last_seen REAL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_published ON articles(published_date);
+CREATE INDEX IF NOT EXISTS idx_articles_title ON articles(title);
+
+CREATE TABLE IF NOT EXISTS clusters (
+    cluster_key TEXT PRIMARY KEY,
+    cluster_id TEXT,
+    search_type TEXT,
+    query TEXT,
+    time_window TEXT,
+    article_count INTEGER,
+    first_seen REAL,
+    last_seen REAL
+);
+
+CREATE TABLE IF NOT EXISTS cluster_articles (
+    cluster_key TEXT NOT NULL,
+    article_id INTEGER NOT NULL,
+    PRIMARY KEY (cluster_key, article_id)
+);
+
+CREATE TABLE IF NOT EXISTS cluster_analysis (
+    cluster_key TEXT PRIMARY KEY,
+    category TEXT,
+    subject TEXT,
+    bias REAL,
+    article_count INTEGER,
+    analyzed_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS cluster_analysis_links (
+    cluster_key TEXT NOT NULL,
+    link TEXT NOT NULL,
+    PRIMARY KEY (cluster_key, link)
+);
+CREATE INDEX IF NOT EXISTS idx_analysis_links_link ON cluster_analysis_links(link);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, content, content='articles', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE OF title, content ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    INSERT INTO articles_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+"""
+
+# A cluster that gained or lost at most this many articles since it was
+# analyzed reuses the earlier analysis
+ANALYSIS_MAX_CHANGES = 2
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_state = {'initialized': False, 'fts': True}
+
+def _connect() -> sqlite3.Connection:
+    """Return this thread's connection, creating the schema on first use"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        return conn
+
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+    with _init_lock:
+        if not _state['initialized']:
+            conn.executescript(SCHEMA)
+            try:
+                conn.executescript(FTS_SCHEMA)
+            except sqlite3.OperationalError as e:
+                # SQLite built without FTS5; searches fall back to LIKE
+                print(f"FTS5 unavailable, using plain text search: {str(e)}")
+                _state['fts'] = False
+            conn.commit()
+            _state['initialized'] = True
+
+    _local.conn = conn
+    return conn
+
+def _cluster_links(cluster: Dict[str, Any]) -> set:
+    return {a.get('link') for a in cluster.get('articles', []) if a.get('link')}
+
+def cluster_fingerprint(cluster: Dict[str, Any]) -> str:
+    """Stable key for a cluster: a hash of its sorted non-empty article links"""
+    links = sorted(_cluster_links(cluster))
+    return hashlib.sha1("\n".join(links).encode('utf-8')).hexdigest()
+
+def ingest_clusters(clusters: Iterable[Dict[str, Any]], search_type: str = "",
+                    query: str = "", when: str = "") -> int:
+    """Upsert the articles of each cluster and record cluster membership"""
+    conn = _connect()
+    now = time.time()
+    count = 0
+    with conn:
+        for cluster in clusters:
+            articles = [a for a in cluster.get('articles', []) if a.get('link')]
+            if not articles:
+                continue
+            cluster_key = cluster_fingerprint(cluster)
+            conn.execute(
+                """INSERT INTO clusters (cluster_key, cluster_id, search_type, query, time_window,
+                                         article_count, first_seen, last_seen)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(cluster_key) DO UPDATE SET last_seen = excluded.last_seen""",
+                (cluster_key, str(cluster.get('cluster_id', '')), search_type, query, when,
+                 len(articles), now, now)
+            )
+            for article in articles:
+                # No RETURNING here: it needs SQLite 3.35, newer than some
+                # distributions ship, so the id is looked up afterwards
+                conn.execute(
+                    """INSERT INTO articles (link, title, content, name_source, published_date,
+                                             cluster_key, first_seen, last_seen)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT(link) DO UPDATE SET
+                           title = excluded.title,
+                           content = COALESCE(NULLIF(excluded.content, ''), articles.content),
+                           name_source = excluded.name_source,
+                           published_date = excluded.published_date,
+                           cluster_key = excluded.cluster_key,
+                           last_seen = excluded.last_seen""",
+                    (article['link'], article.get('title', ''), article.get('content', ''),
+                     article.get('name_source', ''), article.get('published_date', ''),
+                     cluster_key, now, now)
+                )
+                row = conn.execute("SELECT id FROM articles WHERE link = ?",
+                                   (article['link'],)).fetchone()
+                conn.execute(
+                    "INSERT OR IGNORE INTO cluster_articles (cluster_key, article_id) VALUES (?, ?)",
+                    (cluster_key, row['id'])
+                )
+                count += 1
+    return count
+
+def ingest_news_data(news_data: Optional[Dict[str, Any]], search_type: str = "",
+                     query: str = "", when: str = "") -> int:
+    """Sink for a full API response; never raises so ingestion can't break a search"""
+    if not news_data:
+        return 0
+    try:
+        return ingest_clusters(news_data.get('clusters', []), search_type, query, when)
+    except Exception as e:
+        print(f"Error storing articles: {str(e)}")
+        return 0
+
+def _fts_query(text: str) -> str:
+    """Quote each term so user input can't be parsed as FTS5 syntax"""
+    terms = [t.replace('"', '""') for t in text.replace(',', ' ').split()]
+    return " ".join(f'"{t}"' for t in terms if t)
+
+def search_articles(text: str, since: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    Full-text search over stored titles and content, best match first.
+
+    `since` is a published_date lower bound in NewsCatcher's
+    'YYYY-MM-DD HH:MM:SS' format.
+    """
+    conn = _connect()
+    match = _fts_query(text)
+    if not match:
+        return []
+    since = since or ""
+
+    if _state['fts']:
+        rows = conn.execute(
+            """SELECT a.id, a.link, a.title, a.name_source, a.published_date, a.cluster_key
+               FROM articles_fts f JOIN articles a ON a.id = f.rowid
+               WHERE articles_fts MATCH ? AND a.published_date >= ?
+               ORDER BY bm25(articles_fts, 5.0, 1.0)
+               LIMIT ?""",
+            (match, since, limit)
+        ).fetchall()
+    else:
+        like = f"%{text}%"
+        rows = conn.execute(
+            """SELECT id, link, title, name_source, published_date, cluster_key
+               FROM articles
+               WHERE (title LIKE ? OR content LIKE ?) AND published_date >= ?
+               ORDER BY published_date DESC
+               LIMIT ?""",
+            (like, like, since, limit)
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+def recent_articles(since: str, limit: int = 500) -> List[Dict[str, Any]]:
+    """Articles published at or after `since`, newest first"""
+    rows = _connect().execute(
+        """SELECT id, link, title, name_source, published_date, cluster_key
+           FROM articles WHERE published_date >= ?
+           ORDER BY published_date DESC LIMIT ?""",
+        (since, limit)
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+def get_article_content(link: str) -> Optional[str]:
+    """Stored body for an article link, or None if we have never seen it"""
+    row = _connect().execute("SELECT content FROM articles WHERE link = ?", (link,)).fetchone()
+    return row['content'] if row else None
+
+def missing_links(links: Iterable[str]) -> set:
+    """Subset of links that have not been ingested yet"""
+    links = [link for link in set(links) if link]
+    if not links:
+        return set()
+    conn = _connect()
+    found = set()
+    # Stay well under SQLite's bound-parameter limit
+    for i in range(0, len(links), 500):
+        chunk = links[i:i + 500]
+        placeholders = ",".join("?" * len(chunk))
+        rows = conn.execute(f"SELECT link FROM articles WHERE link IN ({placeholders})", chunk).fetchall()
+        found.update(row['link'] for row in rows)
+    return set(links) - found
+
+def article_exists(link: str) -> bool:
+    """True if this link has already been ingested"""
+    return _connect().execute("SELECT 1 FROM articles WHERE link = ?", (link,)).fetchone() is not None
+
+def find_by_title(title: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Articles whose title matches exactly, for quick duplicate checks"""
+    rows = _connect().execute(
+        """SELECT id, link, title, name_source, published_date, cluster_key
+           FROM articles WHERE title = ? ORDER BY published_date DESC LIMIT ?""",
+        (title, limit)
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+def get_cluster_articles(cluster_key: str) -> List[Dict[str, Any]]:
+    """All stored articles that were seen in a given cluster"""
+    rows = _connect().execute(
+        """SELECT a.id, a.link, a.title, a.name_source, a.published_date
+           FROM cluster_articles ca JOIN articles a ON a.id = ca.article_id
+           WHERE ca.cluster_key = ? ORDER BY a.published_date DESC""",
+        (cluster_key,)
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+def _find_cluster_analysis(cluster: Dict[str, Any], max_changes: int) -> Optional[Dict[str, Any]]:
+    conn = _connect()
+    cluster_key = cluster_fingerprint(cluster)
+    row = conn.execute(
+        "SELECT cluster_key, category, subject, bias FROM cluster_analysis WHERE cluster_key = ?",
+        (cluster_key,)
+    ).fetchone()
+    if row:
+        return dict(row, exact=True)
+
+    links = list(_cluster_links(cluster))
+    if not max_changes or not links:
+        return None
+
+    shared: Dict[str, int] = {}
+    for i in range(0, len(links), 500):
+        chunk = links[i:i + 500]
+        placeholders = ",".join("?" * len(chunk))
+        for candidate in conn.execute(
+            f"""SELECT cluster_key, COUNT(*) AS shared FROM cluster_analysis_links
+                WHERE link IN ({placeholders}) GROUP BY cluster_key""",
+            chunk
+        ):
+            shared[candidate['cluster_key']] = shared.get(candidate['cluster_key'], 0) + candidate['shared']
+    if not shared:
+        return None
+
+    best_key, best_shared = max(shared.items(), key=lambda item: item[1])
+    if len(links) - best_shared > max_changes or best_shared * 2 <= len(links):
+        return None
+    row = conn.execute(
+        "SELECT cluster_key, category, subject, bias, article_count FROM cluster_analysis WHERE cluster_key = ?",
+        (best_key,)
+    ).fetchone()
+    if not row or row['article_count'] - best_shared > max_changes:
+        return None
+    return {'cluster_key': row['cluster_key'], 'category': row['category'],
+            'subject': row['subject'], 'bias': row['bias'], 'exact': False}
+
+def get_cluster_analysis(cluster: Dict[str, Any],
+                         max_changes: int = ANALYSIS_MAX_CHANGES) -> Optional[Dict[str, Any]]:
+    """
+    Stored {category, subject, bias} for a cluster, or None.
+
+    An exact fingerprint match is tried first. Failing that, the analyzed
+    cluster sharing the most links is reused if the two differ by at most
+    max_changes articles on each side and share a majority of links.
+    """
+    try:
+        return _find_cluster_analysis(cluster, max_changes)
+    except sqlite3.Error as e:
+        print(f"Error reading cluster analysis: {str(e)}")
+        return None
+
+def save_cluster_analysis(cluster: Dict[str, Any], analysis: Dict[str, Any]) -> None:
+    """Remember a cluster's category, subject and bias under its fingerprint"""
+    try:
+        _store_cluster_analysis(cluster, analysis)
+    except sqlite3.Error as e:
+        print(f"Error storing cluster analysis: {str(e)}")
+
+def _store_cluster_analysis(cluster: Dict[str, Any], analysis: Dict[str, Any]) -> None:
+    links = _cluster_links(cluster)
+    if not links:
+        return
+    cluster_key = cluster_fingerprint(cluster)
+    conn = _connect()
+    with conn:
+        conn.execute(
+            """INSERT OR REPLACE INTO cluster_analysis
+                   (cluster_key, category, subject, bias, article_count, analyzed_at)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (cluster_key, analysis.get('category'), analysis.get('subject'),
+             analysis.get('bias'), len(links), time.time())
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO cluster_analysis_links (cluster_key, link) VALUES (?, ?)",
+            [(cluster_key, link) for link in links]
+        )
+
+def link_sources(links: Iterable[str]) -> Dict[str, str]:
+    """Source name of each stored article link; unknown links are left out"""
+    links = [link for link in set(links) if link]
+    conn = _connect()
+    sources = {}
+    # Stay well under SQLite's bound-parameter limit
+    for i in range(0, len(links), 500):
+        chunk = links[i:i + 500]
+        placeholders = ",".join("?" * len(chunk))
+        rows = conn.execute(
+            f"SELECT link, name_source FROM articles WHERE link IN ({placeholders}) AND name_source != ''",
+            chunk
+        ).fetchall()
+        sources.update((row['link'], row['name_source']) for row in rows)
+    return sources
@@ -4,12 +4,16 @@ from .display import get_bias_color
 from .article_evaluation import evaluate_article_with_ai
 from publish_utils import publish_article, generate_and_encode_images, search_historical_articles
 from .utils import reset_article_state
+from .state import stop_cluster_loader
 from .unified_haiku_image_generator import generate_haiku_images
 from .bluesky_publish import publish_to_bluesky
-from .keyword_optimizer import optimize_headline_keywords
-from .api_client import get_news_data
+from .keyword_optimizer import optimize_headline_keywords, generate_query_variants
+from .api_client import get_news_data_multi
+from .headline_mirror import request_refresh as refresh_headline_mirror
+from .streaming import HISTORICAL_STORY_FIELDS, render_json_stream
+from .tokens import count_tokens, allocate_budget, fit_records, prompt_limit, take_within_budget, trim_to_tokens
 from modules.instagram_publish import InstagramPublisher
-from chat_codegpt import chat_with_codegpt
+from chat_codegpt import chat_with_codegpt, stream_with_codegpt
 import json
 import os
 import base64
@@ -17,6 +21,21 @@ import requests
 import urllib.parse
 from datetime import datetime
 
+def article_sources():
+    """
+    The sources the current article cites, as dicts with source_id, name_source, title and link.
+
+    Articles list the sources their prompt was given; older ones fall back to
+    the first eight cluster articles in order.
+    """
+    article_data = st.session_state.get('article_data') or {}
+    if article_data.get('sources'):
+        return article_data['sources']
+    cluster = st.session_state.get('selected_cluster') or {}
+    return [dict(source_id=i, name_source=article.get('name_source', ''), title=article.get('title', ''),
+                 link=article.get('link', ''))
+            for i, article in enumerate(cluster.get('articles', [])[:8], 1)]
+
 def create_step_header(headline, buttons):
     """Create consistent header with headline and action buttons"""
     # Format the headline string with proper HTML escaping
@@ -155,7 +174,7 @@ def display_article_step():
     
     # Create hidden source data elements
     source_data_html = ""
-    for article in st.session_state.selected_cluster['articles']:
+    for article in article_sources():
         source_id = article.get('source_id', '')
         if source_id:
             source_data_html += f"""
@@ -470,16 +489,29 @@ def display_article_step():
                             except json.JSONDecodeError:
                                 search_keywords = search_keywords.strip()
                         
+                        # The topic the research started from; 'topic' is replaced by the
+                        # keywords below, so it is captured once under its own key
+                        if not st.session_state.get('research_topic'):
+                            subject = st.session_state.selected_cluster.get('subject', '')
+                            st.session_state.research_topic = (
+                                st.session_state.get('topic') or (subject if subject != 'Unknown' else '')
+                            )
+                        
+                        # Search the keywords, the original topic and synonym variants together
+                        search_queries = [search_keywords, st.session_state.research_topic]
+                        search_queries += generate_query_variants(search_keywords)
+                        
                         st.session_state.topic = search_keywords
                         st.session_state.last_topic = search_keywords
                         st.session_state.time_range = selected_time
                         
+                        stop_cluster_loader()
                         for key in list(st.session_state.keys()):
-                            if key not in ['topic', 'time_range', 'last_topic']:
+                            if key not in ['topic', 'research_topic', 'time_range', 'last_topic', 'show_debug', 'story_tracker']:
                                 del st.session_state[key]
                         
                         with st.spinner("Fetching news..."):
-                            news_data = get_news_data("Topic", query=search_keywords, when=selected_time)
+                            news_data = get_news_data_multi(search_queries, windows=(selected_time,))
                             if news_data and 'clusters' in news_data:
                                 st.session_state.news_data = news_data
                                 st.session_state.is_loading_clusters = True
@@ -603,14 +635,13 @@ def display_article_step():
                 total_tokens = 0
                 if 'articles' in results and results['articles']:
                     for article in results['articles']:
-                        # Estimate tokens (rough estimate: 1 token ≈ 4 characters)
-                        headline_tokens = len(article.get('AIHeadline', '')) // 4
-                        story_tokens = len(article.get('AIStory', '')) // 4
-                        date_tokens = 10  # Date typically uses about 10 tokens
-                        total_tokens += headline_tokens + story_tokens + date_tokens
+                        total_tokens += (count_tokens(article.get('AIHeadline', ''))
+                                         + count_tokens(article.get('AIStory', ''))
+                                         + count_tokens(article.get('Published', '')))
 
                 # Display results summary with token count
-                st.info(f"Found {total_results} matching articles. Estimated token count for analysis: {total_tokens:,}")
+                st.info(f"Found {total_results} matching articles. Token count for analysis: {total_tokens:,} "
+                        f"(prompts are trimmed to {prompt_limit('codegpt'):,})")
                 
                 # Add AI Discussion section
                 st.markdown("### AI Discussion")
@@ -684,7 +715,8 @@ def display_article_step():
                             story_data = generate_historical_story(
                                 st.session_state.article_data,
                                 results.get('articles', []),
-                                st.session_state.historical_discussion_message
+                                st.session_state.historical_discussion_message,
+                                stream_to=st.container()
                             )
                             
                             if story_data and isinstance(story_data, dict):
@@ -723,7 +755,7 @@ def display_article_step():
     
     # Add source reference section
     st.markdown("### Sources")
-    for article in st.session_state.selected_cluster['articles']:
+    for article in article_sources():
         source_id = article.get('source_id', '')
         if source_id:
             st.markdown(f"""
@@ -739,14 +771,8 @@ def review_article(article_data):
         st.error("No article data available for review")
         return None
     
-    # Format citations from source articles
-    if st.session_state.selected_cluster:
-        sources = []
-        for i, article in enumerate(st.session_state.selected_cluster['articles'][:8], 1):
-            sources.append([i, article['link']])
-        cited = json.dumps(sources)
-    else:
-        cited = "[]"
+    # Format citations from the sources the story was written from
+    cited = json.dumps([[source['source_id'], source['link']] for source in article_sources()])
         
     article = {
         'ID': 'DRAFT',
@@ -829,10 +855,8 @@ def display_review_step():
     trend_score = st.session_state.evaluation.get('trend', 0.0)
     
     def continue_to_image():
-        # Format citations
-        sources = []
-        for i, article in enumerate(st.session_state.selected_cluster['articles'][:8], 1):
-            sources.append([i, article['link']])
+        # Format citations from the sources the story was written from
+        sources = [[source['source_id'], source['link']] for source in article_sources()]
         
         # Create publish data
         bias_mapping = {
@@ -1331,7 +1355,8 @@ def display_image_step():
                 headline,
                 article_date,
                 None,  # Don't reuse previous prompt when regenerating
-                feedback
+                feedback,
+                use_cache=False  # Nor a cached one for the same request
             )
             
             if standard_image and bluesky_image:
@@ -1625,6 +1650,7 @@ def display_final_review():
             if article_id:
                 st.session_state.publication_success = True
                 st.session_state.published_article_id = article_id
+                refresh_headline_mirror()
                 st.session_state.published_article_url = f"https://ainewsbrew.com/article/{article_id}"
                 st.success(f"""Article published successfully! 
                     \nID: {article_id}
@@ -1964,44 +1990,53 @@ def discuss_historical_articles(current_article, historical_articles, user_messa
             raise ValueError("No valid historical articles found for discussion")
 
         # Create prompt for AI discussion
-        prompt = f"""
-        You are analyzing a CURRENT ARTICLE in the context of historical coverage on similar topics.  Your job is to take into account both the included context and recent events and insights from your understanding of the past around similar topics.  Your feedback should be insightful and forward thinking.  You should look to offer an AI's insight into what the outcomes of these predictions might be and impacts.
-        Today's Date: {current_date}
+        def build_prompt(story, historical_data):
+            return f"""
+            You are analyzing a CURRENT ARTICLE in the context of historical coverage on similar topics.  Your job is to take into account both the included context and recent events and insights from your understanding of the past around similar topics.  Your feedback should be insightful and forward thinking.  You should look to offer an AI's insight into what the outcomes of these predictions might be and impacts.
+            Today's Date: {current_date}
         
-        CURRENT ARTICLE UNDER ANALYSIS:
-        ==============================
-        Title: {current_article.get('headline', '')}
+            CURRENT ARTICLE UNDER ANALYSIS:
+            ==============================
+            Title: {current_article.get('headline', '')}
         
-        Content:
-        {current_article.get('story', '')}
-        ==============================
+            Content:
+            {story}
+            ==============================
 
-        HISTORICAL CONTEXT:
-        The following {len(historical_data)} articles provide historical context for analysis.
-        Note: Consider the temporal distance between these articles and today ({current_date}):
-        {json.dumps(historical_data, indent=2)}
+            HISTORICAL CONTEXT:
+            The following {len(historical_data)} articles provide historical context for analysis.
+            Note: Consider the temporal distance between these articles and today ({current_date}):
+            {json.dumps(historical_data, indent=2)}
 
-        USER QUESTION:
-        {user_message}
+            USER QUESTION:
+            {user_message}
 
-        RESPONSE FORMAT:
-        The AI should respond to the user conversationally (with a conversational tone) as an assistance exploring the subject with the user  while considering:
-        - Deep understanding of the historical context
-        - Relevance to the current article's focus
-        - Temporal relationships between events
-        - Significant patterns or anomalies
-        - Potential implications and outcomes - provide a probability assessment score to a potential outcome (and give impact assessment)
-        - Nuetral bias and objective analysis - allowed to speak bluntly and candidly to some aspects as long as the perspective is mentioned.
+            RESPONSE FORMAT:
+            The AI should respond to the user conversationally (with a conversational tone) as an assistance exploring the subject with the user  while considering:
+            - Deep understanding of the historical context
+            - Relevance to the current article's focus
+            - Temporal relationships between events
+            - Significant patterns or anomalies
+            - Potential implications and outcomes - provide a probability assessment score to a potential outcome (and give impact assessment)
+            - Nuetral bias and objective analysis - allowed to speak bluntly and candidly to some aspects as long as the perspective is mentioned.
         
-        Guidelines:
-        - Respond in whatever format best serves the query
-        - Use natural organizational patterns rather than forced sections
-        - Maintain professional but engaging tone
-        - Integrate historical insights organically
-        - Focus on substance over rigid structure
-        - Allow the analysis to dictate the format
-        - Prioritize clarity and insightfulness
-        """
+            Guidelines:
+            - Respond in whatever format best serves the query
+            - Use natural organizational patterns rather than forced sections
+            - Maintain professional but engaging tone
+            - Integrate historical insights organically
+            - Focus on substance over rigid structure
+            - Allow the analysis to dictate the format
+            - Prioritize clarity and insightfulness
+            """
+
+        # The current story gets up to half of what the prompt leaves and the
+        # historical articles fill the rest, most relevant first
+        room = prompt_limit("codegpt") - count_tokens(build_prompt('', []))
+        story = trim_to_tokens(current_article.get('story', ''), room // 2)
+        historical_data = take_within_budget(historical_data, room - count_tokens(story),
+                                             render=lambda item: json.dumps(item, indent=2))
+        prompt = build_prompt(story, historical_data)
 
         # Get AI response
         response = chat_with_codegpt(prompt)
@@ -2023,8 +2058,13 @@ def discuss_historical_articles(current_article, historical_articles, user_messa
         st.exception(e)
         return None
 
-def generate_historical_story(current_article, historical_articles, user_message):
-    """Generate a new story incorporating historical context"""
+def generate_historical_story(current_article, historical_articles, user_message, stream_to=None):
+    """
+    Generate a new story incorporating historical context.
+
+    With a Streamlit container as stream_to, the story is drawn into it while
+    the reply streams in.
+    """
     try:
         if not current_article or not historical_articles:
             raise ValueError("Missing required article data for story generation")
@@ -2057,13 +2097,11 @@ def generate_historical_story(current_article, historical_articles, user_message
 
         # Collect all citations
         citations = []
-        # Add current article citations
-        if st.session_state.selected_cluster and 'articles' in st.session_state.selected_cluster:
-            for i, article in enumerate(st.session_state.selected_cluster['articles'], 1):
-                citations.append([i, article['link']])
+        # Add current article citations, numbered as the current story cites them
+        citations.extend([source['source_id'], source['link']] for source in article_sources())
         
         # Add historical article citations
-        start_idx = len(citations) + 1
+        start_idx = max((source_id for source_id, _ in citations), default=0) + 1
         for i, article in enumerate(historical_articles, start_idx):
             if 'link' in article:
                 citations.append([i, article['link']])
@@ -2095,64 +2133,79 @@ def generate_historical_story(current_article, historical_articles, user_message
         """
 
         # Create prompt for story generation
-        prompt = f"""
-        You are giving an AI research journalist's perspective on a news topic that incorporates both current events and recent historical context. You job is to understand the user's question and provide a comprehensive and engaging story that incorporates both the current events and the historical context.  
-        Today's Date: {current_date}
+        def build_prompt(story, historical_data):
+            return f"""
+            You are giving an AI research journalist's perspective on a news topic that incorporates both current events and recent historical context. You job is to understand the user's question and provide a comprehensive and engaging story that incorporates both the current events and the historical context.  
+            Today's Date: {current_date}
         
-        CURRENT ARTICLE CONTEXT:
-        =======================
-        Title: {current_article.get('headline', '')}
-        Content: {current_article.get('story', '')}
+            CURRENT ARTICLE CONTEXT:
+            =======================
+            Title: {current_article.get('headline', '')}
+            Content: {story}
         
-        HISTORICAL CONTEXT:
-        Articles from the past, leading up to today ({current_date}):
-        {json.dumps(historical_data, indent=2)}
+            HISTORICAL CONTEXT:
+            Articles from the past, leading up to today ({current_date}):
+            {json.dumps(historical_data, indent=2)}
 
-        USER QUESTION/DIRECTION:
-        {user_message}
+            USER QUESTION/DIRECTION:
+            {user_message}
         
-        TEMPORAL CONTEXT:
-        - Analysis covers articles {date_range}
-        - Total historical articles referenced: {total_articles}
-        - Search keywords: "{keywords}"
+            TEMPORAL CONTEXT:
+            - Analysis covers articles {date_range}
+            - Total historical articles referenced: {total_articles}
+            - Search keywords: "{keywords}"
         
-        REQUIREMENTS:
-        1. Create a JSON response with the following structure:
-        {{
-            "AIHeadline": "Headline must start with 'AI Perspective:' and then an engaging and informative headline",
-            "AIHaiku": "relevant haiku in 5-7-5 format",
-            "AIStory": "full story in HTML format",
-            "summary": "brief one-paragraph summary"
-        }}
+            REQUIREMENTS:
+            1. Create a JSON response with the following structure:
+            {{
+                "AIHeadline": "Headline must start with 'AI Perspective:' and then an engaging and informative headline",
+                "AIHaiku": "relevant haiku in 5-7-5 format",
+                "AIStory": "full story in HTML format",
+                "summary": "brief one-paragraph summary"
+            }}
         
-        2. Story Guidelines:
-        - Blend current developments with historical perspective
-        - Use semantic HTML tags for structure
-        - Include relevant quotes and attributions
-        - Maintain objective, balanced reporting
-        - Focus on patterns and developments over time
-        - Highlight significant changes or consistencies
-        - Consider temporal relevance to today
-        - End with this exact attribution footnote:
-          {attribution_footnote}
+            2. Story Guidelines:
+            - Blend current developments with historical perspective
+            - Use semantic HTML tags for structure
+            - Include relevant quotes and attributions
+            - Maintain objective, balanced reporting
+            - Focus on patterns and developments over time
+            - Highlight significant changes or consistencies
+            - Consider temporal relevance to today
+            - End with this exact attribution footnote:
+              {attribution_footnote}
         
-        3. Haiku Guidelines:
-        - Capture the essence of the story's historical significance
-        - Follow 5-7-5 syllable format
-        - Be insightful while remaining relevant
-        - Consider the current moment in time
+            3. Haiku Guidelines:
+            - Capture the essence of the story's historical significance
+            - Follow 5-7-5 syllable format
+            - Be insightful while remaining relevant
+            - Consider the current moment in time
         
-        4. Writing Style:
-        - Professional journalistic tone
-        - Clear and engaging narrative flow
-        - Proper attribution of sources
-        - Balance between current events and historical context
-        - Emphasize temporal context and relevance to today
-        - Reference the temporal span of sources when discussing historical patterns
-        """
+            4. Writing Style:
+            - Professional journalistic tone
+            - Clear and engaging narrative flow
+            - Proper attribution of sources
+            - Balance between current events and historical context
+            - Emphasize temporal context and relevance to today
+            - Reference the temporal span of sources when discussing historical patterns
+            """
+
+        # The current story and the historical articles share what the rest of
+        # the prompt leaves; historical bodies are trimmed evenly to fit
+        room = prompt_limit("codegpt") - count_tokens(build_prompt('', []))
+        story = current_article.get('story', '')
+        story_budget, history_budget = allocate_budget(
+            [count_tokens(story), count_tokens(json.dumps(historical_data, indent=2))], room)
+        story = trim_to_tokens(story, story_budget)
+        historical_data = fit_records(historical_data, 'content', history_budget,
+                                      render=lambda items: json.dumps(items, indent=2))
+        prompt = build_prompt(story, historical_data)
 
         # Get AI response
-        response = chat_with_codegpt(prompt)
+        if stream_to is not None:
+            response = render_json_stream(stream_with_codegpt(prompt), stream_to, HISTORICAL_STORY_FIELDS)
+        else:
+            response = chat_with_codegpt(prompt)
         
         if not response:
             raise ValueError("Received empty response from AI")
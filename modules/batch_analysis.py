@@ -0,0 +1,135 @@
+"""Batched cluster analysis: several clusters per LLM call
+
+The analysis prompt for one cluster is tiny, so per-call agent overhead
+dominates. Here up to BATCH_SIZE clusters are packed into one prompt that asks
+for a JSON array of {category, subject}, one entry per cluster. Batches
+are cut to stay under a token budget, and a batch whose reply can't be matched
+up is split in half and retried, down to single clusters.
+"""
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .json_stream import extract_json
+from .llm_pool import get_bucket, imap_completed
+from .tokens import count_tokens
+
+BATCH_SIZE = 10
+
+# Prompt tokens per batch
+TOKEN_BUDGET = 6000
+
+BATCH_PROMPT = """Analyze each of the following news clusters. Each cluster lists its headlines and their sources.
+
+For every cluster, determine the common topic, categorize it and identify the main subject.
+
+Return ONLY a JSON array with exactly one object per cluster, in the same order, with the structure: [{{"cluster": 1, "category": "Category name", "subject": "Main subject or focus"}}]
+
+Clusters:
+{clusters}"""
+
+def _cluster_entry(number: int, cluster: Dict[str, Any]) -> str:
+    articles = cluster.get('articles', [])
+    return json.dumps({
+        "cluster": number,
+        "headlines": [article['title'] for article in articles],
+        "sources": [article.get('name_source', 'Unknown') for article in articles]
+    })
+
+def build_batch_prompt(clusters: List[Dict[str, Any]]) -> str:
+    entries = "\n".join(_cluster_entry(i, cluster) for i, cluster in enumerate(clusters, 1))
+    return BATCH_PROMPT.format(clusters=entries)
+
+def split_batches(clusters: Iterable[Dict[str, Any]], batch_size: int = BATCH_SIZE,
+                  token_budget: int = TOKEN_BUDGET) -> List[List[Dict[str, Any]]]:
+    """
+    Group clusters into batches of at most batch_size that fit token_budget.
+
+    A single cluster larger than the budget still gets a batch of its own.
+    """
+    overhead = count_tokens(BATCH_PROMPT)
+    batches = []
+    current, used = [], overhead
+    for cluster in clusters:
+        cost = count_tokens(_cluster_entry(len(current) + 1, cluster))
+        if current and (len(current) >= batch_size or used + cost > token_budget):
+            batches.append(current)
+            current, used = [], overhead
+        current.append(cluster)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def parse_batch_response(response: Optional[str], count: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Match a batch reply back to its clusters.
+
+    Returns one analysis dict per cluster in prompt order, or None if the
+    reply is not a JSON array that covers every cluster exactly once.
+    """
+    if not response:
+        return None
+    # The array may sit in chatter or a code block, or be wrapped in an object
+    data = extract_json(response, [{}])
+    if data is None:
+        data = extract_json(response, {})
+
+    if isinstance(data, dict):
+        # Some agents wrap the array, e.g. {"clusters": [...]}
+        data = next((v for v in data.values() if isinstance(v, list)), [data] if count == 1 else None)
+    if not isinstance(data, list) or len(data) != count:
+        return None
+    if not all(isinstance(item, dict) for item in data):
+        return None
+
+    numbers = [item.get('cluster') for item in data]
+    try:
+        if sorted(int(n) for n in numbers) == list(range(1, count + 1)):
+            ordered = [None] * count
+            for item in data:
+                ordered[int(item['cluster']) - 1] = item
+            return ordered
+    except (TypeError, ValueError):
+        pass
+    # No usable numbering; trust the order
+    return data
+
+def analyze_in_batches(clusters: Iterable[Dict[str, Any]], chat: Callable[[str], Optional[str]],
+                       backend: str, fallback: Optional[Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]] = None,
+                       batch_size: int = BATCH_SIZE, token_budget: int = TOKEN_BUDGET,
+                       max_workers: Optional[int] = None
+                       ) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]], Optional[Exception]]]:
+    """
+    Analyze clusters in batched prompts and yield (cluster, analysis, error).
+
+    Batches run concurrently through the backend's worker pool and are yielded
+    as they finish. `analysis` is the parsed {category, subject} dict,
+    or None when even a one-cluster batch (and `fallback`, if given) failed.
+    Split retries and fallback calls each take a token from the backend's
+    bucket, like the batch calls the pool starts.
+    """
+    bucket = get_bucket(backend)
+
+    def run_batch(batch, retry=False):
+        # The pool took the first call's token; retries take their own
+        if retry:
+            bucket.acquire()
+        results = parse_batch_response(chat(build_batch_prompt(batch)), len(batch))
+        if results is not None:
+            return list(zip(batch, results))
+        if len(batch) > 1:
+            middle = len(batch) // 2
+            return run_batch(batch[:middle], True) + run_batch(batch[middle:], True)
+        if fallback is None:
+            return [(batch[0], None)]
+        bucket.acquire()
+        return [(batch[0], fallback(batch[0]))]
+
+    batches = split_batches(clusters, batch_size, token_budget)
+    for batch, results, error in imap_completed(run_batch, batches, backend, max_workers):
+        if error is not None:
+            for cluster in batch:
+                yield cluster, None, error
+            continue
+        for cluster, analysis in results:
+            yield cluster, analysis, None
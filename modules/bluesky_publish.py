@@ -1,4 +1,5 @@
 import requests
+from . import http_client
 import json
 import os
 from datetime import datetime, timezone
@@ -8,7 +9,7 @@ BLUESKY_HANDLE = os.environ.get("BLUESKY_HANDLE")
 BLUESKY_APP_PASSWORD = os.environ.get("BLUESKY_APP_PASSWORD")
 
 def create_session():
-    resp = requests.post(
+    resp = http_client.post(
         "https://bsky.social/xrpc/com.atproto.server.createSession",
         json={"identifier": BLUESKY_HANDLE, "password": BLUESKY_APP_PASSWORD},
     )
@@ -18,7 +19,7 @@ def create_session():
 def upload_image(session, image_path):
     mime_type = "image/png"  # Adjust the mime type based on the image format
     with open(image_path, "rb") as f:
-        resp = requests.post(
+        resp = http_client.post(
             "https://bsky.social/xrpc/com.atproto.repo.uploadBlob",
             headers={
                 "Content-Type": mime_type,
@@ -76,7 +77,7 @@ def create_post(session, text, image_blob, article_url, hashtags, headline):
         },
     }
 
-    resp = requests.post(
+    resp = http_client.post(
         "https://bsky.social/xrpc/com.atproto.repo.createRecord",
         headers={"Authorization": "Bearer " + session["accessJwt"]},
         json={
@@ -1,14 +1,26 @@
 """Cluster analysis and article generation functions"""
 import json
-from chat_codegpt import chat_with_codegpt
+from chat_codegpt import chat_json_with_codegpt, stream_with_codegpt
 import streamlit as st
+from .near_duplicates import collapse_near_duplicates
+from .source_registry import cluster_bias
+from .source_selection import SOURCE_TOKEN_BUDGET, select_sources
+from .json_stream import JSONExtractor, until_complete
+from .streaming import render_json_stream
+from .tokens import count_tokens, prompt_limit
 
 # Define specific agent IDs for different functions
 ANALYSIS_AGENT_ID = "03d17f5c-0c9b-40ee-8a53-3829f2746f0e"
 ARTICLE_CREATION_AGENT_ID = "c065444b-510f-4ab0-97b8-3840c66109d3"
 
-def deduplicate_articles(articles):
-    """Remove duplicate articles with same title, keeping most recent version"""
+def deduplicate_articles(articles, near_duplicates=True):
+    """
+    Remove duplicate articles, keeping the best version of each story.
+
+    Exact title matches keep the most recent version. Near-duplicates, such as
+    wire copy republished under a reworded headline, are then collapsed to
+    their fullest copy, keeping one copy for each outlet that carried it.
+    """
     title_dict = {}
     for article in articles:
         title = article.get('title', '')
@@ -18,79 +30,99 @@ def deduplicate_articles(articles):
         if title not in title_dict or pub_date > title_dict[title].get('published_date', ''):
             title_dict[title] = article
     
+    articles = list(title_dict.values())
+    if near_duplicates:
+        articles = collapse_near_duplicates(articles, keep_each_source=True)
+    
     # Return deduplicated articles sorted by date
-    return sorted(title_dict.values(), key=lambda x: x.get('published_date', ''), reverse=True)
+    return sorted(articles, key=lambda x: x.get('published_date', ''), reverse=True)
 
-def analyze_cluster(cluster):
-    """Analyze a single cluster by extracting basic stats and most recent article"""
-    articles = cluster.get('articles', [])
-    
-    # Debug: Print initial articles data
-    st.write("Debug: Number of articles received:", len(articles))
-    if articles:
-        st.write("Debug: First article sample:", {
-            'title': articles[0].get('title', 'NO TITLE'),
-            'source': articles[0].get('name_source', 'NO SOURCE'),
-            'date': articles[0].get('published_date', 'NO DATE')
-        })
-    
+def summarize_cluster(articles):
+    """Deduplicate a cluster's articles and compute its card stats"""
     if not articles:
         return None
     
-    # Deduplicate articles with same title
+    # Deduplicate articles with the same title, then with near-identical text.
+    # Wire copy carried by several outlets keeps one copy per outlet, so the
+    # card, the source filter and article creation all see the same outlets.
     articles = deduplicate_articles(articles)
     
     # Get unique sources
     unique_sources = set(article.get('name_source', 'Unknown') for article in articles)
     
-    # Debug: Print unique sources
-    st.write("Debug: Number of unique sources:", len(unique_sources))
-    st.write("Debug: Unique sources:", list(unique_sources))
-    
     # Most recent article is already first after deduplication
-    most_recent = articles[0] if articles else None
+    most_recent = articles[0]
     
-    # Debug: Print result before returning
-    result = {
+    # Registered source scores give a bias without asking the LLM
+    bias, _ = cluster_bias(article.get('name_source', '') for article in articles)
+    
+    return {
         'article_count': len(articles),
         'unique_source_count': len(unique_sources),
-        'most_recent_headline': most_recent.get('title', 'No title available') if most_recent else 'No title available',
-        'most_recent_date': most_recent.get('published_date', 'No date available') if most_recent else 'No date available',
+        'unique_sources': sorted(unique_sources),
+        'most_recent_headline': most_recent.get('title', 'No title available'),
+        'most_recent_date': most_recent.get('published_date', 'No date available'),
+        'bias': bias if bias is not None else 0.0,
         'articles': articles
     }
-    
-    st.write("Debug: Final analysis result:", {
-        'article_count': result['article_count'],
-        'unique_source_count': result['unique_source_count'],
-        'most_recent_headline': result['most_recent_headline']
-    })
-    
-    return result
 
-def create_article(cluster):
-    """Generate article from cluster using CodeGPT"""
-    articles_data = []
-    seen_titles = set()
-    seen_sources = set()
+def normalize_news_data(news_data):
+    """
+    Pre-run cluster summaries over an API response.
+
+    Each cluster's articles are replaced by the deduplicated list and its stats
+    are stored under 'summary', so analyze_cluster can skip the work later.
+    """
+    for cluster in news_data.get('clusters', []):
+        summary = summarize_cluster(cluster.get('articles', []))
+        if summary:
+            cluster['articles'] = summary.pop('articles')
+            cluster['summary'] = summary
+    return news_data
+
+def analyze_cluster(cluster, debug=False):
+    """
+    Analyze a single cluster by extracting basic stats and most recent article.
+
+    Safe to call off the Streamlit script thread; debug output is only
+    written to the page when debug is True.
+    """
+    articles = cluster.get('articles', [])
     
-    for article in cluster['articles']:
-        title = article['title'] 
-        source = article.get('name_source', 'Unknown')
-        if title not in seen_titles and source not in seen_sources:
-            articles_data.append({
-                "title": title,
-                "content": article.get('content', ''),
-                "name_source": source,
-                "link": article.get('link', ''),
-                "source_id": len(articles_data) + 1  # Add source ID for citation
+    # Debug: Print initial articles data
+    if debug:
+        st.write("Debug: Number of articles received:", len(articles))
+        if articles:
+            st.write("Debug: First article sample:", {
+                'title': articles[0].get('title', 'NO TITLE'),
+                'source': articles[0].get('name_source', 'NO SOURCE'),
+                'date': articles[0].get('published_date', 'NO DATE')
             })
-            seen_titles.add(title)
-            seen_sources.add(source)
-            
-            if len(articles_data) >= 8:
-                break
+    
+    if not articles:
+        return None
+    
+    # Clusters served by the prefetcher arrive already summarized
+    if cluster.get('summary'):
+        result = dict(cluster['summary'], articles=articles)
+    else:
+        result = summarize_cluster(articles)
+    
+    if debug:
+        # Debug: Print unique sources
+        st.write("Debug: Number of unique sources:", result['unique_source_count'])
+        st.write("Debug: Unique sources:", result['unique_sources'])
+        
+        # Debug: Print result before returning
+        st.write("Debug: Final analysis result:", {
+            'article_count': result['article_count'],
+            'unique_source_count': result['unique_source_count'],
+            'most_recent_headline': result['most_recent_headline']
+        })
+    
+    return result
 
-    prompt = f"""Create an article based on these sources with the following components:
+ARTICLE_PROMPT = """Create an article based on these sources with the following components:
 
     1. Headline: 
     - Keep it objective, clear and factual
@@ -127,12 +159,39 @@ def create_article(cluster):
     The story should be in HTML format with proper semantic structure and citations.
     Each source has a unique source_id that should be used in the data-source attributes.
     
-    Sources: {json.dumps(articles_data, indent=2)}"""
-
-    article_json = chat_with_codegpt(prompt, agent_id=ARTICLE_CREATION_AGENT_ID)
-    try:
-        return json.loads(article_json)
-    except Exception as e:
-        print(f"Failed to parse article JSON. Raw response:\n{article_json}")
-        print(f"Error: {str(e)}")
-        return None
\ No newline at end of file
+    Sources: {sources}"""
+
+# Shape of an article reply; the reply is cut off once such an object closes
+ARTICLE_SCHEMA = {"headline": "", "haiku": "", "story": "", "summary": ""}
+
+def create_article(cluster, stream_to=None, use_cache=True):
+    """
+    Generate article from cluster using CodeGPT.
+
+    With a Streamlit container as stream_to, the headline, haiku and story are
+    drawn into it while the reply streams in. The returned article lists the
+    sources it was given under 'sources', numbered as the story cites them.
+    use_cache=False asks for a fresh article instead of an earlier reply.
+    """
+    # Diverse, recent sources trimmed to what the prompt leaves of the context
+    source_budget = min(SOURCE_TOKEN_BUDGET, prompt_limit("codegpt") - count_tokens(ARTICLE_PROMPT))
+    articles_data = select_sources(cluster['articles'], token_budget=source_budget)
+
+    prompt = ARTICLE_PROMPT.format(sources=json.dumps(articles_data, ensure_ascii=False))
+
+    if stream_to is not None:
+        extractor = JSONExtractor(ARTICLE_SCHEMA)
+        chunks = stream_with_codegpt(prompt, agent_id=ARTICLE_CREATION_AGENT_ID, call_type="article",
+                                     use_cache=use_cache)
+        article_json = render_json_stream(until_complete(chunks, extractor), stream_to)
+        article = extractor.finish()
+        if article is None:
+            print(f"Failed to parse article JSON. Raw response:\n{article_json}")
+    else:
+        article = chat_json_with_codegpt(prompt, ARTICLE_SCHEMA, agent_id=ARTICLE_CREATION_AGENT_ID,
+                                         call_type="article", use_cache=use_cache)
+    if article is not None:
+        # The story cites these by source_id, so citations are built from them
+        article['sources'] = [{key: source[key] for key in ('source_id', 'name_source', 'title', 'link')}
+                              for source in articles_data]
+    return article
\ No newline at end of file
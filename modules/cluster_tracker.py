@@ -0,0 +1,178 @@
+"""Stable story identity for clusters across successive fetches
+
+NewsCatcher returns brand-new cluster dicts on every fetch. The tracker
+matches each incoming cluster to a story it has seen before, first by shared
+article links and then by headline similarity, and tags the cluster with:
+
+- story_id: stable across fetches, taken from the first cluster of the story
+- story_status: 'new', 'grown' (it brought articles the story hadn't seen)
+  or 'unchanged'
+
+Each story keeps a timeline of its size and sources per sighting and the
+result of its last analysis, so only new and grown clusters need to be
+analyzed again.
+"""
+import time
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .article_store import cluster_fingerprint
+from .recluster import cluster_centroids, sparse
+
+# Share of the smaller side's links two clusters must have in common to be
+# the same story
+OVERLAP_THRESHOLD = 0.5
+
+# Headline centroid cosine at which a cluster with no shared links still
+# continues a story
+SIMILARITY_THRESHOLD = 0.6
+
+# Stories kept; the ones seen least recently are dropped first
+MAX_STORIES = 2000
+
+class Story:
+    """Everything the tracker remembers about one story"""
+
+    __slots__ = ('story_id', 'links', 'titles', 'sources', 'timeline',
+                 'first_seen', 'last_seen', 'analyzed', 'result')
+
+    def __init__(self, story_id: str):
+        self.story_id = story_id
+        self.links: set = set()
+        self.titles: List[str] = []
+        self.sources: set = set()
+        self.timeline: List[Dict[str, Any]] = []
+        self.first_seen = self.last_seen = time.time()
+        self.analyzed = False
+        self.result: Any = None
+
+class ClusterTracker:
+    """Matches clusters to known stories; safe to share between threads"""
+
+    def __init__(self, overlap_threshold: float = OVERLAP_THRESHOLD,
+                 similarity_threshold: float = SIMILARITY_THRESHOLD):
+        self.overlap_threshold = overlap_threshold
+        self.similarity_threshold = similarity_threshold
+        self._stories: Dict[str, Story] = {}
+        self._link_owner: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _match_by_links(self, links: set, claimed: set) -> Optional[str]:
+        shared: Dict[str, int] = {}
+        for link in links:
+            owner = self._link_owner.get(link)
+            if owner is not None and owner not in claimed:
+                shared[owner] = shared.get(owner, 0) + 1
+        if not shared:
+            return None
+        story_id, count = max(shared.items(), key=lambda item: item[1])
+        smaller = min(len(links), len(self._stories[story_id].links))
+        return story_id if count >= self.overlap_threshold * smaller else None
+
+    def _match_by_similarity(self, clusters: List[Any], claimed: set) -> List[Optional[str]]:
+        """Best unclaimed story per cluster by headline centroid cosine"""
+        candidates = [s for s in self._stories.values() if s.story_id not in claimed]
+        if not clusters or not candidates:
+            return [None] * len(clusters)
+        groups = [{'articles': [{'title': a.get('title', '')} for a in c.get('articles', [])]} for c in clusters]
+        groups += [{'articles': [{'title': title} for title in story.titles]} for story in candidates]
+        vectors = cluster_centroids(groups)
+        similarity = vectors[:len(clusters)] @ vectors[len(clusters):].T
+        if sparse is not None and sparse.issparse(similarity):
+            similarity = similarity.toarray()
+        similarity = np.asarray(similarity)
+
+        matches: List[Optional[str]] = [None] * len(clusters)
+        # Greedy one-to-one assignment, strongest pairs first
+        rows, cols = np.nonzero(similarity >= self.similarity_threshold)
+        for index in np.argsort(-similarity[rows, cols], kind='stable'):
+            row, col = rows[index], cols[index]
+            story_id = candidates[col].story_id
+            if matches[row] is None and story_id not in claimed:
+                matches[row] = story_id
+                claimed.add(story_id)
+        return matches
+
+    def update(self, clusters: Iterable[Any]) -> List[Any]:
+        """Tag each cluster with its story_id and story_status and record the sighting"""
+        clusters = list(clusters)
+        now = time.time()
+        with self._lock:
+            claimed: set = set()
+            story_ids: List[Optional[str]] = []
+            for cluster in clusters:
+                links = {a.get('link') for a in cluster.get('articles', []) if a.get('link')}
+                story_id = self._match_by_links(links, claimed)
+                if story_id is not None:
+                    claimed.add(story_id)
+                story_ids.append(story_id)
+
+            unmatched = [i for i, story_id in enumerate(story_ids) if story_id is None]
+            for i, story_id in zip(unmatched, self._match_by_similarity([clusters[i] for i in unmatched], claimed)):
+                story_ids[i] = story_id
+
+            for cluster, story_id in zip(clusters, story_ids):
+                articles = cluster.get('articles', [])
+                links = {a.get('link') for a in articles if a.get('link')}
+                sources = {a.get('name_source', '') for a in articles if a.get('name_source')}
+                if story_id is None:
+                    story_id = cluster_fingerprint(cluster)[:12]
+                    self._stories[story_id] = story = Story(story_id)
+                    status = 'new'
+                else:
+                    story = self._stories[story_id]
+                    status = 'grown' if links - story.links else 'unchanged'
+                story.timeline.append({
+                    'seen_at': now,
+                    'article_count': len(articles),
+                    'source_count': len(sources),
+                    'new_sources': sorted(sources - story.sources)
+                })
+                story.links |= links
+                story.sources |= sources
+                story.titles = [a.get('title', '') for a in articles]
+                story.last_seen = now
+                for link in links:
+                    self._link_owner[link] = story_id
+                cluster['story_id'] = story_id
+                cluster['story_status'] = status
+            self._evict()
+        return clusters
+
+    def _evict(self) -> None:
+        if len(self._stories) <= MAX_STORIES:
+            return
+        by_age = sorted(self._stories.values(), key=lambda s: s.last_seen)
+        for story in by_age[:len(self._stories) - MAX_STORIES]:
+            del self._stories[story.story_id]
+            for link in story.links:
+                if self._link_owner.get(link) == story.story_id:
+                    del self._link_owner[link]
+
+    def needs_analysis(self, cluster: Any) -> bool:
+        """True unless the cluster's story is unchanged and has a stored result"""
+        with self._lock:
+            story = self._stories.get(cluster.get('story_id'))
+            return story is None or not story.analyzed or cluster.get('story_status') != 'unchanged'
+
+    def result(self, cluster: Any) -> Any:
+        """The stored analysis result of the cluster's story"""
+        with self._lock:
+            story = self._stories.get(cluster.get('story_id'))
+            return story.result if story else None
+
+    def store(self, cluster: Any, result: Any) -> None:
+        """Remember the analysis result for the cluster's story"""
+        with self._lock:
+            story = self._stories.get(cluster.get('story_id'))
+            if story is not None:
+                story.result = result
+                story.analyzed = True
+
+    def timeline(self, story_id: str) -> List[Dict[str, Any]]:
+        """Size and sources of a story at each sighting, oldest first"""
+        with self._lock:
+            story = self._stories.get(story_id)
+            return list(story.timeline) if story else []
@@ -0,0 +1,129 @@
+"""Background processing of fetched clusters for the dashboard"""
+import time
+import queue
+import threading
+from typing import Any, Dict, List, Optional
+
+from .cluster_analysis import analyze_cluster
+from .cluster_ranking import rank_clusters
+from .cluster_tracker import ClusterTracker
+from .models import Cluster
+from .recluster import recluster
+
+# Seconds between dashboard reruns while clusters are still being processed
+POLL_INTERVAL = 0.5
+
+class ClusterLoader:
+    """
+    Turns a NewsCatcher response into Cluster models on a daemon thread.
+
+    Finished clusters are pushed to a queue as soon as each is ready, so the
+    page can render cards while the rest are still processing. The thread
+    never touches Streamlit; per-cluster diagnostics are collected in
+    `debug` for the page to show when asked.
+
+    With a tracker, clusters whose story is unchanged since an earlier fetch
+    reuse the stored result instead of being analyzed again. stop() ends a
+    superseded loader before its next cluster, so it no longer writes to a
+    tracker that outlives it.
+    """
+
+    def __init__(self, news_data: Dict[str, Any], tracker: Optional[ClusterTracker] = None):
+        self.results: "queue.Queue[Cluster]" = queue.Queue()
+        self.total = None
+        self.processed = 0
+        self.accepted = 0
+        self.reused = 0
+        self.done = False
+        self.error = None
+        self.debug: List[Dict[str, Any]] = []
+        self.started_at = time.time()
+        self._raw_clusters = news_data.get('clusters', [])
+        self._tracker = tracker
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="cluster-loader", daemon=True)
+
+    def start(self) -> 'ClusterLoader':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Ask the thread to finish after the cluster it is working on"""
+        self._stop.set()
+
+    def _run(self) -> None:
+        try:
+            # Join clusters NewsCatcher split across pages, queries or windows
+            valid_clusters = [c for c in recluster(self._raw_clusters) if len(c.get('articles', [])) >= 3]
+            # Most newsworthy first across the whole download, so the best cards show up earliest
+            valid_clusters = rank_clusters(valid_clusters)
+            self._raw_clusters = None
+            self.total = len(valid_clusters)
+
+            if self._tracker is not None and not self._stop.is_set():
+                self._tracker.update(valid_clusters)
+
+            for idx, cluster in enumerate(valid_clusters):
+                if self._stop.is_set():
+                    break
+                if self._tracker is not None and not self._tracker.needs_analysis(cluster):
+                    # Unchanged story: serve the stored model, or skip it if it was rejected
+                    model = self._tracker.result(cluster)
+                    if model is not None:
+                        model['rank_score'] = cluster.get('rank_score', 0.0)
+                        self.results.put(model)
+                        self.accepted += 1
+                    self.reused += 1
+                    self.processed = idx + 1
+                    continue
+
+                analysis = analyze_cluster(cluster)
+                accepted = bool(analysis and analysis.get('unique_source_count', 0) > 2)
+                self.debug.append({
+                    'cluster': idx,
+                    'story_id': cluster.get('story_id'),
+                    'story_status': cluster.get('story_status'),
+                    'articles_received': len(cluster.get('articles', [])),
+                    'articles_kept': analysis.get('article_count', 0) if analysis else 0,
+                    'unique_sources': analysis.get('unique_source_count', 0) if analysis else 0,
+                    'headline': analysis.get('most_recent_headline', 'NO HEADLINE') if analysis else None,
+                    'accepted': accepted
+                })
+                model = None
+                if accepted:
+                    # Slotted model keeps article bodies in the local store, not session state
+                    model = Cluster.from_dict({
+                        'cluster_id': cluster.get('cluster_id'),
+                        'category': analysis.get('category', 'Unknown'),
+                        'subject': analysis.get('subject', 'Unknown'),
+                        'bias': analysis.get('bias', 0.0),
+                        'articles': analysis.get('articles', []),
+                        'most_recent_headline': analysis.get('most_recent_headline', 'No headline available'),
+                        'unique_source_count': analysis.get('unique_source_count', 0),
+                        'rank_score': cluster.get('rank_score', 0.0),
+                        'story_id': cluster.get('story_id')
+                    })
+                    self.results.put(model)
+                    self.accepted += 1
+                if self._tracker is not None and analysis and not self._stop.is_set():
+                    self._tracker.store(cluster, model)
+                self.processed = idx + 1
+        except Exception as e:
+            print(f"Error processing clusters: {str(e)}")
+            self.error = e
+        finally:
+            self.done = True
+
+    def drain(self) -> List[Cluster]:
+        """Clusters finished since the last call, in completion order"""
+        finished = []
+        while True:
+            try:
+                finished.append(self.results.get_nowait())
+            except queue.Empty:
+                return finished
+
+    @property
+    def finished(self) -> bool:
+        """True once the thread has stopped and every result was drained"""
+        return self.done and self.results.empty()
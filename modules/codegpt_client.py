@@ -0,0 +1,204 @@
+"""Process-wide CodeGPT client with pooled connections, retries and an in-flight cap
+
+One CodeGPTPlus instance is built per set of credentials and reused by every
+call. Its HTTP traffic is routed through the shared pooled session, so calls
+reuse keep-alive connections and always carry a timeout. At most
+CODEGPT_MAX_CONCURRENCY calls are in flight at once across all threads, and
+transient failures (connection errors, timeouts, 429 and 5xx replies) are
+retried with jittered exponential backoff.
+"""
+import os
+import sys
+import time
+import random
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from judini import CodeGPTPlus
+
+from . import http_client
+from .llm_pool import get_limits
+
+# (connect, read) timeout in seconds for one CodeGPT request
+CALL_TIMEOUT = (10, float(os.environ.get("CODEGPT_TIMEOUT", 90)))
+
+# Retries after the first attempt, and the backoff window they draw from
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 20.0
+
+TRANSIENT_STATUS = frozenset([408, 429, 500, 502, 503, 504])
+
+class TransientError(Exception):
+    """A CodeGPT call failed in a way that is worth retrying"""
+
+_local = threading.local()
+
+class _PooledRequests:
+    """
+    Stand-in for the requests module inside the CodeGPT SDK.
+
+    Sends through the shared session with CALL_TIMEOUT by default and notes
+    the last status code seen on this thread so failures can be classified.
+    """
+
+    def __init__(self, timeout: Tuple[float, float]):
+        self.timeout = timeout
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', getattr(_local, 'timeout', None) or self.timeout)
+        _local.status = None
+        response = http_client.request(method, url, **kwargs)
+        _local.status = response.status_code
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        # Exceptions and helpers the SDK may reference (requests.exceptions, ...)
+        return getattr(requests, name)
+
+def _route_sdk_through_pool() -> None:
+    """Point the SDK's module-level requests reference at the pooled session"""
+    module = sys.modules.get(CodeGPTPlus.__module__)
+    if module is not None and getattr(module, 'requests', None) is requests:
+        module.requests = _PooledRequests(CALL_TIMEOUT)
+
+class CodeGPTClientManager:
+    """Long-lived CodeGPTPlus clients shared by every thread in the process"""
+
+    def __init__(self, max_in_flight: Optional[int] = None):
+        self._clients: Dict[Tuple[str, str], CodeGPTPlus] = {}
+        self._lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(
+            max_in_flight or int(get_limits("codegpt")["concurrency"]))
+        self._credentials: Optional[Tuple[Optional[str], Optional[str], Optional[str]]] = None
+        _route_sdk_through_pool()
+
+    def credentials(self) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """(api_key, org_id, default_agent_id), read from the environment once"""
+        if self._credentials is not None:
+            return self._credentials
+        credentials = (os.environ.get("CODEGPT_API_KEY"),
+                       os.environ.get("CODEGPT_ORG_ID"),
+                       os.environ.get("CODEGPT_AGENT_ID"))
+        # Incomplete credentials are re-read next time in case they get set later
+        if credentials[0] and credentials[1]:
+            self._credentials = credentials
+        return credentials
+
+    def client(self, api_key: str, org_id: str) -> CodeGPTPlus:
+        with self._lock:
+            client = self._clients.get((api_key, org_id))
+            if client is None:
+                client = CodeGPTPlus(api_key=api_key, org_id=org_id)
+                self._clients[(api_key, org_id)] = client
+            return client
+
+    def _prepare(self, user_message: str, agent_id: Optional[str], timeout: Optional[float]):
+        api_key, org_id, default_agent_id = self.credentials()
+        agent_id = agent_id or default_agent_id
+        if not all([api_key, org_id, agent_id]):
+            raise ValueError("Missing required environment variables for CodeGPT API")
+        messages = [{"role": "user", "content": user_message}]
+        call_timeout = (CALL_TIMEOUT[0], timeout) if timeout else None
+        return self.client(api_key, org_id), agent_id, messages, call_timeout
+
+    def _attempt(self, client: CodeGPTPlus, agent_id: str, messages: List[Dict[str, str]],
+                 timeout: Optional[Tuple[float, float]]) -> Any:
+        _local.timeout = timeout
+        _local.status = None
+        try:
+            with self._in_flight:
+                response = client.chat_completion(agent_id=agent_id, messages=messages)
+        except Exception as e:
+            if _is_transient(e):
+                raise TransientError(str(e)) from e
+            raise
+        finally:
+            _local.timeout = None
+        if not response and getattr(_local, 'status', None) in TRANSIENT_STATUS:
+            # The SDK reported the failure as an empty reply
+            raise TransientError(f"CodeGPT returned status {_local.status}")
+        return response
+
+    def chat(self, user_message: str, agent_id: Optional[str] = None,
+             timeout: Optional[float] = None) -> Any:
+        """
+        Send one user message to an agent and return the reply.
+
+        timeout overrides the read timeout in seconds for this call.
+        Transient failures are retried up to MAX_RETRIES times; the last one
+        is re-raised.
+        """
+        client, agent_id, messages, call_timeout = self._prepare(user_message, agent_id, timeout)
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return self._attempt(client, agent_id, messages, call_timeout)
+            except TransientError as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                _backoff(attempt, e)
+
+    def stream(self, user_message: str, agent_id: Optional[str] = None,
+               timeout: Optional[float] = None) -> Iterator[str]:
+        """
+        Yield the reply in pieces as the agent produces them.
+
+        Transient failures are retried like chat() as long as nothing has
+        been yielded yet; after the first piece they are raised. Closing the
+        generator early closes the SDK's stream too.
+        """
+        client, agent_id, messages, call_timeout = self._prepare(user_message, agent_id, timeout)
+        for attempt in range(MAX_RETRIES + 1):
+            started = False
+            chunks = None
+            _local.status = None
+            try:
+                with self._in_flight:
+                    _local.timeout = call_timeout
+                    try:
+                        chunks = client.chat_completion(agent_id=agent_id, messages=messages, stream=True)
+                        # Without streaming support the SDK hands back the whole reply
+                        for chunk in ([chunks] if isinstance(chunks, str) else chunks or []):
+                            if chunk:
+                                started = True
+                                yield chunk
+                    finally:
+                        _local.timeout = None
+                        close = getattr(chunks, 'close', None)
+                        if close is not None:
+                            close()
+                return
+            except Exception as e:
+                if started or not _is_transient(e) or attempt == MAX_RETRIES:
+                    raise
+                _backoff(attempt, e)
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, (TransientError, requests.ConnectionError, requests.Timeout)):
+        return True
+    return getattr(_local, 'status', None) in TRANSIENT_STATUS
+
+def _backoff(attempt: int, error: Exception) -> None:
+    """Sleep a full-jitter exponential delay before retry number attempt + 1"""
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+    print(f"CodeGPT call failed ({str(error)}), retrying in {delay:.1f}s")
+    time.sleep(delay)
+
+_manager: Optional[CodeGPTClientManager] = None
+_manager_lock = threading.Lock()
+
+def get_manager() -> CodeGPTClientManager:
+    """The process-wide client manager, created on first use"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = CodeGPTClientManager()
+    return _manager
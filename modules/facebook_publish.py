@@ -1,11 +1,14 @@
 import os
 import requests
+from . import http_client
+from .replay import replayable
 from datetime import datetime
 import json
 from typing import Optional, Dict, Any
 import ftplib
 from io import BytesIO
 
+@replayable("ftp", key=lambda image_data, filename: [filename])
 def upload_image_to_ftp(image_data: bytes, filename: str) -> Optional[str]:
     """Upload an image to FTP and return its URL"""
     try:
@@ -66,7 +69,7 @@ class FacebookPublisher:
         params['access_token'] = self.access_token
         
         try:
-            response = requests.request(method, url, params=params, json=data)
+            response = http_client.request(method, url, params=params, json=data)
             
             # Print detailed debug information
             print(f"\nAPI Request Details:")
@@ -150,7 +153,7 @@ class FacebookPublisher:
             }
             
             # Make the API request
-            response = requests.post(f"{self.base_url}/{endpoint}", params=params)
+            response = http_client.post(f"{self.base_url}/{endpoint}", params=params)
             
             if not response.ok:
                 error_data = response.json()
@@ -4,6 +4,7 @@ import base64
 from io import BytesIO
 from PIL import Image
 import streamlit as st
+from .replay import replayable
 
 def base64_to_image(base64_string):
     """Convert base64 data URL to image bytes"""
@@ -16,6 +17,7 @@ def base64_to_image(base64_string):
         st.error(f"Error decoding base64: {str(e)}")
         return None
 
+@replayable("ftp", key=lambda article_id, *args, **kwargs: [article_id])
 def upload_images_to_ftp(article_id, image_data, image_haiku):
     """Upload images to FTP server and return URLs"""
     ftp_host = os.getenv("FTP_HOST", "gvam1076.siteground.biz")
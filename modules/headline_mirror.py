@@ -0,0 +1,93 @@
+"""In-memory mirror of published headlines with incremental background sync"""
+import time
+import threading
+from typing import Dict, List
+
+from .api_client import fetch_latest_headlines
+
+# Seconds between delta syncs (rows with an ID above the newest mirrored one)
+REFRESH_INTERVAL = 60
+
+# Seconds between full syncs, which pick up edited and deleted rows such as
+# review updates to cat, topic and bs_p
+FULL_SYNC_INTERVAL = 1800
+
+_lock = threading.Lock()
+_wake = threading.Event()
+_articles: Dict[int, dict] = {}
+_sorted: List[dict] = []
+_state = {'max_id': 0, 'last_sync': 0.0, 'last_full_sync': 0.0, 'full_sync_tried': False, 'thread': None}
+
+def _article_id(article: dict) -> int:
+    try:
+        return int(article.get('ID', 0))
+    except (TypeError, ValueError):
+        return 0
+
+def _rebuild_sorted() -> None:
+    global _sorted
+    _sorted = sorted(_articles.values(), key=lambda a: a.get('Published') or '', reverse=True)
+
+def sync_headlines(full: bool = False) -> int:
+    """
+    Pull headlines into the mirror and return the number of rows received.
+
+    A delta sync only asks for rows newer than the highest mirrored ID; a full
+    sync replaces the mirror wholesale, even with an empty result. A failed
+    fetch leaves the mirror and its sync times as they were, so the next
+    refresh tick tries again.
+    """
+    since_id = None if full else _state['max_id']
+    if full:
+        _state['full_sync_tried'] = True
+    rows = fetch_latest_headlines(since_id=since_id)
+    if rows is None:
+        return 0
+
+    with _lock:
+        if full:
+            _articles.clear()
+            _state['last_full_sync'] = time.time()
+        for row in rows:
+            _articles[_article_id(row)] = row
+        if rows or full:
+            _state['max_id'] = max(_articles.keys(), default=0)
+            _rebuild_sorted()
+        _state['last_sync'] = time.time()
+    return len(rows)
+
+def _refresh_loop() -> None:
+    while True:
+        _wake.wait(REFRESH_INTERVAL)
+        _wake.clear()
+        try:
+            full = time.time() - _state['last_full_sync'] >= FULL_SYNC_INTERVAL
+            sync_headlines(full=full)
+        except Exception as e:
+            print(f"Error syncing headlines: {str(e)}")
+
+def start_background_refresh() -> None:
+    """Start the daemon thread that keeps the mirror current"""
+    with _lock:
+        thread = _state['thread']
+        if thread is not None and thread.is_alive():
+            return
+        thread = threading.Thread(target=_refresh_loop, name="headline-mirror", daemon=True)
+        _state['thread'] = thread
+    thread.start()
+
+def request_refresh() -> None:
+    """Wake the refresh thread early, e.g. right after publishing an article"""
+    _wake.set()
+
+def get_latest_headlines() -> List[dict]:
+    """
+    Return the mirrored headlines, newest first, without a network round trip.
+
+    The first call in a process performs a blocking full sync; after that the
+    background thread keeps the mirror up to date and retries a failed one.
+    """
+    if not _state['full_sync_tried']:
+        sync_headlines(full=True)
+    start_background_refresh()
+    return _sorted
@@ -0,0 +1,168 @@
+"""Shared pooled HTTP client for all outbound calls"""
+import asyncio
+import threading
+import weakref
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import replay
+
+try:
+    import httpx
+except ImportError:  # Optional: enables HTTP/2 for the async client
+    httpx = None
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = httpx is not None
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# (connect, read) timeouts in seconds applied when a caller passes none
+DEFAULT_TIMEOUT = (10, 120)
+
+# Keep-alive pool sizing; one pool per host, reused across threads
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 16
+
+# Retry connection failures for every method, and 429/5xx responses for
+# idempotent methods only so a publish POST is never sent twice.
+RETRY_POLICY = Retry(
+    total=3,
+    connect=3,
+    read=2,
+    status=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"]),
+    respect_retry_after_header=True,
+    raise_on_status=False
+)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+
+class _TimeoutSession(requests.Session):
+    """Session that applies DEFAULT_TIMEOUT when a request has no timeout"""
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+        return super().request(method, url, **kwargs)
+
+def _build_session() -> requests.Session:
+    session = _TimeoutSession()
+    # HTTP_REPLAY_MODE swaps in an adapter that records or serves fixtures
+    adapter_class = replay.ReplayAdapter if replay.enabled() else HTTPAdapter
+    adapter = adapter_class(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=RETRY_POLICY
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": ACCEPT_ENCODING})
+    return session
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """Send a request through the shared session"""
+    return get_session().request(method, url, **kwargs)
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+def head(url: str, **kwargs) -> requests.Response:
+    return request("HEAD", url, **kwargs)
+
+def get_async_client():
+    """
+    Return the shared httpx.AsyncClient for the running event loop.
+
+    Clients are bound to a loop, so one is kept per loop. Returns None when
+    httpx is not installed; arequest() then falls back to the sync session.
+    """
+    if httpx is None:
+        return None
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        # With a custom transport httpx ignores the client's limits and
+        # http2, so the pool is sized on the transport itself
+        transport = httpx.AsyncHTTPTransport(
+            retries=RETRY_POLICY.connect,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=POOL_MAXSIZE * 4,
+                max_keepalive_connections=POOL_MAXSIZE
+            )
+        )
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(DEFAULT_TIMEOUT[1], connect=DEFAULT_TIMEOUT[0]),
+            headers={"Accept-Encoding": ACCEPT_ENCODING},
+            transport=transport
+        )
+        _async_clients[loop] = client
+    return client
+
+async def arequest(method: str, url: str, **kwargs):
+    """
+    Async counterpart of request().
+
+    Uses the pooled httpx client (HTTP/2 when h2 is installed) with the same
+    backoff on 429/5xx for idempotent methods. Without httpx, or while
+    recording/replaying fixtures, the sync session runs on a worker thread.
+    """
+    client = None if replay.enabled() else get_async_client()
+    if client is None:
+        return await asyncio.to_thread(request, method, url, **kwargs)
+
+    retryable = method.upper() in RETRY_POLICY.allowed_methods
+    attempt = 0
+    while True:
+        response = await client.request(method, url, **kwargs)
+        if not retryable or response.status_code not in RETRY_POLICY.status_forcelist or attempt >= RETRY_POLICY.status:
+            return response
+        await asyncio.sleep(RETRY_POLICY.backoff_factor * (2 ** attempt))
+        attempt += 1
+
+async def aget(url: str, **kwargs):
+    return await arequest("GET", url, **kwargs)
+
+async def apost(url: str, **kwargs):
+    return await arequest("POST", url, **kwargs)
+
+async def aclose_async_client() -> None:
+    """Close the running loop's AsyncClient; call before the loop finishes so its connections are released"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.pop(loop, None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+def close() -> None:
+    """Close the shared sync session; async clients are closed by aclose_async_client()"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
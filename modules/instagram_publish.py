@@ -1,5 +1,7 @@
 import os
 import requests
+from . import http_client
+from .replay import replayable
 from datetime import datetime
 import json
 from typing import Optional, Dict, Any, Tuple
@@ -8,6 +10,7 @@ import ftplib
 import base64
 from io import BytesIO
 
+@replayable("ftp", key=lambda image_data, filename: [filename])
 def upload_image_to_ftp(image_data: bytes, filename: str) -> Optional[str]:
     """Upload an image to FTP and return its URL"""
     try:
@@ -68,7 +71,7 @@ class InstagramPublisher:
         params['access_token'] = self.access_token
         
         try:
-            response = requests.request(method, url, params=params, json=data)
+            response = http_client.request(method, url, params=params, json=data)
             
             # Print detailed debug information
             print(f"\nAPI Request Details:")
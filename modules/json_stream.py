@@ -0,0 +1,176 @@
+"""Incremental extraction of JSON replies from streamed LLM output
+
+Models wrap the JSON they were asked for in chatter and code fences, and keep
+generating after it. JSONExtractor is fed the reply as it streams in and
+tracks bracket depth outside of strings, so it notices the moment the first
+value that parses and matches the call's schema has closed. until_complete
+stops the stream at that point instead of paying for the rest of the reply.
+
+A schema is an example of the expected value, in the style of the LM Studio
+profiles' json_structure: a dict requires each of its keys (extra keys are
+fine), a one-item list requires a list of such items, a string requires a
+string, a number a number or numeric string, and None accepts anything.
+"""
+import re
+import json
+from typing import Any, Iterable, Iterator, Optional
+
+_STRUCTURE = re.compile(r'[{}\[\]"]')
+_STRING_END = re.compile(r'["\\]')
+
+_decoder = json.JSONDecoder(strict=False)
+
+def matches(value: Any, schema: Any) -> bool:
+    """Whether a parsed value has the shape of the schema example"""
+    if schema is None:
+        return True
+    if isinstance(schema, dict):
+        return isinstance(value, dict) and all(
+            key in value and matches(value[key], example) for key, example in schema.items())
+    if isinstance(schema, list):
+        return isinstance(value, list) and (not schema or all(matches(item, schema[0]) for item in value))
+    if isinstance(schema, bool):
+        return isinstance(value, bool)
+    if isinstance(schema, (int, float)):
+        if isinstance(value, str):
+            try:
+                float(value)
+                return True
+            except ValueError:
+                return False
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if isinstance(schema, str):
+        return isinstance(value, str)
+    return True
+
+def _openers(schema: Any) -> str:
+    if isinstance(schema, dict):
+        return "{"
+    if isinstance(schema, list):
+        return "["
+    return "{["
+
+class JSONExtractor:
+    """Finds the first JSON object or array in a reply that matches a schema"""
+
+    def __init__(self, schema: Any = None):
+        self.schema = schema
+        self.value: Any = None
+        self.raw: Optional[str] = None
+        self.done = False
+        self._openers = _openers(schema)
+        self._opener = re.compile("[" + re.escape(self._openers) + "]")
+        self._buffer = ""
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far"""
+        return self._buffer
+
+    def feed(self, chunk: str) -> bool:
+        """Add the next piece of the reply; True once a matching value has closed"""
+        if self.done:
+            return True
+        self._buffer += chunk or ""
+        buffer = self._buffer
+        while True:
+            if self._start is None:
+                match = self._opener.search(buffer, self._pos)
+                if not match:
+                    self._pos = len(buffer)
+                    return False
+                self._start, self._depth, self._in_string = match.start(), 1, False
+                self._pos = match.end()
+            elif self._in_string:
+                match = _STRING_END.search(buffer, self._pos)
+                if not match:
+                    self._pos = len(buffer)
+                    return False
+                if match.group() == '\\':
+                    if match.end() >= len(buffer):
+                        # Wait for the escaped character
+                        self._pos = match.start()
+                        return False
+                    self._pos = match.end() + 1
+                else:
+                    self._in_string = False
+                    self._pos = match.end()
+            else:
+                match = _STRUCTURE.search(buffer, self._pos)
+                if not match:
+                    self._pos = len(buffer)
+                    return False
+                char = match.group()
+                self._pos = match.end()
+                if char == '"':
+                    self._in_string = True
+                elif char in '{[':
+                    self._depth += 1
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        if self._accept(buffer[self._start:self._pos]):
+                            return True
+                        # Not the value we want; look for one starting inside it
+                        self._pos, self._start = self._start + 1, None
+
+    def _accept(self, candidate: str) -> bool:
+        try:
+            value = json.loads(candidate, strict=False)
+        except ValueError:
+            return False
+        if not matches(value, self.schema):
+            return False
+        self.value, self.raw, self.done = value, candidate, True
+        return True
+
+    def finish(self) -> Any:
+        """
+        The matching value, or None if the reply had none.
+
+        Once the stream has ended, every opening bracket is tried as the start
+        of a value, which also recovers replies whose chatter left a bracket
+        or quote unbalanced before the JSON.
+        """
+        if self.done:
+            return self.value
+        buffer = self._buffer
+        for match in self._opener.finditer(buffer):
+            try:
+                value, end = _decoder.raw_decode(buffer, match.start())
+            except ValueError:
+                continue
+            if matches(value, self.schema):
+                self.value, self.raw, self.done = value, buffer[match.start():end], True
+                return value
+        return None
+
+def until_complete(chunks: Iterable[str], extractor: JSONExtractor) -> Iterator[str]:
+    """
+    Pass chunks through while feeding them to extractor, and end the stream
+    as soon as it has its value.
+
+    The source is closed when iteration stops, which lets streaming clients
+    drop the connection so the model stops generating.
+    """
+    iterator = iter(chunks)
+    try:
+        for chunk in iterator:
+            done = extractor.feed(chunk)
+            yield chunk
+            if done:
+                break
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            close()
+
+def extract_json(text: Optional[str], schema: Any = None) -> Any:
+    """The first JSON value in a complete reply that matches schema, or None"""
+    extractor = JSONExtractor(schema)
+    extractor.feed(text or "")
+    return extractor.finish()
@@ -6,6 +6,9 @@ from chat_codegpt import chat_with_codegpt
 # Cache for optimized keywords to avoid redundant processing
 keyword_cache: Dict[str, str] = {}
 
+# Cache for synonym queries of a keyword list
+variant_cache: Dict[str, List[str]] = {}
+
 def optimize_headline_keywords(headline: str) -> Optional[str]:
     """
     Convert a headline into optimized search keywords using AI.
@@ -65,6 +68,59 @@ def optimize_headline_keywords(headline: str) -> Optional[str]:
         print(f"Error optimizing keywords: {str(e)}")
         return None
 
+def generate_query_variants(keywords: str, count: int = 2) -> List[str]:
+    """
+    Rephrase search keywords as alternative queries built from synonyms.
+    
+    Args:
+        keywords (str): Comma-separated search keywords
+        count (int): Number of alternative queries to return
+        
+    Returns:
+        List[str]: Up to count comma-separated queries, empty if processing fails
+    """
+    if not keywords or not isinstance(keywords, str):
+        return []
+        
+    # Check cache first
+    if keywords in variant_cache:
+        return variant_cache[keywords][:count]
+        
+    try:
+        prompt = f"""
+        Rewrite these news search keywords as {count} alternative search queries for the same story.
+        Use synonyms, alternative names and other common phrasings of the key terms.
+        
+        Keywords: {keywords}
+        
+        Rules:
+        1. Each query covers the same story as the original keywords
+        2. Use 3-5 comma-separated terms per query
+        3. Write one query per line
+        4. No numbering, bullets or explanations
+        
+        Alternative queries:
+        """
+        
+        response = chat_with_codegpt(prompt)
+        if not response:
+            return []
+            
+        variants = []
+        for line in response.splitlines():
+            # Drop any numbering or bullets the model added anyway
+            variant = clean_keywords(line.strip().lstrip('-*0123456789.) ').strip())
+            if variant and variant.lower() != keywords.lower() and variant not in variants:
+                variants.append(variant)
+        variants = variants[:count]
+        if variants:
+            variant_cache[keywords] = variants
+        return variants
+        
+    except Exception as e:
+        print(f"Error generating query variants: {str(e)}")
+        return []
+
 def clean_keywords(raw_keywords: str) -> Optional[str]:
     """
     Clean and validate the keyword response.
@@ -97,8 +153,9 @@ def clean_keywords(raw_keywords: str) -> Optional[str]:
         return None
 
 def clear_cache() -> None:
-    """Clear the keyword cache"""
+    """Clear the keyword and query variant caches"""
     keyword_cache.clear()
+    variant_cache.clear()
 
 def get_cached_keywords() -> Dict[str, str]:
     """Get the current keyword cache"""
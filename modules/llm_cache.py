@@ -0,0 +1,257 @@
+"""Persistent, content-addressed cache of LLM replies
+
+Replies are stored in SQLite under a hash of (backend, agent or profile,
+model, normalized prompt), so re-evaluating the same draft, regenerating an
+image prompt or re-analyzing a repeated news window is answered from disk.
+Each call type listed in CALL_TTLS has its own lifetime (calls without
+one, such as creative prompts, are never cached), the store is held under
+LLM_CACHE_MAX_MB by dropping the least recently used replies, and
+LLM_CACHE_BYPASS=1 (or use_cache=False on a call) skips it entirely.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from . import replay
+from .json_stream import extract_json
+
+DB_PATH = os.environ.get(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "llm.db")
+)
+MAX_BYTES = int(float(os.environ.get("LLM_CACHE_MAX_MB", 64)) * 1024 * 1024)
+BYPASS = os.environ.get("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+
+# Lifetime (seconds) per call type; LM Studio calls use their profile name.
+# Analyses follow the news and go stale quickly, evaluations and image prompts
+# of an unchanged draft stay valid. 0 disables caching for a call type.
+# Anything not listed, including untagged calls, is not cached: identical
+# creative prompts should still get a fresh reply.
+CALL_TTLS: Dict[str, int] = {
+    "analysis": 6 * 3600,
+    "headline_reviewer": 6 * 3600,
+    "headline_batch_reviewer": 6 * 3600,
+    "article": 3600,
+    "article_writer": 3600,
+    "headline_writer": 3600,
+    "haiku_writer": 3600,
+    "evaluation": 7 * 86400,
+    "image_prompt": 7 * 86400
+}
+DEFAULT_TTL = 0
+
+# Call types whose callers extract JSON from the reply; a reply without a
+# complete JSON value is not stored, so a retry asks the model again
+JSON_CALL_TYPES = frozenset(["analysis", "article", "evaluation"])
+
+# Eviction trims the store to this share of MAX_BYTES so it doesn't run on
+# every write once the cache is full
+EVICT_TO = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS replies (
+    key TEXT PRIMARY KEY,
+    backend TEXT,
+    call_type TEXT,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL,
+    expires_at REAL,
+    last_used REAL,
+    hits INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_replies_last_used ON replies(last_used);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_state = {'initialized': False}
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+def _connect() -> sqlite3.Connection:
+    """Return this thread's connection, creating the schema on first use"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        return conn
+
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+    with _init_lock:
+        if not _state['initialized']:
+            conn.executescript(SCHEMA)
+            conn.commit()
+            _state['initialized'] = True
+
+    _local.conn = conn
+    return conn
+
+def _count(backend: str, name: str) -> None:
+    with _stats_lock:
+        counters = _stats.setdefault(backend, {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'bypassed': 0})
+        counters[name] += 1
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so prompts that differ only in layout share an entry"""
+    return " ".join(str(prompt or "").split())
+
+def make_key(backend: str, agent: Optional[str], model: Optional[str], prompt: str) -> str:
+    """Content address of one call"""
+    raw = json.dumps([backend, agent or "", model or "", normalize_prompt(prompt)])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def get_ttl(call_type: Optional[str]) -> int:
+    """Return the lifetime for a call type"""
+    return CALL_TTLS.get(call_type or "", DEFAULT_TTL)
+
+def is_json(reply: Any) -> bool:
+    """Whether a reply contains a complete JSON object or array"""
+    return isinstance(reply, str) and extract_json(reply) is not None
+
+def cacheable_reply(reply: Any, call_type: Optional[str] = None) -> bool:
+    """Whether a reply is worth storing for its call type"""
+    return bool(reply) and (call_type not in JSON_CALL_TYPES or is_json(reply))
+
+@contextmanager
+def bypass() -> Iterator[None]:
+    """Skip the cache for LLM calls made on this thread inside the block"""
+    previous = getattr(_local, 'bypass', False)
+    _local.bypass = True
+    try:
+        yield
+    finally:
+        _local.bypass = previous
+
+def active(use_cache: bool = True, call_type: Optional[str] = None) -> bool:
+    """
+    Whether a call of call_type may read and write the cache.
+
+    Only call types with a lifetime are cached. Record/replay runs always
+    skip it so fixtures capture, and benchmarks time, the real calls.
+    """
+    return (use_cache and get_ttl(call_type) > 0 and not BYPASS
+            and not getattr(_local, 'bypass', False) and not replay.enabled())
+
+def lookup(key: str, backend: str = "") -> Optional[Any]:
+    """Return the cached reply for a key, or None if it is missing or expired"""
+    now = time.time()
+    try:
+        conn = _connect()
+        row = conn.execute("SELECT value, expires_at FROM replies WHERE key = ?", (key,)).fetchone()
+        if row is not None and row[1] < now:
+            with conn:
+                conn.execute("DELETE FROM replies WHERE key = ?", (key,))
+            row = None
+        if row is None:
+            _count(backend, 'misses')
+            return None
+        with conn:
+            conn.execute("UPDATE replies SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        _count(backend, 'hits')
+        return json.loads(row[0])
+    except (sqlite3.Error, ValueError) as e:
+        print(f"Ignoring unreadable LLM cache entry: {str(e)}")
+        _count(backend, 'misses')
+        return None
+
+def store(key: str, value: Any, ttl: int, backend: str = "", call_type: Optional[str] = None) -> None:
+    """Save a reply and evict the least recently used ones if the store is over budget"""
+    if ttl <= 0:
+        return
+    now = time.time()
+    data = json.dumps(value)
+    try:
+        conn = _connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO replies (key, backend, call_type, value, size, created_at, expires_at, last_used, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, backend, call_type or "", data, len(data.encode('utf-8')), now, now + ttl, now)
+            )
+        _count(backend, 'writes')
+        _evict(conn)
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        print(f"Error writing LLM cache entry: {str(e)}")
+
+def _evict(conn: sqlite3.Connection) -> None:
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM replies").fetchone()[0]
+    if total <= MAX_BYTES:
+        return
+    with conn:
+        conn.execute("DELETE FROM replies WHERE expires_at < ?", (time.time(),))
+        rows = conn.execute("SELECT key, size, backend FROM replies ORDER BY last_used").fetchall()
+        total = sum(size for _, size, _ in rows)
+        for key, size, backend in rows:
+            if total <= MAX_BYTES * EVICT_TO:
+                break
+            conn.execute("DELETE FROM replies WHERE key = ?", (key,))
+            total -= size
+            _count(backend, 'evictions')
+
+def cached_call(backend: str, agent: Optional[str], model: Optional[str], prompt: str,
+                call: Callable[[], Any], call_type: Optional[str] = None, use_cache: bool = True,
+                cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+    """
+    Serve a reply from the cache, falling back to call().
+
+    Only replies that pass cacheable (default: cacheable_reply for the call
+    type) are stored, so error messages and malformed replies are retried
+    next time.
+    """
+    if not active(use_cache, call_type):
+        _count(backend, 'bypassed')
+        return call()
+    key = make_key(backend, agent, model, prompt)
+    cached = lookup(key, backend)
+    if cached is not None:
+        return cached
+    result = call()
+    if cacheable(result) if cacheable else cacheable_reply(result, call_type):
+        store(key, result, get_ttl(call_type), backend, call_type)
+    return result
+
+def stats() -> Dict[str, Any]:
+    """Hit/miss counters of this process per backend, plus what is on disk"""
+    with _stats_lock:
+        session = {backend: dict(counters) for backend, counters in _stats.items()}
+    for counters in session.values():
+        looked_up = counters['hits'] + counters['misses']
+        counters['hit_rate'] = counters['hits'] / looked_up if looked_up else 0.0
+    try:
+        entries, size, hits = _connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM replies"
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"Error reading LLM cache stats: {str(e)}")
+        entries, size, hits = 0, 0, 0
+    return {'session': session, 'entries': entries, 'bytes': size, 'stored_hits': hits}
+
+def clear() -> None:
+    """Remove all cached LLM replies"""
+    conn = _connect()
+    with conn:
+        conn.execute("DELETE FROM replies")
+    conn.execute("VACUUM")
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "stats":
+        summary = stats()
+        print(f"{summary['entries']} replies, {summary['bytes'] / 1024:.1f} KiB, "
+              f"{summary['stored_hits']} hits served in {DB_PATH}")
+    elif command == "clear":
+        clear()
+        print(f"Cleared {DB_PATH}")
+    else:
+        print("Usage: python -m modules.llm_cache [stats | clear]")
+        sys.exit(1)
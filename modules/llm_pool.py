@@ -0,0 +1,130 @@
+"""Concurrency-capped, rate-limited worker pool for LLM calls"""
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import http_client
+
+# Per-backend limits. `concurrency` caps calls in flight; `rate` (calls per
+# second) and `burst` size the token bucket that spaces out call starts.
+# A local LM Studio model serves one request at a time, so extra workers
+# there only queue on the GPU.
+BACKEND_LIMITS: Dict[str, Dict[str, float]] = {
+    "codegpt": {"concurrency": int(os.environ.get("CODEGPT_MAX_CONCURRENCY", 8)), "rate": 4.0, "burst": 8},
+    "lmstudio": {"concurrency": int(os.environ.get("LMSTUDIO_MAX_CONCURRENCY", 2)), "rate": 10.0, "burst": 2}
+}
+DEFAULT_LIMITS = {"concurrency": 4, "rate": 2.0, "burst": 4}
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is free"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+def get_limits(backend: str) -> Dict[str, float]:
+    return BACKEND_LIMITS.get(backend, DEFAULT_LIMITS)
+
+def get_bucket(backend: str) -> TokenBucket:
+    """The process-wide rate limiter for a backend, shared by every pool"""
+    with _buckets_lock:
+        bucket = _buckets.get(backend)
+        if bucket is None:
+            limits = get_limits(backend)
+            bucket = TokenBucket(limits["rate"], limits["burst"])
+            _buckets[backend] = bucket
+        return bucket
+
+def imap_completed(func: Callable[[Any], Any], items: Iterable[Any], backend: str,
+                   max_workers: Optional[int] = None) -> Iterator[Tuple[Any, Any, Optional[Exception]]]:
+    """
+    Run func over items concurrently and yield (item, result, error) as each finishes.
+
+    At most max_workers calls (default: the backend's concurrency cap) run at
+    once and every call first takes a token from the backend's bucket. A call
+    that raises is yielded with its exception instead of stopping the batch.
+    """
+    items = list(items)
+    if not items:
+        return
+    bucket = get_bucket(backend)
+    workers = max(1, min(max_workers or int(get_limits(backend)["concurrency"]), len(items)))
+
+    def call(item):
+        bucket.acquire()
+        return func(item)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{backend}-pool") as executor:
+        futures = {executor.submit(call, item): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                yield item, future.result(), None
+            except Exception as e:
+                yield item, None, e
+
+async def gather_limited(aws: Iterable[Awaitable[Any]], limit: Optional[int] = None,
+                         backend: Optional[str] = None, return_exceptions: bool = False) -> List[Any]:
+    """
+    Await chat coroutines concurrently, at most limit at a time, and return results in input order.
+
+    limit defaults to the backend's concurrency cap. With a backend, every
+    call also takes a token from its bucket first, like imap_completed.
+    """
+    aws = list(aws)
+    if not aws:
+        return []
+    limit = limit or (int(get_limits(backend)["concurrency"]) if backend else len(aws))
+    semaphore = asyncio.Semaphore(max(1, limit))
+    bucket = get_bucket(backend) if backend else None
+
+    async def run(aw):
+        async with semaphore:
+            if bucket is not None:
+                await asyncio.to_thread(bucket.acquire)
+            return await aw
+
+    return await asyncio.gather(*(run(aw) for aw in aws), return_exceptions=return_exceptions)
+
+def run_concurrently(aws: Iterable[Awaitable[Any]], limit: Optional[int] = None,
+                     backend: Optional[str] = None, return_exceptions: bool = False) -> List[Any]:
+    """
+    Blocking wrapper around gather_limited for the CLI scripts and Streamlit.
+
+    Runs its own event loop, on a helper thread if the caller already has
+    one running, and closes that loop's HTTP client before returning.
+    """
+    async def gather_and_close():
+        try:
+            return await gather_limited(aws, limit, backend, return_exceptions)
+        finally:
+            await http_client.aclose_async_client()
+
+    coroutine = gather_and_close()
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="gather") as executor:
+        return executor.submit(asyncio.run, coroutine).result()
@@ -0,0 +1,189 @@
+"""Compact article and cluster models for session state"""
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+from . import article_store
+
+class Article:
+    """
+    One source article holding only identifiers and metadata in memory.
+
+    The body lives in the article store and is read on demand through the
+    `content` property. Dict-style access (article['title'],
+    article.get('content', '')) is supported so existing callers keep working.
+    """
+
+    __slots__ = ('link', 'title', 'name_source', 'published_date', '_content')
+
+    FIELDS = ('link', 'title', 'name_source', 'published_date')
+
+    def __init__(self, link: str = '', title: str = '', name_source: str = '',
+                 published_date: str = '', content: Optional[str] = None):
+        self.link = link
+        self.title = title
+        # Source names repeat across every cluster; share one string per name
+        self.name_source = sys.intern(name_source) if name_source else name_source
+        self.published_date = published_date
+        self._content = content
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], keep_content: bool = False) -> 'Article':
+        """Build from an API article dict, dropping the body unless asked not to"""
+        link = data.get('link', '')
+        return cls(
+            link=link,
+            title=data.get('title', ''),
+            name_source=data.get('name_source', ''),
+            published_date=data.get('published_date', ''),
+            content=data.get('content', '') if keep_content or not link else None
+        )
+
+    @property
+    def content(self) -> str:
+        if self._content is not None:
+            return self._content
+        return article_store.get_article_content(self.link) or ''
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key == 'content':
+            return self.content
+        if key in self.FIELDS:
+            return getattr(self, key)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        if key != 'content' and key not in self.FIELDS:
+            raise KeyError(key)
+        return self.get(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key == 'content' or key in self.FIELDS
+
+    def to_dict(self, include_content: bool = False) -> Dict[str, Any]:
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        if include_content:
+            data['content'] = self.content
+        return data
+
+    def to_prompt_dict(self, source_id: int) -> Dict[str, Any]:
+        """The source shape used by the article creation prompt"""
+        return {
+            "title": self.title,
+            "content": self.content,
+            "name_source": self.name_source,
+            "link": self.link,
+            "source_id": source_id
+        }
+
+    def __repr__(self) -> str:
+        return f"Article({self.name_source!r}, {self.title!r})"
+
+class Cluster:
+    """
+    A story cluster: analysis fields plus a list of slotted Articles.
+
+    Supports the same dict-style reads as the raw cluster dicts it replaces
+    (cluster['articles'], cluster.get('subject'), 'articles' in cluster).
+    """
+
+    __slots__ = ('cluster_id', 'articles', 'category', 'subject', 'bias',
+                 'most_recent_headline', 'unique_source_count', 'extra')
+
+    FIELDS = ('cluster_id', 'articles', 'category', 'subject', 'bias',
+              'most_recent_headline', 'unique_source_count')
+
+    def __init__(self, articles: Iterable[Article], cluster_id: Any = None,
+                 category: str = 'Unknown', subject: str = 'Unknown', bias: float = 0.0,
+                 most_recent_headline: str = '', unique_source_count: Optional[int] = None,
+                 extra: Optional[Dict[str, Any]] = None):
+        self.articles: List[Article] = list(articles)
+        self.cluster_id = cluster_id
+        self.category = category
+        self.subject = subject
+        self.bias = bias
+        self.most_recent_headline = most_recent_headline
+        if unique_source_count is None:
+            unique_source_count = len({a.name_source for a in self.articles})
+        self.unique_source_count = unique_source_count
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Cluster':
+        """
+        Build from a raw or analyzed cluster dict.
+
+        Article bodies are written to the article store first if they are not
+        there yet, then dropped from memory.
+        """
+        raw_articles = data.get('articles', [])
+        keep_content = False
+        dict_articles = [a for a in raw_articles if isinstance(a, dict)]
+        if dict_articles:
+            try:
+                missing = article_store.missing_links(a.get('link') for a in dict_articles)
+                if missing:
+                    article_store.ingest_clusters([{
+                        'cluster_id': data.get('cluster_id'),
+                        'articles': [a for a in dict_articles if a.get('link') in missing]
+                    }])
+            except Exception as e:
+                # Without the store the bodies have to stay in memory
+                print(f"Article store unavailable, keeping content in memory: {str(e)}")
+                keep_content = True
+
+        articles = [a if isinstance(a, Article) else Article.from_dict(a, keep_content)
+                    for a in raw_articles]
+        extra = {k: v for k, v in data.items()
+                 if k not in cls.FIELDS and k not in ('cluster_size', 'articles')}
+        return cls(
+            articles,
+            cluster_id=data.get('cluster_id'),
+            category=data.get('category', 'Unknown'),
+            subject=data.get('subject', 'Unknown'),
+            bias=data.get('bias', 0.0),
+            most_recent_headline=data.get('most_recent_headline', ''),
+            unique_source_count=data.get('unique_source_count'),
+            extra=extra
+        )
+
+    @property
+    def cluster_size(self) -> int:
+        return len(self.articles)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key == 'cluster_size':
+            return self.cluster_size
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self:
+            raise KeyError(key)
+        return self.get(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self.FIELDS:
+            setattr(self, key, value)
+        elif key == 'cluster_size':
+            raise KeyError("cluster_size is derived from articles")
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS or key == 'cluster_size' or bool(self.extra and key in self.extra)
+
+    def to_dict(self, include_content: bool = False) -> Dict[str, Any]:
+        data = {field: getattr(self, field) for field in self.FIELDS if field != 'articles'}
+        data['cluster_size'] = self.cluster_size
+        data['articles'] = [a.to_dict(include_content) for a in self.articles]
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self) -> str:
+        return f"Cluster({self.subject!r}, {self.cluster_size} articles)"
@@ -0,0 +1,129 @@
+"""Near-duplicate article detection with MinHash signatures and an LSH index
+
+Syndicated wire copy is republished under slightly reworded headlines, so
+exact title matching misses it. Each article is reduced to word shingles of
+its title and lead, hashed into a MinHash signature, and bucketed by
+signature bands; only articles sharing a bucket are compared, which keeps
+candidate lookup linear in the number of articles.
+"""
+import re
+import zlib
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+# Signature length and banding: 16 bands of 4 rows put the LSH S-curve's
+# midpoint near 0.5 Jaccard, comfortably below SIMILARITY_THRESHOLD
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Estimated Jaccard similarity at or above which two articles are duplicates
+SIMILARITY_THRESHOLD = 0.7
+
+SHINGLE_SIZE = 3
+
+# Only the lead is shingled; rewrites and local add-ons come further down
+MAX_CONTENT_WORDS = 300
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_RE = re.compile(r"\w+")
+
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, _MAX_HASH, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, _MAX_HASH, size=NUM_PERM, dtype=np.uint64)
+
+def _article_text(article: Any) -> List[str]:
+    title = article.get('title', '') or ''
+    content = article.get('content', '') or ''
+    words = _WORD_RE.findall(title.lower())
+    words += _WORD_RE.findall(content.lower())[:MAX_CONTENT_WORDS]
+    return words
+
+def shingle_hashes(words: Sequence[str], size: int = SHINGLE_SIZE) -> np.ndarray:
+    """32-bit hashes of the word shingles of a token list"""
+    if len(words) < size:
+        shingles = {" ".join(words)} if words else set()
+    else:
+        shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                       dtype=np.uint64, count=len(shingles))
+
+def minhash_signature(hashes: np.ndarray) -> np.ndarray:
+    """MinHash signature of a set of shingle hashes, one row per permutation"""
+    if hashes.size == 0:
+        return np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    # (a * x + b) mod p, truncated to 32 bits; a and x are both < 2**32 so
+    # the product cannot overflow uint64
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE_PRIME
+    return (permuted & _MAX_HASH).min(axis=1)
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def find_duplicate_groups(articles: Sequence[Any], threshold: float = SIMILARITY_THRESHOLD) -> List[List[int]]:
+    """
+    Group article indices whose estimated Jaccard similarity reaches threshold.
+
+    Returns every group, singletons included, in first-seen order.
+    """
+    signatures = np.array([minhash_signature(shingle_hashes(_article_text(a))) for a in articles])
+    parent = list(range(len(articles)))
+
+    buckets: Dict[tuple, List[int]] = {}
+    for i, signature in enumerate(signatures):
+        for band in range(BANDS):
+            key = (band, signature[band * ROWS:(band + 1) * ROWS].tobytes())
+            buckets.setdefault(key, []).append(i)
+
+    checked = set()
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        for pos, first in enumerate(members):
+            for other in members[pos + 1:]:
+                if (first, other) in checked:
+                    continue
+                checked.add((first, other))
+                root_a, root_b = _find(parent, first), _find(parent, other)
+                if root_a == root_b:
+                    continue
+                similarity = np.count_nonzero(signatures[first] == signatures[other]) / NUM_PERM
+                if similarity >= threshold:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(articles)):
+        groups.setdefault(_find(parent, i), []).append(i)
+    return list(groups.values())
+
+def _representative_rank(article: Any) -> tuple:
+    # The fullest copy wins; the most recent breaks ties
+    return (len(article.get('content', '') or ''), article.get('published_date', '') or '')
+
+def collapse_near_duplicates(articles: Sequence[Any], threshold: float = SIMILARITY_THRESHOLD,
+                             keep_each_source: bool = False) -> List[Any]:
+    """
+    Keep the best representative of each near-duplicate group.
+
+    With keep_each_source, an outlet whose every article was collapsed into
+    another outlet's copy keeps its own best copy too, so the result covers
+    the same outlets as the input.
+    """
+    if len(articles) < 2:
+        return list(articles)
+    groups = [[articles[i] for i in group] for group in find_duplicate_groups(articles, threshold)]
+    kept = [[max(group, key=_representative_rank)] for group in groups]
+    if keep_each_source:
+        covered = {group[0].get('name_source', '') for group in kept}
+        for group, representatives in zip(groups, kept):
+            for article in sorted(group, key=_representative_rank, reverse=True):
+                source = article.get('name_source', '')
+                if source not in covered:
+                    covered.add(source)
+                    representatives.append(article)
+    return [article for representatives in kept for article in representatives]
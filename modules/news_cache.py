@@ -0,0 +1,144 @@
+"""On-disk response cache for NewsCatcher queries"""
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+CACHE_DIR = os.environ.get(
+    "NEWS_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "news")
+)
+
+# Fresh lifetime (seconds) per search window. Short windows move quickly,
+# long windows barely change between two clicks.
+WINDOW_TTLS: Dict[str, int] = {
+    "1h": 120, "3h": 300, "4h": 300, "6h": 600, "12h": 900,
+    "24h": 1200, "2d": 1800, "3d": 2700, "5d": 3600, "7d": 3600
+}
+DEFAULT_TTL = 1800
+
+# A stale entry is still served (and refreshed in the background) until it is
+# this many times older than its TTL.
+STALE_FACTOR = 4
+
+_refresh_lock = threading.Lock()
+_refreshing = set()
+
+def normalize_query(query: str) -> str:
+    """Collapse case and whitespace so equivalent topics share a cache entry"""
+    return " ".join((query or "").lower().split())
+
+def make_cache_key(search_type: str, query: str, when: str, params: Dict[str, Any]) -> str:
+    """Build a stable cache key from the search arguments and request params"""
+    # The params carry the query too; normalize it there as well so it can't
+    # split entries that normalize_query merges
+    params = dict(params)
+    if 'q' in params:
+        params['q'] = normalize_query(params['q'])
+    params_hash = hashlib.sha256(
+        json.dumps(params, sort_keys=True).encode('utf-8')
+    ).hexdigest()
+    raw = "|".join([search_type, normalize_query(query), when, params_hash])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def get_ttl(when: str) -> int:
+    """Return the fresh lifetime for a search window"""
+    return WINDOW_TTLS.get(when, DEFAULT_TTL)
+
+def _cache_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+def _load_entry(key: str) -> Optional[Dict[str, Any]]:
+    path = _cache_path(key)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        if 'data' not in entry or 'stored_at' not in entry:
+            raise KeyError('data')
+        return entry
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Ignoring unreadable cache entry {path}: {str(e)}")
+        return None
+
+def load_cached_response(key: str) -> Tuple[Optional[Any], Optional[float]]:
+    """Return (data, age_in_seconds) for a cached entry, or (None, None)"""
+    entry = _load_entry(key)
+    if entry is None:
+        return None, None
+    return entry['data'], time.time() - entry['stored_at']
+
+def save_cached_response(key: str, data: Any, ttl: Optional[int] = None) -> None:
+    """
+    Write a cache entry atomically so readers never see a partial file.
+
+    `ttl` overrides the window's default lifetime for this entry; the
+    prefetcher uses it to keep entries fresh until its next scheduled run.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    entry = {'stored_at': time.time(), 'data': data}
+    if ttl is not None:
+        entry['ttl'] = ttl
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, _cache_path(key))
+    except Exception as e:
+        print(f"Error writing cache entry: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _refresh_in_background(key: str, fetch: Callable[[], Any]) -> None:
+    """Re-fetch a stale entry on a daemon thread, one refresh per key at a time"""
+    with _refresh_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def worker():
+        try:
+            data = fetch()
+            if data is not None:
+                save_cached_response(key, data)
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=worker, daemon=True).start()
+
+def cached_fetch(key: str, ttl: int, fetch: Callable[[], Any]) -> Any:
+    """
+    Serve a response from the cache, falling back to fetch().
+
+    Fresh entries are returned directly. Stale entries inside the
+    stale-while-revalidate window are returned immediately while a background
+    refresh runs. Anything older, or missing, is fetched synchronously.
+    """
+    entry = _load_entry(key)
+    if entry is not None:
+        data = entry['data']
+        age = time.time() - entry['stored_at']
+        ttl = entry.get('ttl', ttl)
+        if age <= ttl:
+            return data
+        if age <= ttl * STALE_FACTOR:
+            _refresh_in_background(key, fetch)
+            return data
+
+    data = fetch()
+    if data is not None:
+        save_cached_response(key, data)
+    return data
+
+def clear_cache() -> None:
+    """Remove all cached NewsCatcher responses"""
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith(".json"):
+            os.remove(os.path.join(CACHE_DIR, name))
@@ -0,0 +1,247 @@
+"""Paged, streaming NewsCatcher ingestion"""
+import re
+import json
+import queue
+import codecs
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from . import http_client
+
+# Characters that change the scanner state outside of strings, and the ones
+# that can end or escape inside a string.
+_TOKEN_RE = re.compile(r'["{}\[\],:]')
+_STRING_END_RE = re.compile(r'["\\]')
+
+class JsonArrayStreamer:
+    """
+    Incrementally extract the elements of one top-level array from a JSON object.
+
+    Text is pushed in with feed() as it arrives from the network. Each object in
+    the array named by `key` is decoded and returned as soon as its closing brace
+    is seen, and the consumed text is dropped so memory stays bounded by the size
+    of a single element. Top-level scalar fields (total_pages, total_hits, ...)
+    are collected into `meta`.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.meta: Dict[str, Any] = {}
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.string_start: Optional[int] = None
+        self.in_array = False
+        self.item_start: Optional[int] = None
+        self.expecting_key = False
+        self.last_key: Optional[str] = None
+        self.value_start: Optional[int] = None
+
+    def feed(self, text: str) -> List[Any]:
+        """Consume a chunk of text and return the array elements it completed"""
+        self.buffer += text
+        items = []
+        buf = self.buffer
+
+        while True:
+            if self.in_string:
+                match = _STRING_END_RE.search(buf, self.pos)
+                if not match:
+                    self.pos = len(buf)
+                    break
+                if match.group() == '\\':
+                    if match.end() >= len(buf):
+                        # Escape split across chunks; wait for the next one
+                        self.pos = match.start()
+                        break
+                    self.pos = match.end() + 1
+                    continue
+                self.in_string = False
+                self.pos = match.end()
+                if self.depth == 1:
+                    value = json.loads(buf[self.string_start:self.pos])
+                    if self.expecting_key:
+                        self.last_key = value
+                    else:
+                        self.meta[self.last_key] = value
+                        self.value_start = None
+                self.string_start = None
+                continue
+
+            match = _TOKEN_RE.search(buf, self.pos)
+            if not match:
+                self.pos = len(buf)
+                break
+            char = match.group()
+            self.pos = match.end()
+
+            if char == '"':
+                self.in_string = True
+                self.string_start = match.start()
+            elif char in '{[':
+                if self.depth == 0:
+                    self.expecting_key = True
+                elif self.depth == 1:
+                    self.value_start = None
+                    if char == '[' and self.last_key == self.key:
+                        self.in_array = True
+                elif self.depth == 2 and self.in_array:
+                    self.item_start = match.start()
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+                if self.depth == 2 and self.item_start is not None:
+                    items.append(json.loads(buf[self.item_start:self.pos]))
+                    self.item_start = None
+                elif self.depth == 1 and self.in_array:
+                    self.in_array = False
+                elif self.depth == 0:
+                    self._finish_scalar(match.start())
+            elif self.depth == 1:
+                if char == ':':
+                    self.expecting_key = False
+                    self.value_start = self.pos
+                else:
+                    self._finish_scalar(match.start())
+                    self.expecting_key = True
+
+        self._trim()
+        return items
+
+    def _finish_scalar(self, end: int) -> None:
+        if self.value_start is None:
+            return
+        raw = self.buffer[self.value_start:end].strip()
+        if raw:
+            try:
+                self.meta[self.last_key] = json.loads(raw)
+            except ValueError:
+                self.meta[self.last_key] = raw
+        self.value_start = None
+
+    def _trim(self) -> None:
+        """Drop text that no pending item, string or scalar still needs"""
+        marks = [m for m in (self.item_start, self.string_start, self.value_start) if m is not None]
+        keep_from = min(marks + [self.pos])
+        if keep_from == 0:
+            return
+        self.buffer = self.buffer[keep_from:]
+        self.pos -= keep_from
+        if self.item_start is not None:
+            self.item_start -= keep_from
+        if self.string_start is not None:
+            self.string_start -= keep_from
+        if self.value_start is not None:
+            self.value_start -= keep_from
+
+def _stream_page(session, url, params, headers, page, out, on_meta=None, timeout=60, sink=None):
+    """Stream one result page, pushing each parsed cluster onto the out queue"""
+    page_params = dict(params, page=str(page))
+    streamer = JsonArrayStreamer("clusters")
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    meta_sent = False
+
+    with session.get(url, params=page_params, headers=headers, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=65536):
+            clusters = streamer.feed(decoder.decode(chunk))
+            for cluster in clusters:
+                out.put(('cluster', page, cluster))
+            if sink and clusters:
+                sink(clusters)
+            if on_meta and not meta_sent and 'total_pages' in streamer.meta:
+                on_meta(dict(streamer.meta))
+                meta_sent = True
+        clusters = streamer.feed(decoder.decode(b'', final=True))
+        for cluster in clusters:
+            out.put(('cluster', page, cluster))
+        if sink and clusters:
+            sink(clusters)
+
+    if streamer.meta.get('status') == 'error':
+        raise ValueError(streamer.meta.get('message', 'Unknown error'))
+    if on_meta and not meta_sent:
+        on_meta(dict(streamer.meta))
+    out.put(('meta', page, dict(streamer.meta)))
+
+def stream_news_clusters(url: str, params: Dict[str, Any], headers: Dict[str, str],
+                         page_size: int = 200, max_pages: int = 4,
+                         max_workers: int = 4, timeout: int = 60,
+                         sink: Optional[Callable[[List[Dict[str, Any]]], Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield NewsCatcher clusters as they are parsed off the wire.
+
+    Page 1 is requested first; as soon as its total_pages header field has been
+    parsed, the remaining pages (up to max_pages) are fetched concurrently. Each
+    yielded cluster gets a `page` key so callers can tell pages apart. Page
+    metadata (total_hits, clusters_count, ...) is summed into the generator's
+    return value. If given, `sink` receives each batch of parsed clusters on the
+    download thread, e.g. to persist them without slowing the consumer.
+    """
+    params = dict(params, page_size=str(page_size))
+    out = queue.Queue()
+    pending = {'pages': 1}
+    pending_lock = threading.Lock()
+    session = http_client.get_session()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def run_page(page, on_meta=None):
+        try:
+            _stream_page(session, url, params, headers, page, out, on_meta, timeout, sink)
+        except Exception as e:
+            out.put(('error', page, e))
+        finally:
+            out.put(('done', page, None))
+
+    def schedule_remaining(meta):
+        total_pages = min(int(meta.get('total_pages') or 1), max_pages)
+        with pending_lock:
+            pending['pages'] += total_pages - 1
+        for page in range(2, total_pages + 1):
+            executor.submit(run_page, page)
+
+    totals = {'total_hits': 0, 'clusters_count': 0, 'pages': 0}
+    executor.submit(run_page, 1, schedule_remaining)
+    finished = 0
+    try:
+        while True:
+            with pending_lock:
+                if finished >= pending['pages']:
+                    break
+            kind, page, payload = out.get()
+            if kind == 'cluster':
+                payload['page'] = page
+                yield payload
+            elif kind == 'meta':
+                totals['pages'] += 1
+                totals['total_hits'] = max(totals['total_hits'], int(payload.get('total_hits') or 0))
+                totals['clusters_count'] += int(payload.get('clusters_count') or 0)
+            elif kind == 'error':
+                print(f"Error fetching page {page}: {str(payload)}")
+            elif kind == 'done':
+                finished += 1
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return totals
+
+def collect_news_clusters(url: str, params: Dict[str, Any], headers: Dict[str, str],
+                          **kwargs) -> Optional[Dict[str, Any]]:
+    """Drain stream_news_clusters into the dict shape of a single API response"""
+    clusters = []
+    stream = stream_news_clusters(url, params, headers, **kwargs)
+    while True:
+        try:
+            clusters.append(next(stream))
+        except StopIteration as stop:
+            totals = stop.value or {}
+            break
+    if not clusters and not totals.get('pages'):
+        return None
+    return {
+        'status': 'ok',
+        'total_hits': totals.get('total_hits', 0),
+        'clusters_count': len(clusters),
+        'clusters': clusters
+    }
@@ -0,0 +1,109 @@
+"""Background prefetcher that keeps common headline windows warm in the news cache
+
+Run it alongside the dashboard:
+
+    python -m modules.prefetch            # all PREFETCH_SCHEDULE windows
+    python -m modules.prefetch 1h 24h     # only the listed windows
+
+Each window is re-fetched on its own cadence, its clusters are deduplicated
+and summarized up front, and the result is written to the same on-disk cache
+entry get_news_data reads, so a Headlines search is served without waiting on
+the API.
+"""
+import sys
+import time
+import heapq
+import threading
+from typing import Dict, Iterable, Optional
+
+from .api_client import refresh_news_data
+from .cluster_analysis import normalize_news_data
+
+# Seconds between refreshes per window. Every run costs four API pages, so
+# longer windows, which change slowly, are refreshed less often.
+PREFETCH_SCHEDULE: Dict[str, int] = {
+    "1h": 300,
+    "6h": 900,
+    "24h": 1800,
+    "3d": 3600,
+    "7d": 7200
+}
+
+# Prefetched entries stay fresh this many times their refresh interval, so a
+# slightly late run never leaves the dashboard holding a stale entry
+FRESHNESS_FACTOR = 1.5
+
+# Seconds to wait before retrying a window whose fetch failed
+RETRY_DELAY = 60
+
+_stop = threading.Event()
+_state = {'thread': None}
+
+def prefetch_window(when: str) -> bool:
+    """Fetch, normalize and publish one headline window; True on success"""
+    interval = PREFETCH_SCHEDULE.get(when, 1800)
+    start = time.time()
+    data = refresh_news_data(
+        "Headlines",
+        when=when,
+        ttl=int(interval * FRESHNESS_FACTOR),
+        prepare=normalize_news_data
+    )
+    if data is None:
+        print(f"Prefetch of {when} headlines failed")
+        return False
+    print(f"Prefetched {len(data.get('clusters', []))} {when} clusters in {time.time() - start:.1f}s")
+    return True
+
+def run_scheduler(windows: Optional[Iterable[str]] = None) -> None:
+    """
+    Refresh each window on its cadence until stop() is called.
+
+    Windows are due immediately on start-up, then every
+    PREFETCH_SCHEDULE[window] seconds. Runs happen one at a time so the
+    prefetcher never competes with itself for API quota.
+    """
+    windows = list(windows or PREFETCH_SCHEDULE)
+    queue = [(0.0, i, when) for i, when in enumerate(windows)]
+    heapq.heapify(queue)
+
+    while queue and not _stop.is_set():
+        due, order, when = queue[0]
+        wait = due - time.time()
+        if wait > 0:
+            _stop.wait(wait)
+            continue
+        heapq.heappop(queue)
+        try:
+            ok = prefetch_window(when)
+        except Exception as e:
+            print(f"Error prefetching {when} headlines: {str(e)}")
+            ok = False
+        delay = PREFETCH_SCHEDULE.get(when, 1800) if ok else RETRY_DELAY
+        heapq.heappush(queue, (time.time() + delay, order, when))
+
+def start_background_prefetch(windows: Optional[Iterable[str]] = None) -> None:
+    """Run the scheduler on a daemon thread inside the current process"""
+    thread = _state['thread']
+    if thread is not None and thread.is_alive():
+        return
+    _stop.clear()
+    thread = threading.Thread(target=run_scheduler, args=(windows,), name="headline-prefetch", daemon=True)
+    _state['thread'] = thread
+    thread.start()
+
+def stop() -> None:
+    """Ask the scheduler to exit after its current run"""
+    _stop.set()
+
+if __name__ == "__main__":
+    requested = sys.argv[1:]
+    unknown = [w for w in requested if w not in PREFETCH_SCHEDULE]
+    if unknown:
+        print(f"Unknown windows: {', '.join(unknown)}. Choose from {', '.join(PREFETCH_SCHEDULE)}")
+        sys.exit(1)
+    print(f"Prefetching headline windows: {', '.join(requested or PREFETCH_SCHEDULE)}")
+    try:
+        run_scheduler(requested or None)
+    except KeyboardInterrupt:
+        print("Prefetcher stopped")
@@ -0,0 +1,174 @@
+"""Local re-clustering of NewsCatcher clusters across queries and windows
+
+NewsCatcher clusters each response, and each page of a paged download, on
+its own, so when several pages, queries or windows are merged the same story
+can arrive as separate clusters. Joining them needs the whole result set, so
+callers re-cluster after the download rather than page by page. Here every
+article becomes a hashed TF-IDF vector over its title and lead, each incoming
+cluster is reduced to the normalized centroid of its articles, and centroid
+cosine similarity is computed block by block. Clusters that share an article
+link or whose centroids are similar enough are joined with union-find.
+"""
+import re
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+try:  # Optional: sparse vectors allow a much larger hashing space
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+# Hashed feature space. Dense centroids have to stay small enough to fit in
+# memory for thousands of clusters.
+HASH_DIM = 2 ** 18 if sparse is not None else 2 ** 12
+
+# Centroid cosine similarity at or above which two clusters are one story
+SIMILARITY_THRESHOLD = 0.5
+
+# Rows of the centroid matrix compared against all others per step
+BLOCK_SIZE = 1024
+
+# Only the lead is vectorized; it carries the story's key terms
+MAX_CONTENT_WORDS = 60
+
+_WORD_RE = re.compile(r"[a-z0-9]{2,}")
+
+STOPWORDS = frozenset("""
+    the and for are but not you all any can her was one our out day get has him his how
+    man new now old see two way who its did let put say she too use that with have this
+    will your from they know want been good much some time very when come here just like
+    long make many more only over such take than them well were what into after also
+    about could their there these which would other said says then while where
+""".split())
+
+def _tokens(article: Any) -> List[str]:
+    text = (article.get('title', '') or '') + ' ' + ' '.join(
+        (article.get('content', '') or '').split()[:MAX_CONTENT_WORDS])
+    return [t for t in _WORD_RE.findall(text.lower()) if t not in STOPWORDS]
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def _union(parent: List[int], a: int, b: int) -> None:
+    root_a, root_b = _find(parent, a), _find(parent, b)
+    if root_a != root_b:
+        # Keep the earliest cluster as the root so output order is stable
+        parent[max(root_a, root_b)] = min(root_a, root_b)
+
+def cluster_centroids(clusters: List[Dict[str, Any]]):
+    """
+    L2-normalized TF-IDF centroid per cluster, one row each.
+
+    Returns a scipy CSR matrix when scipy is installed, otherwise a dense
+    float32 array.
+    """
+    token_hashes = []
+    lengths = []
+    article_cluster = []
+    for index, cluster in enumerate(clusters):
+        for article in cluster.get('articles', []):
+            tokens = _tokens(article)
+            token_hashes.extend(map(hash, tokens))
+            lengths.append(len(tokens))
+            article_cluster.append(index)
+
+    n_clusters = len(clusters)
+    n_articles = len(lengths)
+    if not n_articles:
+        return np.zeros((n_clusters, 1), dtype=np.float32)
+
+    rows = np.repeat(np.arange(n_articles, dtype=np.int64), lengths)
+    cols = np.array(token_hashes, dtype=np.int64) % HASH_DIM
+
+    # Term counts per (article, feature), sublinear TF and smoothed IDF
+    keys, counts = np.unique(rows * HASH_DIM + cols, return_counts=True)
+    rows, cols = keys // HASH_DIM, keys % HASH_DIM
+    df = np.bincount(cols, minlength=HASH_DIM)
+    idf = np.log((1 + n_articles) / (1 + df)) + 1
+    weights = (1 + np.log(counts)) * idf[cols]
+
+    norms = np.sqrt(np.bincount(rows, weights * weights, minlength=n_articles))
+    weights = weights / np.maximum(norms[rows], 1e-12)
+
+    owners = np.asarray(article_cluster, dtype=np.int64)[rows]
+    if sparse is not None:
+        centroids = sparse.csr_matrix((weights, (owners, cols)), shape=(n_clusters, HASH_DIM))
+        lengths = np.sqrt(np.asarray(centroids.multiply(centroids).sum(axis=1)).ravel())
+        return sparse.diags(1 / np.maximum(lengths, 1e-12)) @ centroids
+
+    centroids = np.bincount(owners * HASH_DIM + cols, weights,
+                            minlength=n_clusters * HASH_DIM).reshape(n_clusters, HASH_DIM)
+    centroids = centroids.astype(np.float32)
+    lengths = np.linalg.norm(centroids, axis=1, keepdims=True)
+    return centroids / np.maximum(lengths, 1e-12)
+
+def similar_cluster_pairs(centroids, threshold: float = SIMILARITY_THRESHOLD) -> np.ndarray:
+    """Index pairs (i, j), i < j, whose centroid cosine reaches threshold"""
+    n = centroids.shape[0]
+    pairs = []
+    transposed = centroids.T
+    for start in range(0, n, BLOCK_SIZE):
+        block = centroids[start:start + BLOCK_SIZE] @ transposed
+        if sparse is not None and sparse.issparse(block):
+            block = block.toarray()
+        i, j = np.nonzero(block >= threshold)
+        i += start
+        keep = j > i
+        pairs.append(np.column_stack((i[keep], j[keep])))
+    return np.concatenate(pairs) if pairs else np.zeros((0, 2), dtype=np.int64)
+
+def recluster(clusters: Iterable[Dict[str, Any]], threshold: float = SIMILARITY_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Merge clusters that cover the same story.
+
+    Clusters are joined when they share an article link or when their
+    centroids' cosine similarity reaches threshold. Merged clusters keep the
+    first cluster's fields, deduplicate articles by link, list the original
+    IDs in 'merged_cluster_ids' and drop any precomputed 'summary'.
+    Unmerged clusters are returned unchanged, in their original order.
+    """
+    clusters = list(clusters)
+    if len(clusters) < 2:
+        return clusters
+
+    parent = list(range(len(clusters)))
+    link_owner = {}
+    for index, cluster in enumerate(clusters):
+        for article in cluster.get('articles', []):
+            link = article.get('link')
+            if not link:
+                continue
+            owner = link_owner.setdefault(link, index)
+            if owner != index:
+                _union(parent, owner, index)
+
+    for i, j in similar_cluster_pairs(cluster_centroids(clusters), threshold):
+        _union(parent, int(i), int(j))
+
+    groups: Dict[int, List[int]] = {}
+    for index in range(len(clusters)):
+        groups.setdefault(_find(parent, index), []).append(index)
+
+    result = []
+    for members in groups.values():
+        if len(members) == 1:
+            result.append(clusters[members[0]])
+            continue
+        merged = dict(clusters[members[0]], articles=[])
+        merged.pop('summary', None)
+        seen = set()
+        for index in members:
+            for article in clusters[index].get('articles', []):
+                link = article.get('link')
+                if link and link in seen:
+                    continue
+                seen.add(link)
+                merged['articles'].append(article)
+        merged['cluster_size'] = len(merged['articles'])
+        merged['merged_cluster_ids'] = [clusters[index].get('cluster_id') for index in members]
+        result.append(merged)
+    return result
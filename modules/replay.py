@@ -0,0 +1,187 @@
+"""Record/replay fixture layer for running the pipeline offline
+
+Set HTTP_REPLAY_MODE to "record" to capture every outbound HTTP response,
+LLM reply and FTP upload result into HTTP_REPLAY_DIR, or to "replay" to serve
+them back without touching the network. In replay mode each response is
+delayed by its recorded duration times HTTP_REPLAY_LATENCY_SCALE, or by a
+fixed HTTP_REPLAY_LATENCY_MS when that is set, so timings stay realistic.
+"""
+import os
+import json
+import time
+import base64
+import hashlib
+import tempfile
+import threading
+import functools
+from io import BytesIO
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+MODE = os.environ.get("HTTP_REPLAY_MODE", "off").lower()
+FIXTURE_DIR = os.environ.get(
+    "HTTP_REPLAY_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "fixtures")
+)
+LATENCY_MS = os.environ.get("HTTP_REPLAY_LATENCY_MS")
+LATENCY_SCALE = float(os.environ.get("HTTP_REPLAY_LATENCY_SCALE", "1.0"))
+
+# Query parameters that are either cache busters or secrets; they are left out
+# of fixture keys and never written to disk.
+IGNORED_PARAMS = {"timestamp", "access_token", "api_key", "apikey", "token"}
+
+_lock = threading.Lock()
+_record_counts: Dict[str, int] = {}
+_replay_counts: Dict[str, int] = {}
+
+class FixtureNotFound(Exception):
+    """Raised in replay mode when nothing was recorded for a request"""
+
+def enabled() -> bool:
+    return MODE in ("record", "replay")
+
+def recording() -> bool:
+    return MODE == "record"
+
+def replaying() -> bool:
+    return MODE == "replay"
+
+def _fixture_key(service: str, parts: Any) -> str:
+    raw = json.dumps([service, parts], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def _fixture_path(key: str) -> str:
+    return os.path.join(FIXTURE_DIR, f"{key}.json")
+
+def _load_fixture(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_fixture_path(key), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _save_fixture(key: str, fixture: Dict[str, Any]) -> None:
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=FIXTURE_DIR, suffix=".tmp")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(fixture, f)
+    os.replace(tmp_path, _fixture_path(key))
+
+def _record(key: str, description: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    """
+    Append one response to a fixture.
+
+    Repeated identical requests (e.g. polling an image job) are stored in order,
+    and the first recording of a key in a process replaces any older fixture.
+    """
+    with _lock:
+        count = _record_counts.get(key, 0)
+        fixture = _load_fixture(key) if count else None
+        if fixture is None:
+            fixture = {'request': description, 'responses': []}
+        fixture['responses'].append(entry)
+        _save_fixture(key, fixture)
+        _record_counts[key] = count + 1
+
+def _next_replay(key: str, description: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the next recorded response for a key, repeating the last one"""
+    fixture = _load_fixture(key)
+    if not fixture or not fixture.get('responses'):
+        raise FixtureNotFound(f"No recorded fixture for {json.dumps(description, default=str)}")
+    with _lock:
+        index = _replay_counts.get(key, 0)
+        _replay_counts[key] = index + 1
+    responses = fixture['responses']
+    entry = responses[min(index, len(responses) - 1)]
+    _inject_latency(entry.get('elapsed', 0.0))
+    return entry
+
+def _inject_latency(recorded: float) -> None:
+    delay = float(LATENCY_MS) / 1000 if LATENCY_MS else recorded * LATENCY_SCALE
+    if delay > 0:
+        time.sleep(delay)
+
+def _clean_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k.lower() not in IGNORED_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+class ReplayAdapter(HTTPAdapter):
+    """Transport adapter that records responses or serves them from fixtures"""
+
+    def send(self, request, **kwargs):
+        body = request.body or b''
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        elif not isinstance(body, bytes):
+            body = b''
+        description = {
+            'method': request.method,
+            'url': _clean_url(request.url),
+            'body_sha256': hashlib.sha256(body).hexdigest()
+        }
+        key = _fixture_key("http", description)
+
+        if replaying():
+            try:
+                entry = _next_replay(key, description)
+            except FixtureNotFound as e:
+                raise requests.exceptions.ConnectionError(str(e), request=request)
+            return self._build_response_from_entry(request, entry)
+
+        start = time.time()
+        response = super().send(request, **kwargs)
+        content = response.content
+        _record(key, description, {
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {k: v for k, v in response.headers.items()
+                        if k.lower() not in ('content-encoding', 'transfer-encoding', 'set-cookie')},
+            'body': base64.b64encode(content).decode('ascii'),
+            'elapsed': time.time() - start
+        })
+        return response
+
+    def _build_response_from_entry(self, request, entry):
+        content = base64.b64decode(entry['body'])
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason', '')
+        response.headers = CaseInsensitiveDict(entry.get('headers', {}))
+        response.raw = BytesIO(content)
+        response.url = request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+def replayable(service: str, key: Optional[Callable[..., Any]] = None):
+    """
+    Decorator that records or replays a function's JSON-serializable result.
+
+    Used for calls that do not go through the shared HTTP session (LLM SDKs,
+    FTP). `key` maps the call arguments to the parts that identify it; by
+    default all arguments are used.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return func(*args, **kwargs)
+            parts = key(*args, **kwargs) if key else [args, kwargs]
+            description = {'service': service, 'call': func.__qualname__}
+            fixture_key = _fixture_key(service, [func.__qualname__, parts])
+
+            if replaying():
+                return _next_replay(fixture_key, description)['result']
+
+            start = time.time()
+            result = func(*args, **kwargs)
+            _record(fixture_key, description, {'result': result, 'elapsed': time.time() - start})
+            return result
+        return wrapper
+    return decorator
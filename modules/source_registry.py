@@ -0,0 +1,279 @@
+"""Local registry of news sources with a bias score and credibility tier
+
+Cluster bias is the credibility-weighted mean of its sources' registered
+scores, so it costs an array lookup instead of an LLM call. The registry is a
+plain JSON file that can be edited by hand:
+
+    {"Reuters": {"bias": 0.0, "tier": 1, "origin": "manual"}, ...}
+
+It is seeded from our own published articles: a source gets the mean
+evaluated bias (bs_p) of the articles that cited it, with cited links resolved
+to source names through the local article store. Only sources it does not know
+are sent to the LLM for scoring.
+
+    python -m modules.source_registry seed
+    python -m modules.source_registry set "Example News" -0.3 2
+    python -m modules.source_registry show
+"""
+import os
+import re
+import sys
+import json
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from . import article_store
+from .api_client import fetch_cited_bias
+
+REGISTRY_PATH = os.environ.get(
+    "SOURCE_REGISTRY_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "source_registry.json")
+)
+
+# Weight of each credibility tier in the cluster mean: 1 is most credible
+TIER_WEIGHTS = {1: 1.0, 2: 0.7, 3: 0.4}
+DEFAULT_TIER = 2
+
+# Published articles that must have cited a source before history seeds its score
+MIN_SEED_SAMPLES = 3
+
+# Evaluator labels that older articles were published with instead of a number
+BIAS_LABELS = {
+    'Far Left': -1.0,
+    'Left': -0.6,
+    'Center Left': -0.3,
+    'Neutral': 0.0,
+    'Center Right': 0.3,
+    'Right': 0.6,
+    'Far Right': 1.0
+}
+
+SCORE_PROMPT = """Rate the typical political bias of each of these news sources on a scale from -1 (far left) through 0 (neutral) to 1 (far right).
+
+Return ONLY a JSON object mapping each source name exactly as given to its numeric score, e.g. {{"Example News": 0.1}}
+
+Sources:
+{sources}"""
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {'mtime': None, 'entries': {}, 'index': {}, 'bias': None, 'weight': None}
+
+def _load() -> None:
+    """(Re)load the registry file if it changed since the last read"""
+    try:
+        mtime = os.path.getmtime(REGISTRY_PATH)
+    except OSError:
+        mtime = 0
+    if mtime == _state['mtime']:
+        return
+    entries = {}
+    if mtime:
+        try:
+            with open(REGISTRY_PATH, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading source registry: {str(e)}")
+    _set_entries(entries)
+    _state['mtime'] = mtime
+
+def _set_entries(entries: Dict[str, Dict[str, Any]]) -> None:
+    names = list(entries)
+    _state['entries'] = entries
+    _state['index'] = {name: i for i, name in enumerate(names)}
+    _state['bias'] = np.array([float(entries[n].get('bias', 0.0)) for n in names], dtype=np.float64)
+    _state['weight'] = np.array([TIER_WEIGHTS.get(entries[n].get('tier', DEFAULT_TIER), TIER_WEIGHTS[DEFAULT_TIER])
+                                 for n in names], dtype=np.float64)
+
+def _save(entries: Dict[str, Dict[str, Any]]) -> None:
+    directory = os.path.dirname(REGISTRY_PATH) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(entries, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, REGISTRY_PATH)
+    _set_entries(entries)
+    _state['mtime'] = os.path.getmtime(REGISTRY_PATH)
+
+def get_sources() -> Dict[str, Dict[str, Any]]:
+    """All registered sources"""
+    with _lock:
+        _load()
+        return dict(_state['entries'])
+
+def update_sources(updates: Dict[str, Dict[str, Any]], overwrite_manual: bool = False) -> None:
+    """Merge entries into the registry; hand-edited entries win unless overwrite_manual"""
+    with _lock:
+        _load()
+        entries = dict(_state['entries'])
+        for name, entry in updates.items():
+            current = entries.get(name)
+            if current and current.get('origin') == 'manual' and not overwrite_manual:
+                continue
+            merged = dict(current or {}, **entry)
+            merged['bias'] = max(-1.0, min(1.0, float(merged.get('bias', 0.0))))
+            merged.setdefault('tier', DEFAULT_TIER)
+            entries[name] = merged
+        _save(entries)
+
+def cluster_bias(sources: Iterable[str]) -> Tuple[Optional[float], List[str]]:
+    """
+    Credibility-weighted mean bias over a cluster's article sources.
+
+    Each article counts once, so a source with three articles weighs three
+    times. Returns (bias, unknown_sources); bias is None when no source is
+    registered.
+    """
+    sources = list(sources)
+    with _lock:
+        _load()
+        index, bias, weight = _state['index'], _state['bias'], _state['weight']
+    positions = np.fromiter((index.get(name, -1) for name in sources), dtype=np.int64, count=len(sources))
+    known = positions >= 0
+    unknown = sorted({name for name, ok in zip(sources, known) if not ok and name})
+    if not known.any():
+        return None, unknown
+    positions = positions[known]
+    return float(np.average(bias[positions], weights=weight[positions])), unknown
+
+def source_weights(sources: Iterable[str]) -> np.ndarray:
+    """Credibility weight per source; unregistered sources get the default tier's"""
+    sources = list(sources)
+    with _lock:
+        _load()
+        index, weight = _state['index'], _state['weight']
+    positions = np.fromiter((index.get(name, -1) for name in sources), dtype=np.int64, count=len(sources))
+    weights = np.full(len(sources), TIER_WEIGHTS[DEFAULT_TIER], dtype=np.float64)
+    known = positions >= 0
+    weights[known] = weight[positions[known]]
+    return weights
+
+def _parse_scores(response: Optional[str]) -> Dict[str, float]:
+    if not response:
+        return {}
+    match = re.search(r'\{.*\}', response, re.DOTALL)
+    if not match:
+        return {}
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+    scores = {}
+    for name, value in data.items():
+        try:
+            scores[name] = float(value)
+        except (TypeError, ValueError):
+            continue
+    return scores
+
+def score_unknown_sources(names: Iterable[str], chat: Callable[[str], Optional[str]]) -> Dict[str, float]:
+    """Ask the LLM to score sources missing from the registry and record the answers"""
+    names = sorted(set(names) - set(get_sources()))
+    if not names:
+        return {}
+    scores = _parse_scores(chat(SCORE_PROMPT.format(sources=json.dumps(names, indent=2))))
+    scores = {name: score for name, score in scores.items() if name in names}
+    if scores:
+        update_sources({name: {'bias': score, 'origin': 'llm'} for name, score in scores.items()})
+    return scores
+
+def apply_cluster_biases(clusters: List[Dict[str, Any]],
+                         chat: Optional[Callable[[str], Optional[str]]] = None) -> None:
+    """
+    Set each analyzed cluster's 'bias' from the registry.
+
+    Sources missing from the registry across all clusters are scored in one
+    LLM call when chat is given. Clusters with no registered source keep the
+    bias they already have.
+    """
+    sources_per_cluster = [[a.get('name_source', '') for a in cluster.get('articles', [])]
+                           for cluster in clusters]
+    if chat:
+        unknown = set()
+        for sources in sources_per_cluster:
+            unknown.update(cluster_bias(sources)[1])
+        if unknown:
+            try:
+                score_unknown_sources(unknown, chat)
+            except Exception as e:
+                print(f"Error scoring unknown sources: {str(e)}")
+    for cluster, sources in zip(clusters, sources_per_cluster):
+        bias, _ = cluster_bias(sources)
+        if bias is not None:
+            cluster['bias'] = round(bias, 3)
+
+def _published_bias(value: Any) -> Optional[float]:
+    try:
+        return max(-1.0, min(1.0, float(value)))
+    except (TypeError, ValueError):
+        return BIAS_LABELS.get(str(value or '').strip())
+
+def _cited_links(cited: Any) -> List[str]:
+    """Links of a published article's Cited field, a JSON list of [source_id, link]"""
+    if isinstance(cited, str):
+        try:
+            cited = json.loads(cited)
+        except ValueError:
+            return []
+    if not isinstance(cited, list):
+        return []
+    links = []
+    for item in cited:
+        if isinstance(item, (list, tuple)) and item:
+            item = item[-1]
+        elif isinstance(item, dict):
+            item = item.get('link')
+        if isinstance(item, str) and item:
+            links.append(item)
+    return links
+
+def source_bias_history(published: Iterable[Dict[str, Any]],
+                        min_samples: int = MIN_SEED_SAMPLES) -> List[Dict[str, Any]]:
+    """
+    Mean evaluated bias per source over the published articles that cited it.
+
+    published holds {bs_p, Cited} rows as returned by the fetch API. A source
+    counts once per article however many of its links were cited, and only
+    sources cited by at least min_samples articles are returned.
+    """
+    articles = []
+    for row in published:
+        bias = _published_bias(row.get('bs_p'))
+        links = _cited_links(row.get('Cited'))
+        if bias is not None and links:
+            articles.append((bias, links))
+    sources = article_store.link_sources(link for _, links in articles for link in links)
+
+    totals: Dict[str, List[float]] = {}
+    for bias, links in articles:
+        for name in {sources[link] for link in links if link in sources}:
+            total = totals.setdefault(name, [0.0, 0])
+            total[0] += bias
+            total[1] += 1
+    return [{'name_source': name, 'bias': round(total / count, 3), 'samples': count}
+            for name, (total, count) in sorted(totals.items()) if count >= min_samples]
+
+def seed_from_history(min_samples: int = MIN_SEED_SAMPLES) -> int:
+    """Seed source scores from the evaluated bias of the published articles that cited them"""
+    history = source_bias_history(fetch_cited_bias(), min_samples)
+    update_sources({row['name_source']: {'bias': row['bias'], 'samples': row['samples'], 'origin': 'history'}
+                    for row in history})
+    return len(history)
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "show"
+    if command == "seed":
+        print(f"Seeded {seed_from_history()} sources from published articles into {REGISTRY_PATH}")
+    elif command == "set" and len(sys.argv) >= 4:
+        entry = {'bias': float(sys.argv[3]), 'origin': 'manual'}
+        if len(sys.argv) >= 5:
+            entry['tier'] = int(sys.argv[4])
+        update_sources({sys.argv[2]: entry}, overwrite_manual=True)
+        print(f"Registered {sys.argv[2]}: {entry}")
+    elif command == "show":
+        for name, entry in sorted(get_sources().items()):
+            print(f"{name:40} bias {entry.get('bias', 0.0):+.2f}  tier {entry.get('tier', DEFAULT_TIER)}  ({entry.get('origin', '')})")
+    else:
+        print("Usage: python -m modules.source_registry [seed | show | set <name> <bias> [tier]]")
+        sys.exit(1)
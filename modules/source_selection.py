@@ -0,0 +1,98 @@
+"""Source selection for article generation prompts
+
+Picks the sources to send with maximal marginal relevance: each pick is the
+candidate with the best trade-off between its own relevance (recency and how
+central it is to the story) and its novelty against what was already picked.
+Only one article per outlet is used. The chosen bodies are then trimmed so
+the sources share a token budget.
+"""
+import re
+import json
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from .recluster import STOPWORDS
+from .tokens import fit_records
+
+MAX_SOURCES = 8
+
+# Tokens available to the serialized sources together
+SOURCE_TOKEN_BUDGET = 6000
+
+# Weight of relevance against novelty in the MMR score (1.0 ignores novelty)
+MMR_LAMBDA = 0.7
+
+# Share of relevance that comes from recency; the rest is centrality
+RECENCY_WEIGHT = 0.4
+
+_HASH_DIM = 2 ** 12
+_WORD_RE = re.compile(r"[a-z0-9]{2,}")
+
+def _vectors(articles: Sequence[Any]) -> np.ndarray:
+    """L2-normalized hashed bag-of-words per article (title plus lead)"""
+    matrix = np.zeros((len(articles), _HASH_DIM), dtype=np.float32)
+    for row, article in enumerate(articles):
+        text = (article.get('title', '') or '') + ' ' + ' '.join((article.get('content', '') or '').split()[:300])
+        tokens = [t for t in _WORD_RE.findall(text.lower()) if t not in STOPWORDS]
+        if tokens:
+            np.add.at(matrix[row], np.array([hash(t) % _HASH_DIM for t in tokens]), 1.0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+def rank_sources(articles: Sequence[Any], max_sources: int = MAX_SOURCES,
+                 mmr_lambda: float = MMR_LAMBDA) -> List[Any]:
+    """Pick up to max_sources articles, one per outlet, by maximal marginal relevance"""
+    # Never offer two articles from one outlet or with one title
+    candidates = []
+    seen_titles, seen_sources = set(), set()
+    for article in sorted(articles, key=lambda a: a.get('published_date', '') or '', reverse=True):
+        title = article.get('title', '')
+        if title in seen_titles:
+            continue
+        seen_titles.add(title)
+        candidates.append(article)
+    if not candidates:
+        return []
+
+    vectors = _vectors(candidates)
+    centroid = vectors.mean(axis=0)
+    centroid /= max(np.linalg.norm(centroid), 1e-12)
+    centrality = vectors @ centroid
+    # Candidates are newest first, so recency is a linear rank
+    recency = np.linspace(1.0, 0.0, num=len(candidates)) if len(candidates) > 1 else np.ones(1)
+    relevance = RECENCY_WEIGHT * recency + (1 - RECENCY_WEIGHT) * centrality
+
+    selected: List[int] = []
+    redundancy = np.zeros(len(candidates), dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    while len(selected) < max_sources and available.any():
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        source = candidates[best].get('name_source', 'Unknown')
+        seen_sources.add(source)
+        for i, article in enumerate(candidates):
+            if article.get('name_source', 'Unknown') in seen_sources:
+                available[i] = False
+        redundancy = np.maximum(redundancy, vectors @ vectors[best])
+    return [candidates[i] for i in selected]
+
+def select_sources(articles: Sequence[Any], max_sources: int = MAX_SOURCES,
+                   token_budget: int = SOURCE_TOKEN_BUDGET) -> List[Dict[str, Any]]:
+    """
+    Diverse sources in the shape the article prompt expects.
+
+    token_budget covers the serialized sources, titles and links included;
+    the bodies are trimmed to share what is left.
+    """
+    chosen = rank_sources(articles, max_sources)
+    sources = [{
+        "title": article.get('title', ''),
+        "content": article.get('content', '') or '',
+        "name_source": article.get('name_source', 'Unknown'),
+        "link": article.get('link', ''),
+        "source_id": source_id  # Source ID for citation
+    } for source_id, article in enumerate(chosen, 1)]
+    return fit_records(sources, 'content', token_budget, render=lambda s: json.dumps(s, ensure_ascii=False))
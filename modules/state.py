@@ -24,6 +24,12 @@ def init_session_state():
     if 'feedback_mode' not in st.session_state:
         st.session_state.feedback_mode = False
 
+def stop_cluster_loader():
+    """Stop the background cluster loader, if any, before its state is dropped"""
+    loader = st.session_state.get('cluster_loader')
+    if loader is not None:
+        loader.stop()
+
 def reset_article_state():
     """Reset article-related session state"""
     # Clear all article-related state
@@ -44,6 +50,7 @@ def reset_article_state():
         del st.session_state.published_article_url
     
     # Ensure clusters are selectable
+    stop_cluster_loader()
     for key in list(st.session_state.keys()):
         if key.startswith('cluster_') and key != 'clusters':
             del st.session_state[key]
@@ -0,0 +1,107 @@
+"""Live rendering of streamed article JSON in Streamlit
+
+The article agents reply with one JSON object. While it streams in, the
+string fields that have started so far are pulled out of the incomplete text
+and drawn into placeholders, so the headline shows up after the first few
+tokens instead of after the whole reply.
+"""
+import re
+import json
+import time
+from typing import Any, Dict, Iterable, Sequence
+
+import streamlit as st
+
+# JSON key -> how it is drawn, for each kind of article reply
+ARTICLE_FIELDS = {"headline": "headline", "haiku": "haiku", "story": "story"}
+HISTORICAL_STORY_FIELDS = {"AIHeadline": "headline", "AIHaiku": "haiku", "AIStory": "story"}
+
+# Seconds between redraws; Streamlit round trips are slower than tokens arrive
+RENDER_INTERVAL = 0.15
+
+_STRING_END = re.compile(r'["\\]')
+
+def _string_end(text: str, start: int) -> int:
+    """
+    End of the decodable part of a JSON string body that starts at start.
+
+    That is the closing quote, or, while the string is still streaming in,
+    the end of text less any escape that hasn't fully arrived. A high
+    surrogate escape right before the cut waits for its low half.
+    """
+    pos = start
+    high = None
+    while True:
+        match = _STRING_END.search(text, pos)
+        if match is None:
+            cut = len(text)
+        elif match.group() == '"':
+            return match.start()
+        else:
+            escape = text[match.end():match.end() + 1]
+            if escape == 'u':
+                code = text[match.end() + 1:match.end() + 5]
+                if len(code) == 4:
+                    high = match.start() if code[0] in 'dD' and code[1] in '89abAB' else None
+                    pos = match.end() + 5
+                    continue
+            elif escape:
+                high = None
+                pos = match.end() + 1
+                continue
+            cut = match.start()
+        return high if high is not None and high + 6 == cut else cut
+
+def _read_string(text: str, start: int) -> str:
+    """Decode a JSON string body from start up to its closing quote or the end of text"""
+    raw = text[start:_string_end(text, start)]
+    try:
+        value = json.loads('"' + raw + '"', strict=False)
+    except ValueError:
+        # An invalid escape in a malformed reply; show the text as it came
+        value = raw
+    # Unpaired surrogates can't be encoded for the page
+    return value.encode('utf-16', 'surrogatepass').decode('utf-16', 'replace')
+
+def partial_fields(text: str, keys: Sequence[str]) -> Dict[str, str]:
+    """String values of keys found so far in a possibly unfinished JSON object"""
+    fields = {}
+    for key in keys:
+        match = re.search(r'"' + re.escape(key) + r'"\s*:\s*"', text)
+        if match:
+            fields[key] = _read_string(text, match.end())
+    return fields
+
+def _draw(placeholders: Dict[str, Any], values: Dict[str, str], fields: Dict[str, str]) -> None:
+    for key, placeholder in placeholders.items():
+        value = values.get(key)
+        if not value:
+            continue
+        if fields[key] == "headline":
+            placeholder.markdown(f"### {value}")
+        elif fields[key] == "haiku":
+            placeholder.markdown("*" + value.strip().replace("\n", "*  \n*") + "*")
+        else:
+            placeholder.markdown(value, unsafe_allow_html=True)
+
+def render_json_stream(chunks: Iterable[str], container=None,
+                       fields: Dict[str, str] = ARTICLE_FIELDS) -> str:
+    """
+    Draw the string fields of a streaming JSON reply as they arrive.
+
+    fields maps each JSON key to how it is drawn ("headline", "haiku" or
+    "story"). Returns the full reply text once the stream ends, for the
+    caller to parse as before.
+    """
+    container = container or st.container()
+    placeholders = {key: container.empty() for key in fields}
+    text = ""
+    last_draw = 0.0
+    for chunk in chunks:
+        text += chunk
+        now = time.monotonic()
+        if now - last_draw >= RENDER_INTERVAL:
+            _draw(placeholders, partial_fields(text, fields), fields)
+            last_draw = now
+    _draw(placeholders, partial_fields(text, fields), fields)
+    return text
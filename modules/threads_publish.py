@@ -1,10 +1,13 @@
 import os
 import requests
+from . import http_client
+from .replay import replayable
 from datetime import datetime
 from typing import Optional, Dict, Any
 import ftplib
 from io import BytesIO
 
+@replayable("ftp", key=lambda image_data, filename: [filename])
 def upload_image_to_ftp(image_data: bytes, filename: str) -> Optional[str]:
     """Upload an image to FTP and return its URL"""
     try:
@@ -60,7 +63,7 @@ class ThreadsPublisher:
         params = kwargs.get('params', {})
         params['access_token'] = self.access_token
         
-        response = requests.request(
+        response = http_client.request(
             method,
             url,
             params=params,
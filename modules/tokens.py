@@ -0,0 +1,185 @@
+"""Token counting and prompt budgeting
+
+Counts come from a pluggable tokenizer backend: tiktoken when it is installed,
+otherwise a deterministic heuristic that splits text into word pieces of up
+to four characters. Set TOKENIZER_BACKEND to pick one explicitly and
+register_backend() to add another. Counts are cached per text, so measuring
+the same article body repeatedly is free.
+
+Prompt builders use the budgeting helpers to trim their inputs before a call
+instead of letting the model's context limit truncate or reject it.
+"""
+import os
+import re
+import json
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Sequence
+
+try:  # Optional: exact BPE counts
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+ENCODING_NAME = os.environ.get("TOKENIZER_ENCODING", "cl100k_base")
+
+# Context window per backend and the share of it kept free for the reply
+CONTEXT_LIMITS: Dict[str, int] = {
+    "codegpt": int(os.environ.get("CODEGPT_CONTEXT_TOKENS", 32000)),
+    "lmstudio": int(os.environ.get("LMSTUDIO_CONTEXT_TOKENS", 4096))
+}
+REPLY_RESERVE: Dict[str, int] = {
+    "codegpt": 4096,
+    "lmstudio": 2000
+}
+
+class HeuristicTokenizer:
+    """Splits into punctuation marks and word pieces of at most four characters"""
+
+    name = "heuristic"
+    _PIECE_RE = re.compile(r"\s*(?:\w{1,4}|[^\w\s])")
+
+    def encode(self, text: str) -> List[str]:
+        return self._PIECE_RE.findall(text)
+
+    def decode(self, tokens: Sequence[str]) -> str:
+        return "".join(tokens)
+
+class TiktokenTokenizer:
+    """BPE tokens from tiktoken"""
+
+    name = "tiktoken"
+
+    def __init__(self, encoding_name: str = ENCODING_NAME):
+        self._encoding = tiktoken.get_encoding(encoding_name)
+
+    def encode(self, text: str) -> List[int]:
+        return self._encoding.encode(text, disallowed_special=())
+
+    def decode(self, tokens: Sequence[int]) -> str:
+        return self._encoding.decode(list(tokens))
+
+_backends: Dict[str, Callable[[], Any]] = {"heuristic": HeuristicTokenizer}
+if tiktoken is not None:
+    _backends["tiktoken"] = TiktokenTokenizer
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {'tokenizer': None}
+
+def register_backend(name: str, factory: Callable[[], Any]) -> None:
+    """Make a tokenizer available; factory returns an object with encode() and decode()"""
+    _backends[name] = factory
+
+def set_backend(name: str) -> None:
+    """Switch the active tokenizer"""
+    if name not in _backends:
+        raise ValueError(f"Unknown tokenizer backend: {name}. Available: {', '.join(_backends)}")
+    with _lock:
+        _state['tokenizer'] = _backends[name]()
+    _count.cache_clear()
+
+def get_tokenizer():
+    with _lock:
+        if _state['tokenizer'] is None:
+            default = "tiktoken" if tiktoken is not None else "heuristic"
+            name = os.environ.get("TOKENIZER_BACKEND", default)
+            factory = _backends.get(name)
+            if factory is None:
+                print(f"Unknown tokenizer backend {name}, using {default}")
+                factory = _backends[default]
+            _state['tokenizer'] = factory()
+        return _state['tokenizer']
+
+@lru_cache(maxsize=8192)
+def _count(text: str) -> int:
+    return len(get_tokenizer().encode(text))
+
+def count_tokens(text: Any) -> int:
+    """Number of tokens in text (non-strings are counted as str(value))"""
+    if not text:
+        return 0
+    return _count(text if isinstance(text, str) else str(text))
+
+def prompt_limit(backend: str) -> int:
+    """Tokens a prompt may use on a backend once the reply is reserved"""
+    return CONTEXT_LIMITS.get(backend, CONTEXT_LIMITS["codegpt"]) - REPLY_RESERVE.get(backend, 4096)
+
+def trim_to_tokens(text: str, max_tokens: int, suffix: str = "...") -> str:
+    """
+    Cut text to at most max_tokens, ending on a sentence or word boundary.
+
+    Deterministic: the same text and limit always give the same result.
+    """
+    if not text or max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    tokenizer = get_tokenizer()
+    cut = tokenizer.decode(tokenizer.encode(text)[:max_tokens])
+    sentence_end = max(cut.rfind('. '), cut.rfind('.\n'))
+    if sentence_end > len(cut) // 2:
+        return cut[:sentence_end + 1]
+    head = cut.rsplit(' ', 1)[0]
+    # The suffix must not push the text back over the limit
+    while head and count_tokens(head + suffix) > max_tokens:
+        head = head.rsplit(' ', 1)[0] if ' ' in head else ""
+    return head + suffix if head else ""
+
+def allocate_budget(lengths: Sequence[int], budget: int) -> List[int]:
+    """
+    Split a token budget across inputs of the given token lengths.
+
+    Short inputs keep their full length and the budget they leave unused is
+    shared evenly among the longer ones.
+    """
+    allocation = [0] * len(lengths)
+    remaining = max(budget, 0)
+    pending = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    while pending:
+        share = remaining // len(pending)
+        index = pending.pop(0)
+        allocation[index] = min(lengths[index], share)
+        remaining -= allocation[index]
+    return allocation
+
+def fit_texts(texts: Sequence[str], budget: int) -> List[str]:
+    """Trim several texts so together they fit budget, sharing it fairly"""
+    allocation = allocate_budget([count_tokens(t) for t in texts], budget)
+    return [trim_to_tokens(text, tokens) for text, tokens in zip(texts, allocation)]
+
+def fit_records(records: Sequence[Dict[str, Any]], field: str, budget: int,
+                render: Callable[[Any], str] = json.dumps) -> List[Dict[str, Any]]:
+    """
+    Trim one text field across records so render(records) fits budget.
+
+    The field values share whatever the rest of the records leave, as in
+    fit_texts. Records that don't fit even with the field empty are dropped
+    from the end.
+    """
+    bare = [dict(record, **{field: ''}) for record in records]
+    while bare and count_tokens(render(bare)) > budget:
+        bare.pop()
+    kept = list(records[:len(bare)])
+    texts = fit_texts([record.get(field, '') or '' for record in kept], budget - count_tokens(render(bare)))
+    return [dict(record, **{field: text}) for record, text in zip(kept, texts)]
+
+def take_within_budget(items: Sequence[Any], budget: int, render: Callable[[Any], str] = str) -> List[Any]:
+    """Leading items whose rendered size fits budget, in order"""
+    kept = []
+    used = 0
+    for item in items:
+        used += count_tokens(render(item))
+        if used > budget:
+            break
+        kept.append(item)
+    return kept
+
+def fit_prompt(build: Callable[[str], str], text: str, budget: int) -> str:
+    """
+    Build a prompt around one variable-length input, trimming it to fit.
+
+    build(text) returns the full prompt; the input gets whatever budget the
+    rest of the prompt leaves.
+    """
+    room = budget - count_tokens(build(""))
+    return build(trim_to_tokens(text, room))
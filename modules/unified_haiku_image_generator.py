@@ -1,7 +1,7 @@
 import os
 import time
 from chat_codegpt import chat_with_codegpt
-import requests
+from . import http_client
 import json
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import textwrap
@@ -15,7 +15,7 @@ api_key = os.getenv("HORIAR_API_KEY")
 # Define the specific agent ID for image generation
 IMAGE_GENERATION_AGENT_ID = "c065444b-510f-4ab0-97b8-3840c66109d3"
 
-def generate_unified_image_prompt(haiku, ai_headline, feedback=None):
+def generate_unified_image_prompt(haiku, ai_headline, feedback=None, use_cache=True):
     """
     Generate a single image prompt that works for both standard and Bluesky formats.
     
@@ -23,6 +23,7 @@ def generate_unified_image_prompt(haiku, ai_headline, feedback=None):
         haiku (str): The haiku text
         ai_headline (str): The AI-generated headline
         feedback (str, optional): User feedback for image regeneration
+        use_cache (bool): Whether an earlier prompt for the same request may be reused
         
     Returns:
         str: The generated image prompt
@@ -73,7 +74,8 @@ Artistic Guidance:
 {f'9. Incorporate user feedback: {feedback}' if feedback else ''}
 
 The prompt should generate an artistically interpreted image that speaks to the story's emotional essence, using symbolic visual language."""
-    return chat_with_codegpt(prompt_request, agent_id=IMAGE_GENERATION_AGENT_ID)
+    return chat_with_codegpt(prompt_request, agent_id=IMAGE_GENERATION_AGENT_ID,
+                             call_type="image_prompt", use_cache=use_cache)
 
 def poll_text_to_image_status(job_id, progress_container, progress_bar, status_text, image_type="standard"):
     """
@@ -92,7 +94,7 @@ def poll_text_to_image_status(job_id, progress_container, progress_bar, status_t
     while True:
         elapsed_time = int(time.time() - start_time)
         
-        response = requests.get(f"https://api.horiar.com/enterprise/query/{job_id}", headers=headers)
+        response = http_client.get(f"https://api.horiar.com/enterprise/query/{job_id}", headers=headers)
         
         if response.status_code == 200:
             result = response.json()
@@ -146,7 +148,7 @@ def generate_image(prompt, is_bluesky=False):
         status_text = st.empty()
         status_text.text(f"🖼️ Preparing your {image_type} image...")
     
-    response = requests.post("https://api.horiar.com/enterprise/text-to-image", 
+    response = http_client.post("https://api.horiar.com/enterprise/text-to-image", 
                            headers=headers, json=data)
 
     if response.status_code == 200:
@@ -158,7 +160,7 @@ def generate_image(prompt, is_bluesky=False):
         if result:
             try:
                 image_url = result["output"]["image"]
-                image_response = requests.get(image_url)
+                image_response = http_client.get(image_url)
                 if image_response.status_code == 200:
                     with open(filename, "wb") as file:
                         file.write(image_response.content)
@@ -301,7 +303,7 @@ def add_text_to_image(image_path, haiku, article_date, font_path, is_bluesky=Fal
         img.save(output_path, "JPEG", quality=85)
         return output_path
 
-def generate_haiku_images(haiku, ai_headline, article_date, existing_prompt=None, feedback=None):
+def generate_haiku_images(haiku, ai_headline, article_date, existing_prompt=None, feedback=None, use_cache=True):
     """
     Generate both standard and Bluesky format images for a haiku.
     
@@ -311,13 +313,14 @@ def generate_haiku_images(haiku, ai_headline, article_date, existing_prompt=None
         article_date (str): The article date
         existing_prompt (str, optional): An existing image prompt to reuse
         feedback (str, optional): User feedback for image regeneration
+        use_cache (bool): Whether a cached image prompt may be reused; off when regenerating
         
     Returns:
         tuple: (standard_image_path, bluesky_image_path, prompt)
     """
     with st.spinner("Generating haiku images..."):
         # Use existing prompt or generate new one
-        image_prompt = existing_prompt if existing_prompt else generate_unified_image_prompt(haiku, ai_headline, feedback)
+        image_prompt = existing_prompt if existing_prompt else generate_unified_image_prompt(haiku, ai_headline, feedback, use_cache)
         
         # Generate standard image
         standard_image_path, _ = generate_image(image_prompt, is_bluesky=False)
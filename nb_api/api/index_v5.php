@@ -273,10 +273,12 @@ function handleDetailedSearch() {
     echo $detailedResults;
 }
 
-function getLatestArticles() {
+function getLatestArticles($sinceId = 0) {
     $conn = dbConnect();
+    $sinceId = intval($sinceId); // Only rows newer than the caller's mirror
     $query = "SELECT ID, AIHeadline, AIHaiku, Published,bs_p,qas,CONCAT('https://ainewsbrew.com/article/', ID) as link,topic,cat
               FROM articles 
+              WHERE ID > $sinceId
               ORDER BY Published DESC
               ";
     $result = $conn->query($query);
@@ -290,6 +292,24 @@ function getLatestArticles() {
     return json_encode($articles);
 }
 
+function getCitedBias() {
+    $conn = dbConnect();
+    // Evaluated bias and cited source links of every published article
+    $query = "SELECT ID, bs_p, Cited
+              FROM articles 
+              WHERE Cited IS NOT NULL AND Cited != '' AND Cited != '[]'
+              ";
+    $result = $conn->query($query);
+    $articles = [];
+    if ($result && $result->num_rows > 0) {
+        while ($row = $result->fetch_assoc()) {
+            $articles[] = $row;
+        }
+    }
+    $conn->close();
+    return json_encode($articles);
+}
+
 function getArticleByIndex($index) {
     $conn = dbConnect();
     $index = intval($index); // Ensure the index is an integer
@@ -1115,7 +1135,11 @@ switch ($mode) {
         echo publishArticle($articleData);
         break;
     case 'latest':
-        echo getLatestArticles();
+        $sinceId = $_GET['since_id'] ?? 0;
+        echo getLatestArticles($sinceId);
+        break;
+    case 'citedBias':
+        echo getCitedBias();
         break;
     case 'byIndex':
         $index = $_GET['index'] ?? 0;
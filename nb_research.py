@@ -1,9 +1,18 @@
 import requests
+from modules import http_client
 import json
-from chat_codegpt import chat_with_codegpt
+from chat_codegpt import chat_with_codegpt, chat_json_with_codegpt
 from colorama import init, Fore, Style
 from dotenv import load_dotenv
 import os
+from modules.news_stream import collect_news_clusters
+from modules import article_store, llm_cache
+from modules.recluster import recluster
+from modules.cluster_ranking import rank_clusters
+from modules.cluster_tracker import ClusterTracker
+from modules.llm_pool import imap_completed
+from modules.batch_analysis import analyze_in_batches
+from modules.source_registry import apply_cluster_biases
 from review_articles import evaluate_article_with_ai, display_article, display_evaluation, update_article_status
 from publish_utils import generate_and_encode_images, publish_article
 import http.client
@@ -16,10 +25,22 @@ init(autoreset=True)
 # NewsCatcher API credentials
 API_KEY = os.environ.get("NEWSCATCHER_API_KEY")
 
-def get_latest_headlines(when="1d"):
-    print(f"\n{Fore.CYAN}Fetching headlines...{Style.RESET_ALL}")
-    url = "https://v3-api.newscatcherapi.com/api/latest_headlines"
-    params = {
+HEADLINES_URL = "https://v3-api.newscatcherapi.com/api/latest_headlines"
+
+# Clusters packed into one analysis prompt
+ANALYSIS_BATCH_SIZE = 10
+
+# Shapes of the analysis and article replies; each reply is cut off once such
+# an object closes
+ANALYSIS_SCHEMA = {"category": "", "subject": ""}
+ARTICLE_SCHEMA = {"headline": "", "haiku": "", "story": "", "summary": ""}
+
+# Stories seen by earlier searches in this session; unchanged ones are not analyzed again
+cluster_tracker = ClusterTracker()
+
+def headline_params(when="1d"):
+    """Query parameters for the latest_headlines endpoint"""
+    return {
         "when": when,
         "countries": "US, CA, MX, GB",
         "predefined_sources": "top 80 US,top 50 CA,top 20 MX,top 20 GB",
@@ -34,24 +55,25 @@ def get_latest_headlines(when="1d"):
         "exclude_duplicates": "true",
         "page_size": "800"
     }
+
+def get_latest_headlines(when="1d"):
+    """Fetch the headline window as concurrent pages, parsed as they download"""
+    print(f"\n{Fore.CYAN}Fetching headlines...{Style.RESET_ALL}")
     headers = {
         "x-api-token": API_KEY
     }
+    def store(clusters):
+        article_store.ingest_news_data({'clusters': clusters}, "Headlines", "", when)
 
     try:
-        response = requests.get(url, params=params, headers=headers)
-        response.raise_for_status()  # This will raise an HTTPError for bad responses
-        data = response.json()
-        if 'status' in data and data['status'] == 'error':
-            print(f"\n{Fore.RED}API Error: {data.get('message', 'Unknown error')}{Style.RESET_ALL}")
-            return None
-        print(f"\n{Fore.GREEN}Found {data.get('total_hits', 0)} articles in {data.get('clusters_count', 0)} clusters{Style.RESET_ALL}")
-        return data
-    except requests.exceptions.HTTPError as http_err:
-        print(f"HTTP Error occurred: {http_err}")
+        data = collect_news_clusters(HEADLINES_URL, headline_params(when), headers, page_size=200,
+                                     max_pages=4, sink=store)
     except Exception as err:
         print(f"An error occurred: {err}")
-    return None
+        return None
+    if data:
+        print(f"\n{Fore.GREEN}Found {data.get('total_hits', 0)} articles in {data.get('clusters_count', 0)} clusters{Style.RESET_ALL}")
+    return data
 
 def search_news_by_topic(topic, when="1d"):
     url = "https://v3-api.newscatcherapi.com/api/search"
@@ -71,7 +93,7 @@ def search_news_by_topic(topic, when="1d"):
     }
 
     try:
-        response = requests.get(url, params=params, headers=headers)
+        response = http_client.get(url, params=params, headers=headers)
         response.raise_for_status()
         data = response.json()
         if 'status' in data and data['status'] == 'error':
@@ -88,42 +110,113 @@ def search_news_by_topic(topic, when="1d"):
         print(f"An error occurred: {err}")
     return None
 
-def analyze_clusters(headlines_data):
-    analyzed_clusters = []
-    for cluster in headlines_data.get('clusters', []):
-        cluster_id = cluster.get('cluster_id')
-        cluster_size = cluster.get('cluster_size')
-        if cluster_size >= 3:
-            titles = [article['title'] for article in cluster.get('articles', [])]
-            sources = [article.get('name_source', 'Unknown') for article in cluster.get('articles', [])]
-            prompt = f"Analyze these news headlines and their sources:\n\nHeadlines:\n{json.dumps(titles, indent=2)}\n\nSources:\n{json.dumps(sources, indent=2)}\n\nDetermine the common topic, categorize it, identify the main subject, and assess the overall political bias BiasWeight by scoring -1 to left sources, 0 to neutral, and 1 to right on each article.  Then averaging the value for all of them as the bias weight. Return a JSON object with the structure: {{\"category\": \"Category name\", \"subject\": \"Main subject or focus\", \"bias\": \"BiasWeight\"}}"
-            
-            cluster_analysis = chat_with_codegpt(prompt)
-            
-            if cluster_analysis is None:
-                print(f"Skipping cluster {cluster_id} due to API error.")
-                continue
+def request_cluster_analysis(cluster):
+    """Ask the LLM to categorize one cluster; None if the call fails"""
+    cluster_id = cluster.get('cluster_id')
+    titles = [article['title'] for article in cluster.get('articles', [])]
+    sources = [article.get('name_source', 'Unknown') for article in cluster.get('articles', [])]
+    prompt = f"Analyze these news headlines and their sources:\n\nHeadlines:\n{json.dumps(titles, indent=2)}\n\nSources:\n{json.dumps(sources, indent=2)}\n\nDetermine the common topic, categorize it and identify the main subject. Return a JSON object with the structure: {{\"category\": \"Category name\", \"subject\": \"Main subject or focus\"}}"
+
+    cluster_analysis = chat_json_with_codegpt(prompt, ANALYSIS_SCHEMA, call_type="analysis")
 
-            try:
-                analysis_json = json.loads(cluster_analysis)
-                category = analysis_json.get("category", "Unknown")
-                subject = analysis_json.get("subject", "Unknown")
-                bias = float(analysis_json.get("bias", 0))
-            except (json.JSONDecodeError, ValueError):
-                print(f"Error parsing JSON for cluster {cluster_id}. Using default values.")
-                category = "Unknown"
-                subject = "Unknown"
-                bias = 0
-
-            analyzed_clusters.append({
-                "cluster_id": cluster_id,
-                "category": category,
-                "subject": subject,
-                "bias": bias,
-                "article_count": cluster_size,
-                "articles": cluster.get('articles', [])
-            })
+    if cluster_analysis is None:
+        print(f"Error parsing JSON for cluster {cluster_id}. Using default values.")
+        return {}
+    return cluster_analysis
 
+def cluster_result(cluster, analysis_json):
+    """
+    Build the analyzed cluster record from a {category, subject} reply.
+
+    Bias starts neutral; apply_cluster_biases sets it from the source registry.
+    """
+    try:
+        category = analysis_json.get("category", "Unknown")
+        subject = analysis_json.get("subject", "Unknown")
+    except AttributeError:
+        print(f"Error parsing analysis for cluster {cluster.get('cluster_id')}. Using default values.")
+        category = "Unknown"
+        subject = "Unknown"
+
+    return {
+        "cluster_id": cluster.get('cluster_id'),
+        "category": category,
+        "subject": subject,
+        "bias": 0.0,
+        "article_count": cluster.get('cluster_size'),
+        "rank_score": cluster.get('rank_score', 0.0),
+        "story_id": cluster.get('story_id'),
+        "articles": cluster.get('articles', [])
+    }
+
+def analyze_clusters(headlines_data, max_workers=None, batch_size=ANALYSIS_BATCH_SIZE):
+    """
+    Analyze the clusters of an API response dict.
+
+    The whole response is re-clustered before anything is analyzed: a story
+    NewsCatcher split across pages can only be joined once every page is in.
+    Stories that are unchanged since an earlier search in this session are
+    served as they were. Clusters analyzed before (matched by fingerprint,
+    allowing a couple of added or dropped articles) reuse the stored result. The rest are packed
+    batch_size to a prompt (1 sends one prompt per cluster) and the calls run
+    concurrently through the rate-limited codegpt pool, best ranked clusters
+    first. Results are returned best ranked first; a failed cluster is
+    skipped without holding up the rest.
+    """
+    clusters = headlines_data.get('clusters', [])
+    # Fold clusters that cover the same story before paying for their analysis
+    clusters = recluster(clusters)
+    clusters = [c for c in clusters if (c.get('cluster_size') or len(c.get('articles', []))) >= 3]
+    # Most newsworthy first across the whole download, so they are analyzed before the rest
+    clusters = rank_clusters(clusters)
+    cluster_tracker.update(clusters)
+
+    # Unchanged or barely changed clusters reuse their stored analysis
+    analyzed_clusters = []
+    pending = []
+    for cluster in clusters:
+        if not cluster_tracker.needs_analysis(cluster):
+            analyzed_clusters.append(dict(cluster_tracker.result(cluster), rank_score=cluster.get('rank_score', 0.0)))
+            continue
+        memo = article_store.get_cluster_analysis(cluster)
+        if memo:
+            if not memo['exact']:
+                # Store the grown cluster too so its next lookup is exact
+                article_store.save_cluster_analysis(cluster, memo)
+            result = cluster_result(cluster, memo)
+            cluster_tracker.store(cluster, result)
+            analyzed_clusters.append(result)
+        else:
+            pending.append(cluster)
+    if analyzed_clusters:
+        print(f"Reused stored analysis for {len(analyzed_clusters)} clusters")
+
+    if batch_size > 1:
+        results = analyze_in_batches(pending, lambda prompt: chat_with_codegpt(prompt, call_type="analysis"), "codegpt",
+                                     fallback=request_cluster_analysis,
+                                     batch_size=batch_size, max_workers=max_workers)
+    else:
+        results = imap_completed(request_cluster_analysis, pending, "codegpt", max_workers)
+
+    for cluster, analysis_json, error in results:
+        if error is not None:
+            print(f"Error analyzing cluster {cluster.get('cluster_id')}: {str(error)}")
+            continue
+        if analysis_json is None:
+            continue
+        result = cluster_result(cluster, analysis_json)
+        if analysis_json:
+            # Bias comes from the source registry, so the placeholder is not stored
+            article_store.save_cluster_analysis(cluster, dict(result, bias=None))
+            cluster_tracker.store(cluster, result)
+        analyzed_clusters.append(result)
+        print(f"Analyzed {len(analyzed_clusters)}/{len(clusters)} clusters", end="\r")
+    print()
+
+    # Bias comes from the source registry; only unregistered sources go to the LLM
+    apply_cluster_biases(analyzed_clusters, chat=chat_with_codegpt)
+
+    analyzed_clusters.sort(key=lambda c: c.get('rank_score', 0.0), reverse=True)
     return analyzed_clusters
 
 def select_cluster(analyzed_clusters):
@@ -320,25 +413,15 @@ def present_menu_and_process(selected_cluster, analyzed_clusters):
     articles_list = list(articles_data.values())[:8]  # Limit to 8 articles
 
     prompt = f"2. Article Creation:\n\nCreate an article based on these sources. Include a headline, haiku, full story, and a one-paragraph summary. The story should be in HTML format.\n\n{json.dumps(articles_list, indent=2)}"
-    article_json = chat_with_codegpt(prompt)
-
-    if article_json is None:
-        print("Failed to generate article due to API error.")
-        retry = input("Would you like to retry? (y/n): ").lower()
-        if retry == 'y':
-            return present_menu_and_process(selected_cluster, analyzed_clusters)
-        else:
-            analyzed_clusters.pop(cluster_index)  # Remove the cluster if we're not retrying
-            return None, analyzed_clusters
+    article_data = chat_json_with_codegpt(prompt, ARTICLE_SCHEMA, call_type="article")
 
-    try:
-        article_data = json.loads(article_json.replace('\n', '').replace('\r', ''))
-    except json.JSONDecodeError:
-        print("Non-JSON response from CodeGPT. Here's the raw response:")
-        print(article_json)
+    if article_data is None:
+        print("Failed to generate article: no valid article JSON in the CodeGPT response.")
         retry = input("Would you like to retry? (y/n): ").lower()
         if retry == 'y':
-            return present_menu_and_process(selected_cluster, analyzed_clusters)
+            # Ask the model again rather than get the same reply from the cache
+            with llm_cache.bypass():
+                return present_menu_and_process(selected_cluster, analyzed_clusters)
         else:
             analyzed_clusters.pop(cluster_index)  # Remove the cluster if we're not retrying
             return None, analyzed_clusters
@@ -366,7 +449,9 @@ def present_menu_and_process(selected_cluster, analyzed_clusters):
         if review_result == 'q':
             return None, []
         elif review_result == 'r':
-            return present_menu_and_process(selected_cluster, analyzed_clusters)
+            # Ask the model again rather than get the same reply from the cache
+            with llm_cache.bypass():
+                return present_menu_and_process(selected_cluster, analyzed_clusters)
         elif review_result == 'continue' and updates:
             # Apply updates silently
             publish_data.update(updates)
@@ -382,7 +467,9 @@ def present_menu_and_process(selected_cluster, analyzed_clusters):
     else:
         print(f"\n{Fore.RED}Error: Missing required article fields{Style.RESET_ALL}")
         if input("Retry? (y/n): ").lower() == 'y':
-            return present_menu_and_process(selected_cluster, analyzed_clusters)
+            # Ask the model again rather than get the same reply from the cache
+            with llm_cache.bypass():
+                return present_menu_and_process(selected_cluster, analyzed_clusters)
         analyzed_clusters.pop(analyzed_clusters.index(selected_cluster))
         return None, analyzed_clusters
 
@@ -399,6 +486,7 @@ def display_cluster_list(analyzed_clusters):
         print(f"{i:2d}. {Fore.YELLOW}{cluster['subject']}{Style.RESET_ALL}")
         print(f"    Category: {cluster['category']}")
         print(f"    Articles: {cluster['article_count']}")
+        print(f"    Rank: {cluster.get('rank_score', 0.0):.2f}")
         print(f"    Bias: {bias_color}{bias:.2f}{Style.RESET_ALL}")
         print("-" * 40)
 
@@ -1,9 +1,18 @@
 import requests
+from modules import http_client
 import json
-from lmstudio_chat import chat_with_profile
+from lmstudio_chat import chat_with_profile, achat_with_profile
 from colorama import init, Fore, Style
 from dotenv import load_dotenv
 import os
+from modules.news_stream import collect_news_clusters
+from modules import article_store, llm_cache
+from modules.recluster import recluster
+from modules.cluster_ranking import rank_clusters
+from modules.cluster_tracker import ClusterTracker
+from modules.llm_pool import imap_completed, run_concurrently
+from modules.batch_analysis import analyze_in_batches
+from modules.source_registry import apply_cluster_biases
 load_dotenv()
 
 # Initialize colorama
@@ -12,9 +21,19 @@ init(autoreset=True)
 # NewsCatcher API credentials
 API_KEY = os.environ.get("NEWSCATCHER_API_KEY")
 
-def get_latest_headlines(when="1d"):
-    url = "https://v3-api.newscatcherapi.com/api/latest_headlines"
-    params = {
+HEADLINES_URL = "https://v3-api.newscatcherapi.com/api/latest_headlines"
+
+# Clusters packed into one analysis prompt. The local model has a 4k context
+# shared with its reply, so batches are smaller than for CodeGPT.
+ANALYSIS_BATCH_SIZE = 5
+ANALYSIS_TOKEN_BUDGET = 1500
+
+# Stories seen by earlier searches in this session; unchanged ones are not analyzed again
+cluster_tracker = ClusterTracker()
+
+def headline_params(when="1d"):
+    """Query parameters for the latest_headlines endpoint"""
+    return {
         "when": when,
         "countries": "US, CA, MX, GB",
         "predefined_sources": "top 80 US,top 50 CA,top 20 MX,top 20 GB",
@@ -29,27 +48,25 @@ def get_latest_headlines(when="1d"):
         "exclude_duplicates": "true",
         "page_size": "800"
     }
+
+def get_latest_headlines(when="1d"):
+    """Fetch the headline window as concurrent pages, parsed as they download"""
     headers = {
         "x-api-token": API_KEY
     }
+    def store(clusters):
+        article_store.ingest_news_data({'clusters': clusters}, "Headlines", "", when)
 
     try:
-        response = requests.get(url, params=params, headers=headers)
-        response.raise_for_status()  # This will raise an HTTPError for bad responses
-        data = response.json()
-        if 'status' in data and data['status'] == 'error':
-            print(f"API returned an error: {data.get('message', 'Unknown error')}")
-            return None
-        total_hits = data.get('total_hits', 0)
-        clusters_count = data.get('clusters_count', 0)
-        print(f"Total articles found: {total_hits}")
-        print(f"Number of clusters: {clusters_count}")
-        return data
-    except requests.exceptions.HTTPError as http_err:
-        print(f"HTTP Error occurred: {http_err}")
+        data = collect_news_clusters(HEADLINES_URL, headline_params(when), headers, page_size=200,
+                                     max_pages=4, sink=store)
     except Exception as err:
         print(f"An error occurred: {err}")
-    return None
+        return None
+    if data:
+        print(f"Total articles found: {data.get('total_hits', 0)}")
+        print(f"Number of clusters: {data.get('clusters_count', 0)}")
+    return data
 
 def search_news_by_topic(topic, when="1d"):
     url = "https://v3-api.newscatcherapi.com/api/search"
@@ -69,7 +86,7 @@ def search_news_by_topic(topic, when="1d"):
     }
 
     try:
-        response = requests.get(url, params=params, headers=headers)
+        response = http_client.get(url, params=params, headers=headers)
         response.raise_for_status()
         data = response.json()
         if 'status' in data and data['status'] == 'error':
@@ -86,61 +103,112 @@ def search_news_by_topic(topic, when="1d"):
         print(f"An error occurred: {err}")
     return None
 
-def analyze_clusters(headlines_data):
+def request_cluster_analysis(cluster):
+    """Ask the LLM to categorize one cluster; None if the call or its JSON fails"""
+    cluster_id = cluster.get('cluster_id')
+    titles = [article['title'] for article in cluster.get('articles', [])]
+    sources = [article.get('name_source', 'Unknown') for article in cluster.get('articles', [])]
+    prompt = f"Analyze these news headlines and their sources:\n\nHeadlines:\n{json.dumps(titles, indent=2)}\n\nSources:\n{json.dumps(sources, indent=2)}\n\nDetermine the common topic, categorize it and identify the main subject. Return a JSON object with the structure: {{\"category\": \"Category name\", \"subject\": \"Main subject or focus\"}}"
+
+    cluster_analysis = chat_with_profile("headline_reviewer", prompt)
+
+    if cluster_analysis is None:
+        print(f"Skipping cluster {cluster_id} due to API error.")
+        return None
+
+    try:
+        return json.loads(cluster_analysis)
+    except json.JSONDecodeError as e:
+        print(f"Error parsing JSON for cluster {cluster_id}: {e}")
+        print("Raw AI response:")
+        print(cluster_analysis)
+        return None
+
+def cluster_result(cluster, analysis_json):
+    """
+    Build the analyzed cluster record from a {category, subject} reply.
+
+    Bias starts neutral; apply_cluster_biases sets it from the source registry.
+    """
+    return {
+        "cluster_id": cluster.get('cluster_id'),
+        "category": analysis_json.get("category", "Unknown"),
+        "subject": analysis_json.get("subject", "Unknown"),
+        "bias": 0.0,
+        "article_count": cluster.get('cluster_size'),
+        "rank_score": cluster.get('rank_score', 0.0),
+        "story_id": cluster.get('story_id'),
+        "articles": cluster.get('articles', [])
+    }
+
+def analyze_clusters(headlines_data, max_workers=None, batch_size=ANALYSIS_BATCH_SIZE):
+    """
+    Analyze the clusters of an API response dict.
+
+    The whole response is re-clustered before anything is analyzed: a story
+    NewsCatcher split across pages can only be joined once every page is in.
+    Stories that are unchanged since an earlier search in this session are
+    served as they were. Clusters analyzed before (matched by fingerprint,
+    allowing a couple of added or dropped articles) reuse the stored result. The rest are packed
+    batch_size to a prompt (1 sends one prompt per cluster) and the calls run
+    concurrently through the rate-limited lmstudio pool, best ranked clusters
+    first. Results are returned best ranked first; a failed cluster is
+    skipped without holding up the rest.
+    """
+    clusters = headlines_data.get('clusters', [])
+    # Fold clusters that cover the same story before paying for their analysis
+    clusters = recluster(clusters)
+    clusters = [c for c in clusters if (c.get('cluster_size') or len(c.get('articles', []))) >= 3]
+    # Most newsworthy first across the whole download, so they are analyzed before the rest
+    clusters = rank_clusters(clusters)
+    cluster_tracker.update(clusters)
+
+    # Unchanged or barely changed clusters reuse their stored analysis
     analyzed_clusters = []
-    for cluster in headlines_data.get('clusters', []):
-        cluster_id = cluster.get('cluster_id')
-        cluster_size = cluster.get('cluster_size')
-        if cluster_size >= 3:
-            titles = [article['title'] for article in cluster.get('articles', [])]
-            sources = [article.get('name_source', 'Unknown') for article in cluster.get('articles', [])]
-            prompt = f"Analyze these news headlines and their sources:\n\nHeadlines:\n{json.dumps(titles, indent=2)}\n\nSources:\n{json.dumps(sources, indent=2)}\n\nDetermine the common topic, categorize it, identify the main subject, and assess the overall political bias BiasWeight by scoring between -1 (left sources) and 1 (right sources) on each article.  Then averaging the value for all of them as the bias weight. Return a JSON object with the structure: {{\"category\": \"Category name\", \"subject\": \"Main subject or focus\", \"bias\": \"BiasWeight\"}}"
-            
-            cluster_analysis = chat_with_profile("headline_reviewer", prompt)
-            
-            if cluster_analysis is None:
-                print(f"Skipping cluster {cluster_id} due to API error.")
-                continue
+    pending = []
+    for cluster in clusters:
+        if not cluster_tracker.needs_analysis(cluster):
+            analyzed_clusters.append(dict(cluster_tracker.result(cluster), rank_score=cluster.get('rank_score', 0.0)))
+            continue
+        memo = article_store.get_cluster_analysis(cluster)
+        if memo:
+            if not memo['exact']:
+                # Store the grown cluster too so its next lookup is exact
+                article_store.save_cluster_analysis(cluster, memo)
+            result = cluster_result(cluster, memo)
+            cluster_tracker.store(cluster, result)
+            analyzed_clusters.append(result)
+        else:
+            pending.append(cluster)
+    if analyzed_clusters:
+        print(f"Reused stored analysis for {len(analyzed_clusters)} clusters")
 
-            try:
-                analysis_json = json.loads(cluster_analysis)
-                # Ensure bias is a number
-                bias_value = analysis_json.get("bias")
-                if isinstance(bias_value, dict):
-                    # If bias is a dict, try to get a numerical value from it
-                    print(f"Warning: Received complex bias value: {bias_value}")
-                    bias_value = 0.0
-                elif not isinstance(bias_value, (int, float)):
-                    # If bias is not a number, convert or default
-                    try:
-                        bias_value = float(str(bias_value).replace(',', '.'))
-                    except (ValueError, TypeError):
-                        print(f"Warning: Could not parse bias value: {bias_value}")
-                        bias_value = 0.0
-                
-                # Ensure bias is within bounds
-                bias_value = max(-1.0, min(1.0, float(bias_value)))
-                
-                analysis_json["bias"] = bias_value
-                
-                category = analysis_json.get("category", "Unknown")
-                subject = analysis_json.get("subject", "Unknown")
-                bias = bias_value
-            except (json.JSONDecodeError, ValueError) as e:
-                print(f"Error parsing JSON for cluster {cluster_id}: {e}")
-                print("Raw AI response:")
-                print(cluster_analysis)
-                continue
+    if batch_size > 1:
+        results = analyze_in_batches(pending, lambda prompt: chat_with_profile("headline_batch_reviewer", prompt),
+                                     "lmstudio", fallback=request_cluster_analysis, batch_size=batch_size,
+                                     token_budget=ANALYSIS_TOKEN_BUDGET, max_workers=max_workers)
+    else:
+        results = imap_completed(request_cluster_analysis, pending, "lmstudio", max_workers)
 
-            analyzed_clusters.append({
-                "cluster_id": cluster_id,
-                "category": category,
-                "subject": subject,
-                "bias": bias,
-                "article_count": cluster_size,
-                "articles": cluster.get('articles', [])
-            })
+    for cluster, analysis_json, error in results:
+        if error is not None:
+            print(f"Error analyzing cluster {cluster.get('cluster_id')}: {str(error)}")
+            continue
+        if not isinstance(analysis_json, dict):
+            continue
+        result = cluster_result(cluster, analysis_json)
+        if analysis_json:
+            # Bias comes from the source registry, so the placeholder is not stored
+            article_store.save_cluster_analysis(cluster, dict(result, bias=None))
+            cluster_tracker.store(cluster, result)
+        analyzed_clusters.append(result)
+        print(f"Analyzed {len(analyzed_clusters)}/{len(clusters)} clusters", end="\r")
+    print()
 
+    # Bias comes from the source registry; only unregistered sources go to the LLM
+    apply_cluster_biases(analyzed_clusters, chat=lambda prompt: chat_with_profile("default", prompt))
+
+    analyzed_clusters.sort(key=lambda c: c.get('rank_score', 0.0), reverse=True)
     return analyzed_clusters
 
 def select_cluster(analyzed_clusters):
@@ -189,13 +257,13 @@ def process_article_creation(articles_list, category):
     article_prompt = f"Create a news article based on these articles:\n\n{json.dumps(articles_list, indent=2)}"
     article_text = chat_with_profile("article_writer", article_prompt)
     
-    # Step 2: Create the headline
+    # Step 2: Create the headline and haiku; both only need the article, so they run together
     headline_prompt = f"Create a headline for this article:\n\n{article_text}"
-    headline = chat_with_profile("headline_writer", headline_prompt)
-    
-    # Step 3: Create the haiku
     haiku_prompt = f"Create a haiku for this article:\n\n{article_text}"
-    haiku = chat_with_profile("haiku_writer", haiku_prompt)
+    headline, haiku = run_concurrently([
+        achat_with_profile("headline_writer", headline_prompt),
+        achat_with_profile("haiku_writer", haiku_prompt)
+    ], backend="lmstudio")
     
     # Combine the results
     article_data = {
@@ -257,7 +325,9 @@ def present_menu_and_process(selected_cluster, analyzed_clusters):
         print("Failed to generate article due to API error.")
         retry = input("Would you like to retry? (y/n): ").lower()
         if retry == 'y':
-            return present_menu_and_process(selected_cluster, analyzed_clusters)
+            # Ask the model again rather than get the same reply from the cache
+            with llm_cache.bypass():
+                return present_menu_and_process(selected_cluster, analyzed_clusters)
         else:
             return None, analyzed_clusters
 
@@ -268,7 +338,9 @@ def present_menu_and_process(selected_cluster, analyzed_clusters):
         print(article_json)
         retry = input("Would you like to retry? (y/n): ").lower()
         if retry == 'y':
-            return present_menu_and_process(selected_cluster, analyzed_clusters)
+            # Ask the model again rather than get the same reply from the cache
+            with llm_cache.bypass():
+                return present_menu_and_process(selected_cluster, analyzed_clusters)
         else:
             return None, analyzed_clusters
 
@@ -299,7 +371,9 @@ def present_menu_and_process(selected_cluster, analyzed_clusters):
         print("Error: The generated article data is missing required fields.")
         retry = input("Would you like to retry? (y/n): ").lower()
         if retry == 'y':
-            return present_menu_and_process(selected_cluster, analyzed_clusters)
+            # Ask the model again rather than get the same reply from the cache
+            with llm_cache.bypass():
+                return present_menu_and_process(selected_cluster, analyzed_clusters)
         else:
             return None, analyzed_clusters
 
@@ -1,4 +1,4 @@
-import http.client
+from modules import http_client
 import json
 import base64
 import traceback
@@ -31,9 +31,7 @@ def generate_and_encode_images(image_path, output_path):
 
 def publish_article(publish_data, api_key):
     """Send article data to publishing API"""
-    conn = None
     try:
-        conn = http.client.HTTPSConnection("fetch.ainewsbrew.com")
         payload = json.dumps(publish_data)
         headers = {
             'Content-Type': 'application/json',
@@ -41,11 +39,10 @@ def publish_article(publish_data, api_key):
         }
 
         print("\nSending to publishing API...")
-        conn.request("POST", "/api/index_v5.php?mode=pub", payload, headers)
-        res = conn.getresponse()
-        data = res.read()
+        res = http_client.post("https://fetch.ainewsbrew.com/api/index_v5.php?mode=pub", data=payload, headers=headers)
+        data = res.content
 
-        if res.status == 200:
+        if res.status_code == 200:
             try:
                 result = json.loads(data.decode('utf-8'))
                 if result.get('status') == 'success':
@@ -58,25 +55,18 @@ def publish_article(publish_data, api_key):
             except json.JSONDecodeError:
                 print(f"{Fore.RED}Failed to parse API response{Style.RESET_ALL}")
         else:
-            print(f"\n{Fore.RED}HTTP Error: {res.status}")
+            print(f"\n{Fore.RED}HTTP Error: {res.status_code}")
             print(f"Error content: {data.decode('utf-8')}{Style.RESET_ALL}")
 
     except Exception as e:
         print(f"\n{Fore.RED}Publication error: {str(e)}")
         print(f"Traceback:\n{traceback.format_exc()}{Style.RESET_ALL}")
-
-    finally:
-        if conn:
-            conn.close()
     
     return None 
 
 def search_historical_articles(keywords, time_range, filters, api_key):
     """Send historical search request to API"""
-    conn = None
     try:
-        conn = http.client.HTTPSConnection("fetch.ainewsbrew.com")
-        
         # URL encode all parameters
         encoded_keywords = urllib.parse.quote(keywords)
         encoded_time_range = urllib.parse.quote(time_range)
@@ -96,14 +86,13 @@ def search_historical_articles(keywords, time_range, filters, api_key):
         print(f"URL: {params}")
         print(f"Payload: {payload}")
         
-        conn.request("POST", params, payload, headers)
-        res = conn.getresponse()
-        data = res.read()
+        res = http_client.post(f"https://fetch.ainewsbrew.com{params}", data=payload, headers=headers)
+        data = res.content
         
-        print(f"Response status: {res.status}")
+        print(f"Response status: {res.status_code}")
         print(f"Raw response: {data.decode('utf-8')}")
 
-        if res.status == 200:
+        if res.status_code == 200:
             try:
                 result = json.loads(data.decode('utf-8'))
                 # Return the result regardless of status - let the UI handle any errors
@@ -117,7 +106,7 @@ def search_historical_articles(keywords, time_range, filters, api_key):
                     'raw_response': data.decode('utf-8')
                 }
         else:
-            error_msg = f"HTTP Error: {res.status}"
+            error_msg = f"HTTP Error: {res.status_code}"
             print(f"\n{Fore.RED}{error_msg}")
             print(f"Error content: {data.decode('utf-8')}{Style.RESET_ALL}")
             return {
@@ -133,7 +122,3 @@ def search_historical_articles(keywords, time_range, filters, api_key):
             'error': error_msg,
             'details': traceback.format_exc()
         }
-
-    finally:
-        if conn:
-            conn.close() 
\ No newline at end of file
@@ -1,4 +1,4 @@
-import http.client
+from modules import http_client
 import json
 import time
 import hashlib
@@ -72,7 +72,6 @@ def publish_article(json_file_path, api_key):
                     print("Invalid choice. Please try again.")
 
         # API endpoint
-        conn = http.client.HTTPSConnection("fetch.ainewsbrew.com")
         payload = json.dumps(article_data)
         headers = {
             'Content-Type': 'application/json',
@@ -81,15 +80,14 @@ def publish_article(json_file_path, api_key):
 
         print(f"Payload size: {len(payload)} bytes")
         print("Sending request to API...")
-        conn.request("POST", "/api/index_v5.php?mode=pub", payload, headers)
-        res = conn.getresponse()
-        data = res.read()
+        res = http_client.post("https://fetch.ainewsbrew.com/api/index_v5.php?mode=pub", data=payload, headers=headers)
+        data = res.content
 
-        print(f"Response status code: {res.status}")
+        print(f"Response status code: {res.status_code}")
         print(f"Response headers: {res.headers}")
         print(f"Response content: {data.decode('utf-8')}")
 
-        if res.status == 200:
+        if res.status_code == 200:
             try:
                 result = json.loads(data.decode('utf-8'))
                 if result.get('status') == 'success':
@@ -100,7 +98,7 @@ def publish_article(json_file_path, api_key):
             except json.JSONDecodeError:
                 print("Failed to parse JSON response")
         else:
-            print(f"HTTP Error: {res.status}")
+            print(f"HTTP Error: {res.status_code}")
             print(f"Error content (publishhaiku.py): {data.decode('utf-8')}")
 
     except Exception as e:
@@ -108,10 +106,6 @@ def publish_article(json_file_path, api_key):
         print("Traceback:")
         print(traceback.format_exc())
 
-    finally:
-        if 'conn' in locals():
-            conn.close()
-
 class FileChangeHandler(FileSystemEventHandler):
     def __init__(self, json_file_path, api_key):
         self.json_file_path = json_file_path
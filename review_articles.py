@@ -1,4 +1,4 @@
-import http.client
+from modules import http_client
 import json
 from typing import Optional
 import os
@@ -16,23 +16,21 @@ load_dotenv()
 
 API_KEY = os.environ.get("PUBLISH_API_KEY")
 API_HOST = "fetch.ainewsbrew.com"
+API_BASE_URL = f"https://{API_HOST}"
 
 def get_next_article() -> Optional[dict]:
     """Fetch the next unreviewed article from the API"""
-    conn = http.client.HTTPSConnection(API_HOST)
     headers = {
         'X-API-KEY': API_KEY
     }
     
-    conn.request("GET", "/api/index_v5.php?mode=getUnreviewed", headers=headers)
-    response = conn.getresponse()
-    if response.status == 200:
-        return json.loads(response.read().decode('utf-8'))
+    response = http_client.get(f"{API_BASE_URL}/api/index_v5.php?mode=getUnreviewed", headers=headers)
+    if response.status_code == 200:
+        return json.loads(response.content.decode('utf-8'))
     return None
 
 def update_article_status(article_id: int, status: str, updates: dict = None) -> bool:
     """Update the review status and optional fields of an article"""
-    conn = http.client.HTTPSConnection(API_HOST)
     headers = {
         'X-API-KEY': API_KEY,
         'Content-Type': 'application/json'
@@ -44,14 +42,13 @@ def update_article_status(article_id: int, status: str, updates: dict = None) ->
     try:
         # Send the updates in the request body
         if updates:
-            conn.request("POST", url, json.dumps(updates), headers)
+            response = http_client.post(f"{API_BASE_URL}{url}", data=json.dumps(updates), headers=headers)
         else:
-            conn.request("GET", url, headers=headers)
+            response = http_client.get(f"{API_BASE_URL}{url}", headers=headers)
             
-        response = conn.getresponse()
-        response_data = response.read().decode('utf-8')
+        response_data = response.content.decode('utf-8')
         
-        if response.status == 200:
+        if response.status_code == 200:
             result = json.loads(response_data)
             if result.get("status") != "success":
                 raise Exception(f"API returned error: {result.get('message', 'Unknown error')}")
@@ -61,7 +58,7 @@ def update_article_status(article_id: int, status: str, updates: dict = None) ->
         print(f"Status: {status}")
         print(f"Updates: {updates}")
         print(f"Error details: {str(e)}")
-        print(f"API Response Status Code: {response.status if 'response' in locals() else 'No response'}")
+        print(f"API Response Status Code: {response.status_code if 'response' in locals() else 'No response'}")
         print(f"API Response Data: {response_data if 'response_data' in locals() else 'No response data'}")
         print(f"Raw API Response: {json.dumps(json.loads(response_data), indent=2) if 'response_data' in locals() else 'No response'}{Style.RESET_ALL}")
         
@@ -79,8 +76,6 @@ def update_article_status(article_id: int, status: str, updates: dict = None) ->
             if choice in ['r', 's', 'q']:
                 return choice
             print(f"{Fore.RED}Invalid input. Please use r, s, or q.{Style.RESET_ALL}")
-    finally:
-        conn.close()
     return False
 
 def display_article(article: dict):
@@ -2,7 +2,7 @@ import requests
 import json
 import base64
 import os
-import http.client
+from modules import http_client
 import time
 from chat_codegpt import chat_with_codegpt
 from haikubackground import generate_image, add_text_to_image, generate_image_prompt
@@ -32,7 +32,6 @@ def encode_image(image_path):
         return f"data:image/png;base64,{encoded_string}"
 
 def update_article_images(article_id, image_data, image_haiku, api_key):
-    conn = http.client.HTTPSConnection("fetch.ainewsbrew.com")
     payload = json.dumps({
         "image_data": image_data,
         "image_haiku": image_haiku
@@ -42,18 +41,15 @@ def update_article_images(article_id, image_data, image_haiku, api_key):
         'X-API-KEY': api_key
     }
     
-    conn.request("POST", f"/api/index_v5.php?mode=updateImages&id={article_id}", payload, headers)
-    res = conn.getresponse()
-    return json.loads(res.read().decode('utf-8'))
+    res = http_client.post(f"https://fetch.ainewsbrew.com/api/index_v5.php?mode=updateImages&id={article_id}", data=payload, headers=headers)
+    return json.loads(res.content.decode('utf-8'))
 
 def process_article(api_key):
     # Get next article with missing haiku image
-    conn = http.client.HTTPSConnection("fetch.ainewsbrew.com")
     headers = {'X-API-KEY': api_key}
     
-    conn.request("GET", "/api/index_v5.php?mode=getMissingHaiku", headers=headers)
-    res = conn.getresponse()
-    article = json.loads(res.read().decode('utf-8'))
+    res = http_client.get("https://fetch.ainewsbrew.com/api/index_v5.php?mode=getMissingHaiku", headers=headers)
+    article = json.loads(res.content.decode('utf-8'))
     
     if not article:
         print("No articles found with missing haiku images.")
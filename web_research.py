@@ -40,8 +40,9 @@ Key Data Format Notes:
 """
 
 import streamlit as st
-from modules.state import init_session_state, reset_article_state
-from modules.api_client import get_news_data, fetch_latest_headlines
+from modules.state import init_session_state, reset_article_state, stop_cluster_loader
+from modules.api_client import get_news_data
+from modules.headline_mirror import get_latest_headlines
 from modules.display import format_latest_headlines, get_bias_color, create_custom_progress_bar
 from modules.article_wizard import (
     display_article_step, 
@@ -51,9 +52,196 @@ from modules.article_wizard import (
 )
 from modules.utils import get_context_title, get_category_counts
 from chat_codegpt import chat_with_codegpt
-from modules.cluster_analysis import analyze_cluster, create_article
+from modules.cluster_analysis import create_article
+from modules.cluster_worker import ClusterLoader, POLL_INTERVAL
+from modules.cluster_tracker import ClusterTracker
 import time
 
+def display_cluster_list(article_column):
+    """
+    Cluster cards with their Remove / Create Article buttons.
+
+    Runs as a fragment that polls the background loader while clusters are
+    still processing, so only this list reruns and the sidebar and article
+    wizard stay put.
+    """
+    if 'is_loading_clusters' not in st.session_state:
+        st.session_state.is_loading_clusters = False
+        
+    if st.session_state.is_loading_clusters:
+        # Clusters are processed on a background thread; cards appear as they finish
+        if 'cluster_loader' not in st.session_state and 'news_data' in st.session_state:
+            # The tracker outlives searches so unchanged stories are not analyzed again
+            if 'story_tracker' not in st.session_state:
+                st.session_state.story_tracker = ClusterTracker()
+            st.session_state.cluster_loader = ClusterLoader(
+                st.session_state.news_data, tracker=st.session_state.story_tracker
+            ).start()
+            del st.session_state.news_data
+        
+        loader = st.session_state.get('cluster_loader')
+        if loader is None:
+            st.session_state.is_loading_clusters = False
+        else:
+            finished = loader.drain()
+            if finished:
+                st.session_state.clusters.extend(finished)
+                st.session_state.clusters.sort(key=lambda c: c.get('rank_score', 0.0), reverse=True)
+            
+            if loader.total is None:
+                st.caption("Preparing news clusters...")
+            elif loader.total > 0:
+                st.progress(
+                    loader.processed / loader.total,
+                    text=f"Processed {loader.processed} of {loader.total} clusters "
+                         f"({loader.reused} unchanged), {loader.accepted} with 3+ unique sources"
+                )
+            
+            if st.session_state.get('show_debug'):
+                with st.expander("Debug: cluster processing"):
+                    st.write(loader.debug)
+            
+            if loader.finished:
+                st.session_state.is_loading_clusters = False
+                if loader.error is not None:
+                    st.session_state.cluster_load_message = ('error', f"Failed to process clusters. Error: {str(loader.error)}")
+                elif not loader.total:
+                    st.session_state.cluster_load_message = ('warning', "No clusters with 3 or more articles found")
+                del st.session_state.cluster_loader
+                # A full rerun drops the polling timer now that every cluster is in
+                st.rerun()
+    
+    message = st.session_state.pop('cluster_load_message', None)
+    if message:
+        level, text = message
+        if level == 'error':
+            st.error(text)
+        else:
+            st.warning(text)
+    
+    if st.session_state.clusters:
+        # Get unique categories from the clusters
+        categories = list(set(cluster['category'] for cluster in st.session_state.clusters))
+        categories.insert(0, "All Categories")
+
+        # Add category filter dropdown
+        selected_category = st.selectbox(
+            "Filter by Category",
+            categories,
+            key="category_filter",
+            index=0
+        )
+
+        # Display clusters - filter out any with 2 or fewer sources
+        filtered_clusters = [
+            cluster for cluster in st.session_state.clusters
+            if (selected_category == "All Categories" or cluster['category'] == selected_category)
+            and cluster.get('unique_source_count', 0) > 2
+        ]
+
+        for i, cluster in enumerate(filtered_clusters):
+            # Positions shift as new clusters are ranked in, so widgets are keyed on the story
+            cluster_key = cluster.get('story_id') or cluster.get('cluster_id') or id(cluster)
+            is_evaluating = (hasattr(st.session_state, 'evaluating_cluster') and 
+                            st.session_state.evaluating_cluster == cluster_key and 
+                            not hasattr(st.session_state, 'article_rejected'))
+            opacity = "1" if is_evaluating or not hasattr(st.session_state, 'evaluating_cluster') else "1"
+            
+            st.markdown(
+                f"""
+                <div style="opacity: {opacity}; padding: 1rem; border: 1px solid rgba(74, 111, 165, 0.1); border-radius: 8px; margin-bottom: 0.75rem; background-color: #1C1C1C;">
+                    <div style="font-weight: 500; font-size: 1em; margin-bottom: 0.5rem; color: rgba(255, 255, 255, 0.95);">
+                        {cluster.get('most_recent_headline', 'No headline available')}
+                    </div>
+                    <div style="margin-bottom: 0.75rem; font-size: 0.85em; color: rgba(255, 255, 255, 0.8);">
+                        {"<br>".join(f'- <span title="{article.get("title", "No title")}">{article.get("title", "No title")[:50]}{"..." if len(article.get("title", "No title")) > 50 else ""}</span>' for article in sorted(cluster.get('articles', []), key=lambda x: x.get('published_date', ''), reverse=True)[:3])}
+                    </div>
+                    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;">
+                        <div style="color: rgba(192, 160, 128, 0.95); font-size: 0.85em;">
+                            Sources: {cluster.get('unique_source_count', 0)}
+                        </div>
+                        <div style="color: rgba(255, 255, 255, 0.8); font-size: 0.9em;">
+                            Articles: {cluster.get('cluster_size', 0)}
+                        </div>
+                    </div>
+                    <div style="margin-bottom: 0.5rem; color: rgba(255, 255, 255, 0.7); font-size: 0.8em;">
+                        {', '.join(sorted(set(article.get('name_source', 'Unknown') for article in cluster.get('articles', [])))[:10]) + (f" + {len(set(article.get('name_source', 'Unknown') for article in cluster.get('articles', []))) - 10} other sources" if len(set(article.get('name_source', 'Unknown') for article in cluster.get('articles', []))) > 10 else '')}
+                    </div>
+                    <div style="display: flex; align-items: center; width: 100%; padding: 4px 0;">
+                        <div style="flex: 1;">{create_custom_progress_bar(cluster.get('bias', 0), i)}</div>
+                    </div>
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+            
+            # Add buttons in two columns
+            button_col1, button_col2 = st.columns([1, 1])
+            with button_col1:
+                if st.button("Remove Cluster", key=f"remove_cluster_{cluster_key}", type="secondary"):
+                    st.session_state.clusters.remove(cluster)
+                    st.rerun()
+            with button_col2:
+                if st.button("Create Article", key=f"eval_cluster_{cluster_key}"):
+                    st.session_state.evaluating_cluster = cluster_key
+                    
+                    # Create a placeholder for the loading animation
+                    with article_column:
+                        loading_placeholder = st.empty()
+                        with loading_placeholder.container():
+                            st.markdown("""
+                                <div style="display: flex; flex-direction: column; align-items: center; justify-content: center; height: 300px; background: rgba(74, 111, 165, 0.05); border-radius: 8px; padding: 2rem;">
+                                    <div style="color: #4A6FA5; font-size: 1.2rem; margin-bottom: 1rem;">
+                                        Analyzing Sources & Generating Article
+                                    </div>
+                                    <div class="stProgress">
+                                        <div style="width: 100%; height: 4px; background: #f0f2f6; border-radius: 2px; overflow: hidden;">
+                                            <div style="width: 30%; height: 100%; background: #4A6FA5; border-radius: 2px; animation: loading 1.5s infinite ease-in-out;">
+                                            </div>
+                                        </div>
+                                    </div>
+                                </div>
+                                
+                                <style>
+                                    @keyframes loading {
+                                        0% { transform: translateX(-100%); }
+                                        100% { transform: translateX(200%); }
+                                    }
+                                    .stProgress {
+                                        width: 200px;
+                                    }
+                                </style>
+                            """, unsafe_allow_html=True)
+                            
+                            # Add source information
+                            st.markdown(f"""
+                                <div style="margin-top: 1rem; text-align: center; color: rgba(74, 111, 165, 0.7);">
+                                    Processing {len(cluster.get('articles', []))} source articles
+                                </div>
+                            """, unsafe_allow_html=True)
+                            
+                            # Generate the article
+                            try:
+                                # A cluster is only written again after its article was rejected
+                                # or abandoned, so never serve the earlier reply
+                                article_data = create_article(cluster, stream_to=st.container(), use_cache=False)
+                                if article_data:
+                                    st.session_state.selected_cluster = cluster
+                                    st.session_state.article_data = article_data
+                                    st.session_state.current_step = 1
+                                    st.session_state.clusters.remove(cluster)
+                                    st.session_state.evaluating_cluster = None
+                                    loading_placeholder.empty()
+                                    st.rerun()
+                                else:
+                                    raise ValueError("Empty article data returned from create_article")
+                            except Exception as e:
+                                st.error(f"Failed to generate article. Error: {str(e)}")
+                                time.sleep(2)
+                                st.session_state.evaluating_cluster = None
+                                st.rerun()
+
+
 def main():
     st.set_page_config(layout="wide", page_title="AI News Brew Research")
     
@@ -118,6 +306,7 @@ def main():
     # Sidebar controls
     with st.sidebar:
         st.header("Research")
+        st.toggle("Show debug output", key="show_debug")
         
         # Use columns for search type and time range outside the form
         col1, col2 = st.columns([3, 2])
@@ -153,8 +342,9 @@ def main():
                 st.session_state.topic = topic
                 
                 # Clear session state and fetch news
+                stop_cluster_loader()
                 for key in list(st.session_state.keys()):
-                    if key not in ['topic', 'time_range', 'last_topic']:
+                    if key not in ['topic', 'time_range', 'last_topic', 'show_debug', 'story_tracker']:
                         del st.session_state[key]
                 
                 with st.spinner("Fetching news..."):
@@ -177,8 +367,9 @@ def main():
             
             if submit_button:
                 # Clear session state and fetch news
+                stop_cluster_loader()
                 for key in list(st.session_state.keys()):
-                    if key not in ['topic', 'time_range', 'last_topic']:
+                    if key not in ['topic', 'time_range', 'last_topic', 'show_debug', 'story_tracker']:
                         del st.session_state[key]
                 
                 with st.spinner("Fetching news..."):
@@ -200,8 +391,8 @@ def main():
             </div>
         """, unsafe_allow_html=True)
         
-        # Fetch and display headlines
-        headlines = fetch_latest_headlines()
+        # Display headlines from the local mirror; it syncs deltas in the background
+        headlines = get_latest_headlines()
         if headlines:
             category_counts = get_category_counts(headlines)
             category_options = ["All Categories"] + [cat for cat, _ in category_counts]
@@ -280,179 +471,9 @@ def main():
     col1, col2 = st.columns([1, 3])
     
     with col1:
-        if 'is_loading_clusters' not in st.session_state:
-            st.session_state.is_loading_clusters = False
-            
-        if st.session_state.is_loading_clusters:
-            with st.spinner("Processing news clusters..."):
-                if 'news_data' in st.session_state:
-                    clusters = []
-                    valid_clusters = [c for c in st.session_state.news_data.get('clusters', []) 
-                                    if len(c.get('articles', [])) >= 3]
-                    total_clusters = len(valid_clusters)
-                    
-                    if total_clusters > 0:
-                        st.write(f"Found {total_clusters} clusters to analyze")
-                        # Debug: Show sample of first cluster
-                        st.write("Debug: First cluster sample:", {
-                            'num_articles': len(valid_clusters[0].get('articles', [])),
-                            'first_article': {
-                                'title': valid_clusters[0].get('articles', [{}])[0].get('title', 'NO TITLE'),
-                                'source': valid_clusters[0].get('articles', [{}])[0].get('name_source', 'NO SOURCE')
-                            }
-                        })
-                        
-                        progress_bar = st.progress(0)
-                        
-                        for idx, cluster in enumerate(valid_clusters):
-                            progress = (idx) / total_clusters
-                            progress_bar.progress(progress)
-                            
-                            analysis = analyze_cluster(cluster)
-                            if analysis and analysis.get('unique_source_count', 0) > 2:
-                                # Debug: Show what we're adding to clusters
-                                st.write(f"Debug: Adding cluster {idx} with data:", {
-                                    'headline': analysis.get('most_recent_headline', 'NO HEADLINE'),
-                                    'sources': analysis.get('unique_source_count', 0)
-                                })
-                                
-                                clusters.append({
-                                    'category': analysis.get('category', 'Unknown'),
-                                    'subject': analysis.get('subject', 'Unknown'),
-                                    'bias': analysis.get('bias', 0.0),
-                                    'cluster_size': len(analysis.get('articles', [])),
-                                    'articles': analysis.get('articles', []),
-                                    'most_recent_headline': analysis.get('most_recent_headline', 'No headline available'),
-                                    'unique_source_count': analysis.get('unique_source_count', 0)
-                                })
-                        
-                        progress_bar.progress(1.0)
-                        st.write(f"Analysis complete! Found {len(clusters)} valid clusters with 3+ unique sources")
-                    else:
-                        st.warning("No clusters with 3 or more articles found")
-                    
-                    st.session_state.clusters = clusters
-                    st.session_state.is_loading_clusters = False
-                    del st.session_state.news_data
-                    st.rerun()
-        
-        elif st.session_state.clusters:
-            # Get unique categories from the clusters
-            categories = list(set(cluster['category'] for cluster in st.session_state.clusters))
-            categories.insert(0, "All Categories")
-
-            # Add category filter dropdown
-            selected_category = st.selectbox(
-                "Filter by Category",
-                categories,
-                key="category_filter",
-                index=0
-            )
-
-            # Display clusters - filter out any with 2 or fewer sources
-            filtered_clusters = [
-                cluster for cluster in st.session_state.clusters
-                if (selected_category == "All Categories" or cluster['category'] == selected_category)
-                and cluster.get('unique_source_count', 0) > 2
-            ]
-
-            for i, cluster in enumerate(filtered_clusters):
-                is_evaluating = (hasattr(st.session_state, 'evaluating_cluster') and 
-                                st.session_state.evaluating_cluster == i and 
-                                not hasattr(st.session_state, 'article_rejected'))
-                opacity = "1" if is_evaluating or not hasattr(st.session_state, 'evaluating_cluster') else "1"
-                
-                st.markdown(
-                    f"""
-                    <div style="opacity: {opacity}; padding: 1rem; border: 1px solid rgba(74, 111, 165, 0.1); border-radius: 8px; margin-bottom: 0.75rem; background-color: #1C1C1C;">
-                        <div style="font-weight: 500; font-size: 1em; margin-bottom: 0.5rem; color: rgba(255, 255, 255, 0.95);">
-                            {cluster.get('most_recent_headline', 'No headline available')}
-                        </div>
-                        <div style="margin-bottom: 0.75rem; font-size: 0.85em; color: rgba(255, 255, 255, 0.8);">
-                            {"<br>".join(f'- <span title="{article.get("title", "No title")}">{article.get("title", "No title")[:50]}{"..." if len(article.get("title", "No title")) > 50 else ""}</span>' for article in sorted(cluster.get('articles', []), key=lambda x: x.get('published_date', ''), reverse=True)[:3])}
-                        </div>
-                        <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;">
-                            <div style="color: rgba(192, 160, 128, 0.95); font-size: 0.85em;">
-                                Sources: {cluster.get('unique_source_count', 0)}
-                            </div>
-                            <div style="color: rgba(255, 255, 255, 0.8); font-size: 0.9em;">
-                                Articles: {cluster.get('cluster_size', 0)}
-                            </div>
-                        </div>
-                        <div style="margin-bottom: 0.5rem; color: rgba(255, 255, 255, 0.7); font-size: 0.8em;">
-                            {', '.join(sorted(set(article.get('name_source', 'Unknown') for article in cluster.get('articles', [])))[:10]) + (f" + {len(set(article.get('name_source', 'Unknown') for article in cluster.get('articles', []))) - 10} other sources" if len(set(article.get('name_source', 'Unknown') for article in cluster.get('articles', []))) > 10 else '')}
-                        </div>
-                        <div style="display: flex; align-items: center; width: 100%; padding: 4px 0;">
-                            <div style="flex: 1;">{create_custom_progress_bar(cluster.get('bias', 0), i)}</div>
-                        </div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-                
-                # Add buttons in two columns
-                button_col1, button_col2 = st.columns([1, 1])
-                with button_col1:
-                    if st.button("Remove Cluster", key=f"remove_cluster_{i}", type="secondary"):
-                        st.session_state.clusters.pop(i)
-                        st.rerun()
-                with button_col2:
-                    if st.button("Create Article", key=f"eval_cluster_{i}"):
-                        st.session_state.evaluating_cluster = i
-                        
-                        # Create a placeholder for the loading animation
-                        with col2:
-                            loading_placeholder = st.empty()
-                            with loading_placeholder.container():
-                                st.markdown("""
-                                    <div style="display: flex; flex-direction: column; align-items: center; justify-content: center; height: 300px; background: rgba(74, 111, 165, 0.05); border-radius: 8px; padding: 2rem;">
-                                        <div style="color: #4A6FA5; font-size: 1.2rem; margin-bottom: 1rem;">
-                                            Analyzing Sources & Generating Article
-                                        </div>
-                                        <div class="stProgress">
-                                            <div style="width: 100%; height: 4px; background: #f0f2f6; border-radius: 2px; overflow: hidden;">
-                                                <div style="width: 30%; height: 100%; background: #4A6FA5; border-radius: 2px; animation: loading 1.5s infinite ease-in-out;">
-                                                </div>
-                                            </div>
-                                        </div>
-                                    </div>
-                                    
-                                    <style>
-                                        @keyframes loading {
-                                            0% { transform: translateX(-100%); }
-                                            100% { transform: translateX(200%); }
-                                        }
-                                        .stProgress {
-                                            width: 200px;
-                                        }
-                                    </style>
-                                """, unsafe_allow_html=True)
-                                
-                                # Add source information
-                                st.markdown(f"""
-                                    <div style="margin-top: 1rem; text-align: center; color: rgba(74, 111, 165, 0.7);">
-                                        Processing {len(cluster.get('articles', []))} source articles
-                                    </div>
-                                """, unsafe_allow_html=True)
-                                
-                                # Generate the article
-                                try:
-                                    article_data = create_article(cluster)
-                                    if article_data:
-                                        st.session_state.selected_cluster = cluster
-                                        st.session_state.article_data = article_data
-                                        st.session_state.current_step = 1
-                                        st.session_state.clusters.pop(i)
-                                        st.session_state.evaluating_cluster = None
-                                        loading_placeholder.empty()
-                                        st.rerun()
-                                    else:
-                                        raise ValueError("Empty article data returned from create_article")
-                                except Exception as e:
-                                    st.error(f"Failed to generate article. Error: {str(e)}")
-                                    time.sleep(2)
-                                    st.session_state.evaluating_cluster = None
-                                    st.rerun()
+        # Only the cluster list reruns while the loader is still working
+        run_every = POLL_INTERVAL if st.session_state.get('is_loading_clusters') else None
+        st.fragment(display_cluster_list, run_every=run_every)(col2)
 
     with col2:
         if st.session_state.selected_cluster and st.session_state.article_data:
@@ -465,5 +486,6 @@ def main():
             else:
                 display_final_review()
 
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file